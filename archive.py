@@ -0,0 +1,341 @@
+"""
+An archive module for moving the old usage records of the report
+database into yearly archive databases next to it
+
+	Usage:
+	-----
+		python archive.py --days 365
+"""
+
+__author__ = "Monish Mohanan"
+__version__ = "1.0"
+
+# Importing required libraries
+try:
+	import re
+	import os
+	import sqlite3
+	import logging
+	import argparse
+	from datetime import date, timedelta
+	from localcache import cache
+	from infobase import InfoBase
+except ImportError as e:
+	from tkinter import messagebox
+	messagebox.showwarning("Import Error", str(e))
+
+# Defining the necessary constants
+ARCHIVE_DAYS = 365
+ARCHIVE_NAME = "%s_%d.db"
+ARCHIVE_TABLES = ("Record", "Metrics", "RecordKey", "RecordSearch")
+ARCHIVE_TABLE = '''CREATE TABLE IF NOT EXISTS Archive(
+	Year INTEGER PRIMARY KEY,
+	Name TEXT NOT NULL,
+	Records INTEGER NOT NULL
+	)'''
+
+# Record dates are stored as %d/%m/%Y, the key orders them as %Y%m%d
+DATE_KEY = "substr(Date, 7, 4) || substr(Date, 4, 2) || substr(Date, 1, 2)"
+
+class ReportArchive:
+	"""
+	A class for the yearly archives of a report database
+
+	The records older than the horizon are moved with their metrics,
+	idempotency keys and search index rows to one database per year,
+	e.g. report_2021.db, and counted in the Archive table of the report
+	database. Queries attach the archives of the years within their
+	date range only
+
+	Attributes:
+	----------
+		report : str
+			Location of the report database
+
+	Method:
+	------
+		path : Returns the location of the archive of a year
+
+		count : Returns the number of records including the archived ones
+
+		archive : Moves the records older than the horizon
+
+		move : Moves the old records of a year in one transaction
+
+		columns : Returns the columns of a table
+
+		attach : Attaches the archives of a date range
+
+		union : Returns the union of a table across the attached archives
+	"""
+
+	def __init__(self, report):
+		"""
+		Constructs the identifiers of the archive
+
+		Parameters:
+		----------
+			report : str
+				Location of the report database
+		"""
+
+		self.report = report
+		self.folder = os.path.dirname(report)
+		self.stem = os.path.splitext(os.path.basename(report))[0]
+
+	def path(self, year):
+		"""
+		Returns the location of the archive database of the year
+		"""
+
+		return os.path.join(self.folder, ARCHIVE_NAME % (self.stem, year))
+
+	@staticmethod
+	def count(connection):
+		"""
+		Returns the number of records of the report database, including
+
+		the records moved to the archives
+
+		Parameters:
+		----------
+			connection : sqlite3.Connection
+				Connection to the report database
+
+		Return:
+		------
+			records : int
+				Number of records ever inserted
+		"""
+
+		records = connection.execute(
+			'''SELECT COUNT(ID) FROM Record''').fetchone()[0]
+		if connection.execute('''SELECT name FROM sqlite_master
+				WHERE type = ? AND name = ?''', ("table", "Archive")).fetchone():
+			records += connection.execute(
+				'''SELECT IFNULL(SUM(Records), 0) FROM Archive''').fetchone()[0]
+		return records
+
+	def archive(self, days = ARCHIVE_DAYS, today = None, vacuum = False):
+		"""
+		Moves the records older than the horizon to the archives of their
+
+		years. The latest record always stays in the report database so
+		that the IDs of the new records keep increasing
+
+		Parameters:
+		----------
+			days : int
+				Age in days from which a record is archived
+
+			today : datetime.date
+				Date the horizon is counted from, today by default
+
+			vacuum : bool
+				True to shrink the report database file afterwards
+
+		Return:
+		------
+			moved : dict
+				Number of records moved to the archive of every year
+		"""
+
+		cutoff = ((today or date.today()) - timedelta(days = days)).strftime(
+			"%Y%m%d")
+		connection = sqlite3.connect(self.report, isolation_level = None)
+		moved = dict()
+		try:
+			years = [int(row[0]) for row in connection.execute('''SELECT
+				DISTINCT substr(Date, 7, 4) FROM Record WHERE %s < ?
+				AND ID < (SELECT MAX(ID) FROM Record)''' % DATE_KEY,
+				(cutoff,)).fetchall()]
+			for year in sorted(years):
+				moved[year] = self.move(connection, year, cutoff)
+			if vacuum and any(moved.values()):
+				connection.execute('''VACUUM''')
+		finally:
+			connection.close()
+		for year, records in moved.items():
+			logging.warning("%d records archived to %s" % (
+				records, self.path(year)))
+		return moved
+
+	def move(self, connection, year, cutoff):
+		"""
+		Copies the old records of the year with their metrics and keys
+
+		to its archive and deletes them from the report database in one
+		transaction over both databases
+
+		Parameters:
+		----------
+			connection : sqlite3.Connection
+				Connection to the report database in autocommit mode
+
+			year : int
+				Year of the records
+
+			cutoff : str
+				Horizon as %Y%m%d
+
+		Return:
+		------
+			records : int
+				Number of records moved
+		"""
+
+		connection.execute('''ATTACH DATABASE ? AS archive''', (self.path(year),))
+		try:
+			schemas = dict(connection.execute('''SELECT name, sql
+				FROM main.sqlite_master WHERE type = ?''', ("table",)).fetchall())
+			connection.execute('''BEGIN IMMEDIATE''')
+			try:
+				for table in ARCHIVE_TABLES:
+					if table in schemas:
+						connection.execute(re.sub(
+							r'^CREATE (VIRTUAL )?TABLE (IF NOT EXISTS )?',
+							r'CREATE \1TABLE IF NOT EXISTS archive.',
+							schemas[table]))
+
+				connection.execute('''CREATE TEMP TABLE Moved AS SELECT ID
+					FROM main.Record WHERE substr(Date, 7, 4) = ? AND %s < ?
+					AND ID < (SELECT MAX(ID) FROM main.Record)''' % DATE_KEY,
+					(str(year), cutoff))
+				records = connection.execute(
+					'''SELECT COUNT(ID) FROM Moved''').fetchone()[0]
+				for table, column in (
+						("Record", "ID"), ("Metrics", "RecordID"),
+						("RecordKey", "RecordID"), ("RecordSearch", "rowid")):
+					if table not in schemas:
+						continue
+					columns = ReportArchive.columns(connection, "main", table)
+					archived = ReportArchive.columns(connection, "archive", table)
+					for name in columns:
+						if name not in archived:
+							connection.execute('''ALTER TABLE archive.%s
+								ADD COLUMN "%s"''' % (table, name))
+					names = ", ".join('"%s"' % name for name in columns)
+
+					# The full-text index keeps the record IDs as its rowids and
+					# takes no conflict clause
+					if column == "rowid":
+						names = "rowid, " + names
+					connection.execute('''INSERT %s INTO archive.%s(%s)
+						SELECT %s FROM main.%s
+						WHERE %s IN (SELECT ID FROM Moved)''' % (
+							"" if column == "rowid" else "OR IGNORE",
+							table, names, names, table, column))
+					connection.execute('''DELETE FROM main.%s
+						WHERE %s IN (SELECT ID FROM Moved)''' % (table, column))
+
+				connection.execute(ARCHIVE_TABLE)
+				connection.execute('''INSERT OR IGNORE INTO Archive(Year, Name,
+					Records) VALUES(?, ?, 0)''', (
+						year, os.path.basename(self.path(year))))
+				connection.execute('''UPDATE Archive SET Records = Records + ?
+					WHERE Year = ?''', (records, year))
+				connection.execute('''DROP TABLE temp.Moved''')
+				connection.execute('''COMMIT''')
+			except BaseException:
+				connection.execute('''ROLLBACK''')
+				raise
+		finally:
+			connection.execute('''DETACH DATABASE archive''')
+		return records
+
+	def attach(self, connection, start = None, end = None):
+		"""
+		Attaches the local replicas of the archives of the years between
+
+		the start and the end dates, every archive if there is no range
+
+		Parameters:
+		----------
+			connection : sqlite3.Connection
+				Connection to the report database or to its replica
+
+			start, end : datetime.date
+				First and last date of the query, None if open
+
+		Return:
+		------
+			schemas : list
+				Names of the attached archives
+		"""
+
+		if not connection.execute('''SELECT name FROM sqlite_master
+				WHERE type = ? AND name = ?''', ("table", "Archive")).fetchone():
+			return list()
+
+		schemas = list()
+		for year, name in connection.execute(
+				'''SELECT Year, Name FROM Archive ORDER BY Year''').fetchall():
+			if start is not None and year < start.year:
+				continue
+			if end is not None and year > end.year:
+				continue
+			schema = "archive_%d" % year
+			connection.execute('''ATTACH DATABASE ? AS %s''' % schema, (
+				cache.replica(os.path.join(self.folder, name)),))
+			schemas.append(schema)
+		return schemas
+
+	@staticmethod
+	def columns(connection, schema, table):
+		"""
+		Returns the column names of a table of an attached database
+		"""
+
+		return [row[1] for row in connection.execute(
+			'''PRAGMA %s.table_info(%s)''' % (schema, table)).fetchall()]
+
+	@staticmethod
+	def union(table, schemas, columns):
+		"""
+		Returns the union of the columns of the table of the report
+
+		database and of the attached archives, to be queried like the
+		table itself
+
+		Parameters:
+		----------
+			table : str
+				Name of the table
+
+			schemas : list
+				Names of the attached archives
+
+			columns : tuple
+				Columns of the query
+
+		Return:
+		------
+			source : str
+				Table name, or the union as a subquery
+		"""
+
+		if not schemas:
+			return table
+		return "(%s)" % " UNION ALL ".join(
+			"SELECT %s FROM %s.%s" % (", ".join(columns), schema, table)
+			for schema in ["main"] + schemas)
+
+def main():
+	"""
+	Archives the report database of info.db from the command line
+	"""
+
+	parser = argparse.ArgumentParser(description = __doc__.split("\n")[1])
+	parser.add_argument("--days", type = int, default = ARCHIVE_DAYS)
+	parser.add_argument("--report", default = None)
+	arguments = parser.parse_args()
+
+	report = arguments.report or InfoBase().records["Report"]
+	moved = ReportArchive(report).archive(arguments.days, vacuum = True)
+	for year, records in sorted(moved.items()):
+		print("%d : %d records archived" % (year, records))
+	if not moved:
+		print("No records older than %d days" % arguments.days)
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,302 @@
+"""
+A bundle module for rendering many Test and Cost Templates as the
+consecutive pages of one PDF document for the release reviews
+"""
+
+__author__ = "Monish Mohanan"
+__version__ = "1.0"
+
+# Importing required libraries
+try:
+	import sys
+	import math
+	import time
+	from fpdf import FPDF
+	from models import TestItem
+	from infobase import InfoBase
+	from datastore import DataStore
+	from searchbase import LinearSearch
+	from template import TransmissionTemplate, TemplateSkeleton
+except ImportError as e:
+	from tkinter import messagebox
+	messagebox.showwarning("Import Error", str(e))
+
+# Defining the necessary constants
+CONTENTS = "TABLE OF CONTENTS"
+CONTENTS_ROWS = 36
+CONTENTS_COLUMNS = (
+	("No.", 10), ("Change Type", 35), ("Subassembly", 40),
+	("Part Name", 40), ("Tests", 15), ("Total Cost", 35), ("Page", 15))
+
+class TemplateBundle:
+	"""
+	A class for rendering templates into one PDF document
+
+	Every template starts on a new page of the same PDF object, so the
+	fonts and the logo are embedded once for the whole document and the
+	static blocks are stamped from the skeleton of the process
+
+	Attributes:
+	----------
+		templates : list
+			TransmissionTemplate objects in the order of the document
+
+		contents : bool
+			True to start the document with a table of contents
+
+	Method:
+	------
+		render : Draws the templates and the table of contents
+
+		draw_contents : Fills the pages of the table of contents
+
+		document : Returns the bundle as PDF bytes
+
+		compare : Measures the bundle against separate documents
+	"""
+
+	def __init__(self, templates, contents = True):
+		"""
+		Constructs the identifiers of the bundle
+
+		Parameters:
+		----------
+			templates : list
+				TransmissionTemplate objects in the order of the document
+
+			contents : bool
+				True to start the document with a table of contents
+		"""
+
+		self.templates = templates
+		self.contents = contents
+		self.pages = list()
+		self.pdf = None
+
+	def render(self):
+		"""
+		Draws every template from a new page of one PDF object, after
+
+		the pages reserved for the table of contents
+
+		Parameters:
+		----------
+			None
+
+		Return:
+		------
+			None
+		"""
+
+		skeleton = TemplateSkeleton.load()
+		self.pdf = FPDF(orientation = 'P', unit = 'mm', format = 'A4')
+
+		# The pages of the contents are reserved first and filled once the
+		# first page of every template is known
+		reserved = 0
+		if self.contents:
+			reserved = math.ceil(len(self.templates) / CONTENTS_ROWS) or 1
+			for _ in range(reserved):
+				skeleton.start_page(self.pdf)
+
+		self.pages = list()
+		for template in self.templates:
+			skeleton.start_page(self.pdf)
+			self.pages.append(self.pdf.page_no())
+			template.data = None
+			template.pdf = self.pdf
+			template.draw_page(skeleton)
+
+		if self.contents:
+			self.draw_contents(reserved)
+
+	def draw_contents(self, reserved):
+		"""
+		Fills the reserved pages with the change type, the selection, the
+
+		number of tests, the total cost and a link to the first page of
+		every template, followed by the total of the bundle
+
+		Parameters:
+		----------
+			reserved : int
+				Number of pages reserved for the table of contents
+
+		Return:
+		------
+			None
+		"""
+
+		# FPDF draws on the page in pdf.page, the last page is restored
+		# after the contents. The first font set below differs from the
+		# footer font of the last template so it is written to the page
+		last = self.pdf.page
+		rows = list(zip(self.templates, self.pages))
+		for number in range(reserved):
+			self.pdf.page = number + 1
+			self.pdf.set_xy(self.pdf.l_margin, self.pdf.t_margin)
+			self.pdf.set_font('Arial', 'B', size = 20)
+			self.pdf.cell(190, 10.5, txt = CONTENTS, align = 'C', border = 1)
+			self.pdf.ln()
+			self.pdf.set_font('Arial', 'B', size = 10)
+			for heading, width in CONTENTS_COLUMNS:
+				self.pdf.cell(
+					width, 8, txt = heading, border = 1, align = 'C', fill = True)
+			self.pdf.ln()
+
+			self.pdf.set_font('Arial', size = 8)
+			start = number * CONTENTS_ROWS
+			for index, (template, page) in enumerate(
+					rows[start:start + CONTENTS_ROWS], start = start + 1):
+				link = self.pdf.add_link()
+				self.pdf.set_link(link, page = page)
+				values = (
+					str(index),
+					template.input_values["Change Type"],
+					template.input_values["Subassembly"],
+					template.input_values["Part Name"],
+					str(template.total_test),
+					" ".join((template.total_cost, "EUR")),
+					str(page))
+				for value, (heading, width) in zip(values, CONTENTS_COLUMNS):
+					self.pdf.cell(
+						width, 6, txt = value, border = 1, align = 'C',
+						link = link)
+				self.pdf.ln()
+
+		total = round(sum(
+			float(template.total_cost) for template in self.templates), 2)
+		self.pdf.set_font('Arial', 'B', size = 9)
+		self.pdf.cell(
+			sum(width for heading, width in CONTENTS_COLUMNS[:4]), 8,
+			txt = "TOTAL", border = 1, align = 'C')
+		self.pdf.cell(
+			CONTENTS_COLUMNS[4][1], 8,
+			txt = str(sum(template.total_test for template in self.templates)),
+			border = 1, align = 'C')
+		self.pdf.cell(
+			CONTENTS_COLUMNS[5][1], 8,
+			txt = " ".join((str(total), "EUR")), border = 1, align = 'C')
+		self.pdf.cell(CONTENTS_COLUMNS[6][1], 8, txt = " ", border = 1)
+		self.pdf.page = last
+
+	def document(self):
+		"""
+		Returns the bundle as the bytes of a PDF file, rendering it first
+
+		if it is not rendered yet
+
+		Parameters:
+		----------
+			None
+
+		Return:
+		------
+			data : bytes
+				Contents of the PDF file
+		"""
+
+		if self.pdf is None:
+			self.render()
+		data = self.pdf.output(dest = 'S')
+		if isinstance(data, str):
+			data = data.encode('latin-1')
+		return bytes(data)
+
+	def compare(self):
+		"""
+		Renders the templates as separate documents and as the bundle
+
+		Parameters:
+		----------
+			None
+
+		Return:
+		------
+			comparison : dict
+				Number of templates, seconds and bytes of the separate
+				documents and of the bundle
+		"""
+
+		start = time.perf_counter()
+		separate = 0
+		for template in self.templates:
+			template.render_template()
+			separate += len(template.document())
+		separate_time = time.perf_counter() - start
+
+		start = time.perf_counter()
+		self.pdf = None
+		bundle = len(self.document())
+		bundle_time = time.perf_counter() - start
+
+		return {
+			"templates" : len(self.templates),
+			"separate_seconds" : separate_time,
+			"separate_bytes" : separate,
+			"bundle_seconds" : bundle_time,
+			"bundle_bytes" : bundle
+			}
+
+def benchmark(count = 50, change_types = (1, 2, 3)):
+	"""
+	Compares the bundle of the first combinations having tests in the
+
+	databases of info.db against the separate documents
+
+	Parameters:
+	----------
+		count : int
+			Number of templates in the bundle
+
+		change_types : tuple
+			Change types of the combinations
+
+	Return:
+	------
+		comparison : dict
+			Result of TemplateBundle.compare
+	"""
+
+	info = InfoBase()
+	store = DataStore(info.databases)
+	store.load("Test")
+	snapshot = store.load("Cost")
+
+	templates = list()
+	for change in change_types:
+		for subassembly, column in info.subassemblies.items():
+			selections = [("NA", column)] + list(
+				info.subassembly_and_parts.get(subassembly, dict()).items())
+			for part, position in selections:
+				search = LinearSearch(
+					change, snapshot.test_workbook, snapshot.cost_workbook,
+					cost_index = snapshot.cost_index,
+					test_index = snapshot.test_index)
+				tests = search.extract_test(position)
+				if isinstance(tests, str) or None in tests:
+					continue
+				costs = search.extract_cost(tests.keys())
+				if isinstance(costs, str):
+					continue
+				templates.append(TransmissionTemplate(
+					TestItem.join(tests, costs), **{
+						"Change Type" : info.change_types[change],
+						"Subassembly" : subassembly,
+						"Part Name" : part,
+						"Requester" : "Release Review",
+						"Creator" : "Release Review",
+						"Comment" : "None"}))
+
+	# Repeating the combinations up to the size of the bundle
+	templates = [templates[index % len(templates)] for index in range(count)]
+	return TemplateBundle(templates).compare()
+
+if __name__ == "__main__":
+	comparison = benchmark(*[int(value) for value in sys.argv[1:2]])
+	print("%d templates" % comparison["templates"])
+	for kind in ("separate", "bundle"):
+		print("%-8s : %8.1f ms %10d bytes" % (
+			kind,
+			comparison[kind + "_seconds"] * 1e3,
+			comparison[kind + "_bytes"]))
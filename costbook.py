@@ -0,0 +1,356 @@
+"""
+A cost book module for reading the work package id and cost columns
+of the cost database with its sheets parsed in several processes
+"""
+
+__author__ = "Monish Mohanan"
+__version__ = "1.0"
+
+# Importing required libraries
+try:
+	import io
+	import os
+	import re
+	import logging
+	import zipfile
+	from xml.etree import ElementTree
+	from concurrent.futures import ProcessPoolExecutor
+	import xlrd
+	from searchbase import ID_COLUMN, COST_COLUMN
+except ImportError as e:
+	from tkinter import messagebox
+	messagebox.showwarning("Import Error", str(e))
+
+# Defining the necessary constants
+COST_PROCESSES = min(4, os.cpu_count() or 1)
+PARALLEL_BYTES = 1 << 20
+COLUMNS = (ID_COLUMN, COST_COLUMN)
+MAIN = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+RELATION = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+PACKAGE = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+WORKSHEET = RELATION[1:-1] + "/worksheet"
+ROW_TAG, CELL_TAG, MERGE_TAG = MAIN + "row", MAIN + "c", MAIN + "mergeCell"
+VALUE_TAG, STRING_TAG = MAIN + "v", MAIN + "is"
+TEXT_TAG, RUN_TAG = MAIN + "t", MAIN + "r"
+ESCAPE = re.compile(r"_x[0-9A-Fa-f]{4}_")
+ERRORS = {"#NULL!" : 0x00, "#DIV/0!" : 0x07, "#VALUE!" : 0x0F,
+	"#REF!" : 0x17, "#NAME?" : 0x1D, "#NUM!" : 0x24, "#N/A" : 0x2A}
+
+# Workbook archive opened once in every worker process
+opened = dict()
+
+def attach(contents):
+	"""
+	Opens the xlsx contents in a worker process, the contents are
+
+	sent once per worker and not once per sheet
+	"""
+
+	opened["archive"] = zipfile.ZipFile(io.BytesIO(contents))
+
+def column_index(name, columns = dict()):
+	"""
+	Returns the zero based index of a column from a cell name
+	"""
+
+	letters = name.rstrip("0123456789")
+	index = columns.get(letters)
+	if index is None:
+		index = 0
+		for letter in letters.lstrip("$").rstrip("$"):
+			index = index * 26 + ord(letter) - 64
+		index = columns[letters] = index - 1
+	return index
+
+def unescape(text):
+	"""
+	Replaces the _xHHHH_ escapes of an xlsx text with their character
+	"""
+
+	if text and "_" in text:
+		return ESCAPE.sub(lambda match: chr(int(match.group(0)[2:6], 16)), text)
+	return text
+
+def inline_text(element):
+	"""
+	Returns the text of a shared or inline string element, joining
+
+	the runs of a rich text
+	"""
+
+	parts = list()
+	for child in element:
+		if child.tag == TEXT_TAG:
+			parts.append(unescape(child.text) or "")
+		elif child.tag == RUN_TAG:
+			parts.extend(unescape(run.text) or ""
+				for run in child if run.tag == TEXT_TAG)
+	return "".join(parts)
+
+def cell_value(cell):
+	"""
+	Converts a cell element the way xlrd reads it
+
+	Parameters:
+	----------
+		cell : xml.etree.ElementTree.Element
+			Cell element of a sheet
+
+	Return:
+	------
+		kind : str
+			Type of the cell, s for an index in the shared strings,
+			None if xlrd leaves the cell empty
+
+		value : float or int or str
+			Value of the cell
+	"""
+
+	kind = cell.get("t", "n")
+	element = cell.find(VALUE_TAG)
+	text = None if element is None else element.text
+	if kind == "n":
+		return (kind, float(text)) if text else (None, "")
+	if kind == "s":
+		return (kind, int(text)) if text else (None, "")
+	if kind == "str":
+		return kind, unescape(text)
+	if kind == "b":
+		return kind, int(text == "1" or text == "true")
+	if kind == "e":
+		return kind, ERRORS.get(text or "#N/A", 0x2A)
+	if kind == "inlineStr":
+		element = cell.find(STRING_TAG)
+		if element is not None:
+			text = inline_text(element)
+		return (kind, text) if text else (None, "")
+	raise ValueError("Unknown cell type %r" % kind)
+
+def parse_sheet(member, archive = None):
+	"""
+	Reads the work package id and cost cells of a sheet and its size
+
+	Runs in a worker process, the shared strings are resolved by the
+	caller so they are parsed once for all the sheets
+
+	Parameters:
+	----------
+		member : str
+			Path of the sheet XML inside the xlsx archive
+
+		archive : zipfile.ZipFile
+			Opened workbook, the one attached to the worker by default
+
+	Return:
+	------
+		nrows, ncols : int
+			Number of rows and columns as counted by xlrd
+
+		cells : dict
+			Kind and value of every non empty cell of the id and cost
+			columns by column and row
+	"""
+
+	archive = archive or opened["archive"]
+	sheet = ElementTree.fromstring(archive.read(member))
+	nrows = ncols = 0
+	rowx = -1
+	cells = dict((colx, dict()) for colx in COLUMNS)
+	for row in sheet.iter(ROW_TAG):
+		number = row.get("r")
+		rowx = rowx + 1 if number is None else int(number) - 1
+		colx = -1
+		for cell in row:
+			name = cell.get("r")
+			colx = colx + 1 if name is None else column_index(name)
+			kind, value = cell_value(cell)
+			if kind is None:
+				continue
+			if rowx >= nrows:
+				nrows = rowx + 1
+			if colx >= ncols:
+				ncols = colx + 1
+			if colx in cells:
+				cells[colx][rowx] = (kind, value)
+	for merged in sheet.iter(MERGE_TAG):
+		name = merged.get("ref", "").split(":")[-1]
+		if name:
+			ncols = max(ncols, column_index(name) + 1)
+			nrows = max(nrows, int(name.lstrip("$ABCDEFGHIJKLMNOPQRSTUVWXYZ") or 0))
+	return nrows, ncols, cells
+
+class CostSheet:
+	"""
+	A class to represent the id and cost columns of a cost sheet
+
+	with the part of the xlrd sheet interface the indexes use
+
+	Attributes:
+	----------
+		name : str
+			Name of the sheet
+
+		nrows, ncols : int
+			Number of rows and columns of the sheet
+
+		columns : dict
+			Values of the id and cost columns
+
+	Method:
+	------
+		col_values : Returns the values of a column
+	"""
+
+	def __init__(self, name, nrows, ncols, columns):
+		self.name = name
+		self.nrows = nrows
+		self.ncols = ncols
+		self.columns = columns
+
+	def col_values(self, colx, start_rowx = 0, end_rowx = None):
+		"""
+		Returns the values of a column, empty strings for the columns
+
+		which are not read
+		"""
+
+		if colx >= self.ncols:
+			raise IndexError("column index out of range")
+		values = self.columns.get(colx) or [""] * self.nrows
+		return values[start_rowx:end_rowx]
+
+class CostBook:
+	"""
+	A class for opening the cost database from the contents of its
+
+	xlsx file without xlrd reading every cell of it
+
+	Only the work package id and cost columns of the sheets are used.
+	The XML of every sheet is parsed in its own worker process straight
+	from the xlsx contents while the shared strings are parsed in the
+	calling process. A small file or a single processor parses the
+	sheets in the calling process, as starting the workers costs more
+	than it saves, and contents which are not an xlsx workbook are
+	opened by xlrd
+
+	Attributes:
+	----------
+		cost_sheets : list
+			CostSheet of every sheet in the workbook order
+
+	Method:
+	------
+		open : Opens the cost database from its contents
+
+		sheets : Returns the sheets of the workbook
+
+		sheet_names : Returns the names of the sheets
+	"""
+
+	def __init__(self, cost_sheets):
+		self.cost_sheets = cost_sheets
+
+	@property
+	def nsheets(self):
+		return len(self.cost_sheets)
+
+	def sheets(self):
+		return list(self.cost_sheets)
+
+	def sheet_names(self):
+		return [sheet.name for sheet in self.cost_sheets]
+
+	@staticmethod
+	def members(archive):
+		"""
+		Returns the names and XML paths of the worksheets in the
+
+		workbook order
+		"""
+
+		paths = dict()
+		relations = ElementTree.fromstring(
+			archive.read("xl/_rels/workbook.xml.rels"))
+		for relation in relations.iter(PACKAGE + "Relationship"):
+			if relation.get("Type") == WORKSHEET:
+				target = relation.get("Target").replace("\\", "/")
+				paths[relation.get("Id")] = (target[1:]
+					if target.startswith("/") else "xl/" + target)
+
+		workbook = ElementTree.fromstring(archive.read("xl/workbook.xml"))
+		return [(sheet.get("name"), paths[sheet.get(RELATION + "id")])
+			for sheet in workbook.iter(MAIN + "sheet")
+			if sheet.get(RELATION + "id") in paths]
+
+	@staticmethod
+	def shared_strings(archive):
+		"""
+		Returns the shared strings of the workbook
+		"""
+
+		if "xl/sharedStrings.xml" not in archive.namelist():
+			return list()
+		strings = list()
+		with archive.open("xl/sharedStrings.xml") as stream:
+			for event, element in ElementTree.iterparse(stream):
+				if element.tag == MAIN + "si":
+					strings.append(inline_text(element))
+					element.clear()
+		return strings
+
+	@classmethod
+	def open(cls, contents, processes = COST_PROCESSES):
+		"""
+		Opens the cost database from the contents of its file
+
+		Parameters:
+		----------
+			contents : bytes
+				Contents of the cost database file
+
+			processes : int
+				Most worker processes parsing the sheets
+
+		Return:
+		------
+			workbook : CostBook or xlrd.book.Book object
+				Sheets of the cost database
+		"""
+
+		if not zipfile.is_zipfile(io.BytesIO(contents)):
+			return xlrd.open_workbook(file_contents = contents)
+		try:
+			archive = zipfile.ZipFile(io.BytesIO(contents))
+			members = cls.members(archive)
+			processes = min(processes, len(members))
+			parsed = None
+			if processes > 1 and len(contents) >= PARALLEL_BYTES:
+				try:
+					with ProcessPoolExecutor(max_workers = processes,
+							initializer = attach,
+							initargs = (contents,)) as pool:
+						parsing = pool.map(
+							parse_sheet, [member for name, member in members])
+						strings = cls.shared_strings(archive)
+						parsed = list(parsing)
+				except (OSError, RuntimeError) as e:
+					logging.warning(
+						"Cost sheets parsed serially, the workers failed: %s" % e)
+			if parsed is None:
+				strings = cls.shared_strings(archive)
+				parsed = [parse_sheet(member, archive)
+					for name, member in members]
+		except Exception as e:
+			logging.warning("Cost database opened by xlrd: %r" % e)
+			return xlrd.open_workbook(file_contents = contents)
+
+		cost_sheets = list()
+		for (name, member), (nrows, ncols, cells) in zip(members, parsed):
+			columns = dict()
+			for colx, found in cells.items():
+				values = [""] * nrows
+				for rowx, (kind, value) in found.items():
+					values[rowx] = strings[value] if kind == "s" else value
+				columns[colx] = values
+			cost_sheets.append(CostSheet(name, nrows, ncols, columns))
+		return cls(cost_sheets)
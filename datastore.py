@@ -0,0 +1,544 @@
+"""
+A data store module for holding the loaded test and cost databases
+and reloading them in the background when the files change
+"""
+
+__author__ = "Monish Mohanan"
+__version__ = "1.0"
+
+# Importing required libraries
+try:
+	import os
+	import hashlib
+	import logging
+	import threading
+	import traceback
+	import xlrd
+	from instrumentation import tracer
+	from searchbase import CostIndex, TestIndex, TestSearchIndex
+	from costbook import CostBook
+	from localcache import cache
+except ImportError as e:
+	from tkinter import messagebox
+	messagebox.showwarning("Import Error", str(e))
+
+# Defining the necessary constants
+POLL_INTERVAL = 30.0
+FIELDS = ("Test", "Cost")
+
+class FileSignature:
+	"""
+	A class to represent the state of a database file on the disk
+
+	Attributes:
+	----------
+		path : str
+			Location of the database file
+
+		size : int
+			Size of the file in bytes
+
+		mtime : int
+			Modification time of the file in nanoseconds
+
+		digest : str
+			SHA-1 of the file contents, None if it is not computed
+
+	Method:
+	------
+		stat : Reads the size and modification time of a file
+
+		same_stat : Compares the path, size and modification time
+	"""
+
+	__slots__ = ("path", "size", "mtime", "digest")
+
+	def __init__(self, path, size, mtime, digest = None):
+		self.path = path
+		self.size = size
+		self.mtime = mtime
+		self.digest = digest
+
+	@classmethod
+	def stat(cls, path):
+		"""
+		Reads the size and modification time of the file
+
+		Parameters:
+		----------
+			path : str
+				Location of the database file
+
+		Return:
+		------
+			signature : FileSignature
+				Signature without the digest
+		"""
+
+		info = os.stat(path)
+		return cls(path, info.st_size, info.st_mtime_ns)
+
+	def same_stat(self, other):
+		"""
+		Compares the path, size and modification time of two signatures
+		"""
+
+		return (other is not None
+			and self.path == other.path
+			and self.size == other.size
+			and self.mtime == other.mtime)
+
+class DataSnapshot:
+	"""
+	A class to represent a consistent set of loaded databases
+
+	A snapshot is never modified, a reload creates a new one, so a
+	search holding a snapshot finishes on the data it started with
+
+	Attributes:
+	----------
+		workbooks : dict
+			xlrd.book.Book of the test database and costbook.CostBook of
+			the cost database
+
+		signatures : dict
+			FileSignature of the loaded test and cost files
+
+		cost_index : searchbase.CostIndex
+			Work package ids and costs of the cost database
+
+		test_index : searchbase.TestIndex
+			Work package ids and test names of the test database
+
+		search_index : searchbase.TestSearchIndex
+			Typeahead index of the test names and work package ids
+
+	Method:
+	------
+		replace : Returns a new snapshot with a database replaced
+	"""
+
+	def __init__(self, workbooks = None, signatures = None,
+			cost_index = None, test_index = None, search_index = None):
+		self.workbooks = dict(workbooks or {})
+		self.signatures = dict(signatures or {})
+		self.cost_index = cost_index
+		self.test_index = test_index
+		self.search_index = search_index
+
+	@property
+	def test_workbook(self):
+		return self.workbooks.get("Test")
+
+	@property
+	def cost_workbook(self):
+		return self.workbooks.get("Cost")
+
+	def replace(self, field, workbook, signature, **indexes):
+		"""
+		Returns a new snapshot with the database of the field replaced
+
+		Parameters:
+		----------
+			field : str
+				Test or Cost
+
+			workbook : xlrd.book.Book object
+				Newly loaded workbook of the field
+
+			signature : FileSignature
+				Signature of the newly loaded file
+
+			**indexes : dict
+				Rebuilt indexes of the field, cost_index, test_index
+				or search_index
+
+		Return:
+		------
+			snapshot : DataSnapshot
+				Snapshot with the field replaced
+		"""
+
+		workbooks = dict(self.workbooks)
+		signatures = dict(self.signatures)
+		workbooks[field] = workbook
+		signatures[field] = signature
+		return DataSnapshot(
+			workbooks, signatures,
+			indexes.get("cost_index", self.cost_index),
+			indexes.get("test_index", self.test_index),
+			indexes.get("search_index", self.search_index))
+
+class DataStore:
+	"""
+	A class for loading the test and cost databases and swapping in
+
+	reloaded versions while the application is running
+
+	Attributes:
+	----------
+		paths : dict
+			Locations of the test and cost database files
+
+	Method:
+	------
+		read : Reads and fingerprints a database file
+
+		open_workbook : Reads and opens a database file
+
+		load : Loads a database and swaps it into the store
+
+		snapshot : Returns the current snapshot
+
+		swap : Rebuilds the indexes of a database and swaps it in
+
+		set_path : Changes the location of a database file
+
+		check : Reloads a database if its file has changed
+	"""
+
+	def __init__(self, paths):
+		"""
+		Constructs the identifiers of the data store
+
+		Parameters:
+		----------
+			paths : dict
+				Locations of the test and cost database files
+		"""
+
+		self.paths = paths
+		self.current = DataSnapshot()
+		self.lock = threading.Lock()
+		self.loading = dict((field, threading.Lock()) for field in FIELDS)
+
+	@staticmethod
+	def read(path):
+		"""
+		Reads the contents of the database file through the local cache
+
+		and fingerprints them
+
+		Parameters:
+		----------
+			path : str
+				Location of the database file
+
+		Return:
+		------
+			contents : bytes
+				Contents of the database file
+
+			signature : FileSignature
+				Signature of the file including the digest
+		"""
+
+		# Reading the state before the copy, a file changed during the
+		# copy then differs from the signature and is loaded again
+		try:
+			signature = FileSignature.stat(path)
+		except OSError:
+			signature = None
+		local = cache.fetch(path)
+		if signature is None:
+			signature = FileSignature.stat(local)
+			signature.path = path
+		with open(local, "rb") as database:
+			contents = database.read()
+		signature.digest = hashlib.sha1(contents).hexdigest()
+		tracer.count("bytes_read", len(contents))
+		return contents, signature
+
+	@staticmethod
+	def open_workbook(path, contents = None, signature = None):
+		"""
+		Reads the database file once, fingerprints its contents and
+
+		opens the workbook from the contents in memory
+
+		Parameters:
+		----------
+			path : str
+				Location of the database file
+
+			contents : bytes
+				Contents already read by DataStore.read, if any
+
+			signature : FileSignature
+				Signature of the contents already read, if any
+
+		Return:
+		------
+			workbook : xlrd.book.Book object
+				Workbook object of the database file
+
+			signature : FileSignature
+				Signature of the loaded file including the digest
+		"""
+
+		with tracer.span("workbook_load") as span:
+			if contents is None:
+				contents, signature = DataStore.read(path)
+			workbook = xlrd.open_workbook(file_contents = contents)
+			span.count("rows_loaded", sum(
+				sheet.nrows for sheet in workbook.sheets()))
+		return workbook, signature
+
+	@staticmethod
+	def open_cost_workbook(path, contents = None, signature = None):
+		"""
+		Reads the cost database file once, fingerprints its contents
+
+		and opens the id and cost columns of its sheets in memory
+
+		Parameters:
+		----------
+			path : str
+				Location of the cost database file
+
+			contents : bytes
+				Contents already read by DataStore.read, if any
+
+			signature : FileSignature
+				Signature of the contents already read, if any
+
+		Return:
+		------
+			workbook : costbook.CostBook object
+				Sheets of the cost database file
+
+			signature : FileSignature
+				Signature of the loaded file including the digest
+		"""
+
+		with tracer.span("workbook_load") as span:
+			if contents is None:
+				contents, signature = DataStore.read(path)
+			workbook = CostBook.open(contents)
+			span.count("rows_loaded", sum(
+				sheet.nrows for sheet in workbook.sheets()))
+		return workbook, signature
+
+	@staticmethod
+	def opener(field):
+		"""
+		Returns the function opening the database file of the field
+		"""
+
+		if field == "Cost":
+			return DataStore.open_cost_workbook
+		return DataStore.open_workbook
+
+	def snapshot(self):
+		"""
+		Returns the current snapshot of the loaded databases
+		"""
+
+		return self.current
+
+	def load(self, field, loader = None):
+		"""
+		Loads the database of the field, rebuilds its indexes and
+
+		swaps it into the store
+
+		Parameters:
+		----------
+			field : str
+				Test or Cost
+
+			loader : function
+				Returns the workbook and signature of a path,
+				DataStore.opener of the field by default
+
+		Return:
+		------
+			snapshot : DataSnapshot
+				Snapshot containing the loaded database
+		"""
+
+		loader = loader or DataStore.opener(field)
+		with self.loading[field]:
+			path = self.paths[field]
+			workbook, signature = loader(path)
+			return self.swap(field, workbook, signature)
+
+	def swap(self, field, workbook, signature):
+		"""
+		Rebuilds the indexes of the field and replaces the snapshot
+
+		Parameters:
+		----------
+			field : str
+				Test or Cost
+
+			workbook : xlrd.book.Book object
+				Loaded workbook of the field
+
+			signature : FileSignature
+				Signature of the loaded file
+
+		Return:
+		------
+			snapshot : DataSnapshot
+				Snapshot containing the loaded database
+		"""
+
+		indexes = dict()
+		if field == "Test":
+			with tracer.span("test_index"):
+				indexes["test_index"] = TestIndex(workbook)
+			with tracer.span("search_index"):
+				indexes["search_index"] = TestSearchIndex(
+					indexes["test_index"])
+		if field == "Cost":
+			with tracer.span("cost_index"):
+				indexes["cost_index"] = CostIndex(
+					workbook, self.current.cost_index)
+			if indexes["cost_index"].conflicts:
+				logging.warning(
+					"%d work packages have different costs in several "
+					"sheets of the cost database, the last sheet is used" % (
+						len(indexes["cost_index"].conflicts)))
+
+		with self.lock:
+			self.current = self.current.replace(
+				field, workbook, signature, **indexes)
+			return self.current
+
+	def set_path(self, field, path):
+		"""
+		Changes the location of the database, the watcher loads the
+
+		new file on its next check
+
+		Parameters:
+		----------
+			field : str
+				Test or Cost
+
+			path : str
+				New location of the database file
+
+		Return:
+		------
+			None
+		"""
+
+		self.paths[field] = path
+
+	def check(self, field):
+		"""
+		Reloads the database of the field if the file has changed
+
+		A changed size or modification time is confirmed against the
+		digest of the contents before the workbook is parsed again
+
+		Parameters:
+		----------
+			field : str
+				Test or Cost
+
+		Return:
+		------
+			reloaded : bool
+				True if a new version has been swapped in
+		"""
+
+		loaded = self.current.signatures.get(field)
+		if loaded is None:
+			return False
+
+		# The loaded version stays in use while the file is not reachable
+		path = self.paths[field]
+		try:
+			signature = FileSignature.stat(path)
+		except OSError:
+			return False
+		if signature.same_stat(loaded):
+			return False
+
+		with self.loading[field], tracer.span("workbook_reload"):
+			contents, signature = DataStore.read(path)
+			if path == loaded.path and signature.digest == loaded.digest:
+				with self.lock:
+					self.current = self.current.replace(
+						field, self.current.workbooks[field], signature)
+				return False
+			workbook, signature = DataStore.opener(field)(
+				path, contents, signature)
+			self.swap(field, workbook, signature)
+
+		logging.warning("%s database reloaded from %s" % (field, path))
+		return True
+
+class WorkbookWatcher(threading.Thread):
+	"""
+	A background thread polling the database files and reloading
+
+	them in the data store when they change
+
+	Attributes:
+	----------
+		store : DataStore
+			Data store to be kept up to date
+
+		interval : float
+			Seconds between two checks
+
+	Method:
+	------
+		run : Polls the database files until stopped
+
+		poke : Triggers a check without waiting for the interval
+
+		stop : Stops the watcher
+	"""
+
+	def __init__(self, store, interval = POLL_INTERVAL):
+		"""
+		Constructs the identifiers of the watcher
+
+		Parameters:
+		----------
+			store : DataStore
+				Data store to be kept up to date
+
+			interval : float
+				Seconds between two checks
+		"""
+
+		threading.Thread.__init__(self, name = "WorkbookWatcher", daemon = True)
+		self.store = store
+		self.interval = interval
+		self.wake = threading.Event()
+		self.stopped = False
+
+	def run(self):
+		"""
+		Checks the test and cost database files until stopped
+		"""
+
+		while not self.stopped:
+			self.wake.wait(self.interval)
+			self.wake.clear()
+			for field in FIELDS:
+				try:
+					self.store.check(field)
+				except Exception:
+					logging.error(traceback.format_exc())
+
+	def poke(self):
+		"""
+		Triggers a check without waiting for the interval
+		"""
+
+		self.wake.set()
+
+	def stop(self):
+		"""
+		Stops the watcher after the running check
+		"""
+
+		self.stopped = True
+		self.wake.set()
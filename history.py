@@ -0,0 +1,318 @@
+"""
+A history module for searching the earlier generated templates
+recorded in the report database and its archives, by their text or
+by the fingerprint of their contents
+"""
+
+__author__ = "Monish Mohanan"
+__version__ = "1.0"
+
+# Importing required libraries
+try:
+	import re
+	import os
+	import sqlite3
+	import hashlib
+	from urllib.request import pathname2url
+	from models import UsageRecord
+	from localcache import cache
+except ImportError as e:
+	from tkinter import messagebox
+	messagebox.showwarning("Import Error", str(e))
+
+# Defining the necessary constants
+SEARCH_LIMIT = 50
+SEARCH_COLUMNS = (
+	"Requester", "Creator", "Changetype", "Subassembly", "Partname",
+	"Comment", "TestNames")
+SEARCH_TABLE = '''CREATE VIRTUAL TABLE IF NOT EXISTS RecordSearch
+	USING fts5(%s, prefix = '2 3')''' % ", ".join(SEARCH_COLUMNS)
+FINGERPRINT_INDEX = '''CREATE UNIQUE INDEX IF NOT EXISTS
+	RecordFingerprint ON Record(Fingerprint)'''
+
+class RecordIndex:
+	"""
+	A class for the FTS5 index of the usage records
+
+	The index lives in the report database next to the Record table and
+	shares its IDs, a row is inserted in the same transaction as its
+	record. The comment and the test names of a template are only
+	indexed, they are not stored in the Record table
+
+	Attributes:
+	----------
+		path : str
+			Location of the report database or of its replica
+
+		archive : archive.ReportArchive
+			Yearly archives of the report database, if any
+
+	Method:
+	------
+		ensure : Creates the index, indexing the existing records
+
+		index : Indexes a new record
+
+		expression : Returns the FTS5 query of a text
+
+		search : Returns the best matching records of a text
+	"""
+
+	def __init__(self, path, archive = None):
+		"""
+		Constructs the identifiers of the index
+
+		Parameters:
+		----------
+			path : str
+				Location of the report database or of its replica
+
+			archive : archive.ReportArchive
+				Yearly archives of the report database, if any
+		"""
+
+		self.path = path
+		self.archive = archive
+
+	@staticmethod
+	def ensure(cursor):
+		"""
+		Creates the index unless it exists and indexes the records
+
+		inserted before it, without their comments and test names
+		"""
+
+		cursor.execute('''SELECT name FROM sqlite_master
+			WHERE type = ? AND name = ?''', ("table", "RecordSearch"))
+		if cursor.fetchone():
+			return
+		cursor.execute(SEARCH_TABLE)
+		cursor.execute('''INSERT INTO RecordSearch(rowid, %s)
+			SELECT ID, %s, '', '' FROM Record''' % (
+				", ".join(SEARCH_COLUMNS), ", ".join(SEARCH_COLUMNS[:5])))
+
+	@staticmethod
+	def index(cursor, record_id, values):
+		"""
+		Indexes the record inserted with the given ID
+
+		Parameters:
+		----------
+			cursor : sqlite3.Cursor
+				Cursor of the report database
+
+			record_id : int
+				ID of the record in the Record table
+
+			values : dict
+				Values of the record, with its Comment and TestNames
+
+		Return:
+		------
+			None
+		"""
+
+		cursor.execute('''INSERT INTO RecordSearch(rowid, %s)
+			VALUES(?, %s)''' % (
+				", ".join(SEARCH_COLUMNS), ", ".join("?" * len(SEARCH_COLUMNS))),
+			[record_id] + [str(values.get(column) or "")
+				for column in SEARCH_COLUMNS])
+
+	@staticmethod
+	def expression(text):
+		"""
+		Returns the FTS5 query matching every word of the text as a
+
+		prefix, e.g. solenoid spr gives "solenoid"* AND "spr"*
+		"""
+
+		words = re.findall(r"\w+", text)
+		return " AND ".join('"%s"*' % word for word in words)
+
+	def search(self, text, limit = SEARCH_LIMIT):
+		"""
+		Returns the records best matching the text in the report
+
+		database and in its archives
+
+		Parameters:
+		----------
+			text : str
+				Words typed by the user
+
+			limit : int
+				Maximum number of records
+
+		Return:
+		------
+			hits : list
+				UsageRecord of the best matching records, best first
+		"""
+
+		expression = RecordIndex.expression(text)
+		if not expression:
+			return list()
+
+		connection = sqlite3.connect(self.path)
+		try:
+			schemas = ["main"]
+			if self.archive is not None:
+				schemas += self.archive.attach(connection)
+			queries, parameters = list(), list()
+			for schema in schemas:
+				if not connection.execute('''SELECT name FROM %s.sqlite_master
+						WHERE type = ? AND name = ?''' % schema,
+						("table", "RecordSearch")).fetchone():
+					continue
+				queries.append('''SELECT %s, Rank FROM %s.Record JOIN
+					(SELECT rowid AS Hit, rank AS Rank FROM %s.RecordSearch
+					WHERE RecordSearch MATCH ?) ON ID = Hit''' % (
+						", ".join(UsageRecord.COLUMNS), schema, schema))
+				parameters.append(expression)
+			if not queries:
+				return list()
+
+			rows = connection.execute('''%s ORDER BY Rank LIMIT ?''' % (
+				" UNION ALL ".join(queries)), parameters + [limit]).fetchall()
+		finally:
+			connection.close()
+		return [UsageRecord(*row[:-1]) for row in rows]
+
+class RecordFingerprint:
+	"""
+	A class for the fingerprints identifying the contents of the records
+
+	A fingerprint digests the change type, the subassembly, the part,
+	the tests and the version of the cost database of a template. The
+	Fingerprint column of the Record table has a unique index and only
+	the latest record of a fingerprint keeps it, so finding the template
+	already generated for a request is a point query
+
+	Method:
+	------
+		compute : Returns the fingerprint of a template
+
+		ensure : Adds the fingerprint column and its unique index
+
+		assign : Moves a fingerprint to a new record
+
+		lookup : Returns the latest record of a fingerprint
+	"""
+
+	@staticmethod
+	def compute(change_type, subassembly, part, items, cost_version):
+		"""
+		Returns the fingerprint of the contents of a template
+
+		Parameters:
+		----------
+			change_type, subassembly, part : str
+				Combination of the template
+
+			items : list
+				TestItem of every test of the template
+
+			cost_version : str
+				SHA-1 digest of the loaded cost database
+
+		Return:
+		------
+			fingerprint : str
+				SHA-1 of the contents
+		"""
+
+		tests = sorted("%s:%s" % (item.wpid, item.name) for item in items)
+		contents = "\x1f".join(
+			[change_type, subassembly, part, cost_version] + tests)
+		return hashlib.sha1(contents.encode("utf-8")).hexdigest()
+
+	@staticmethod
+	def ensure(cursor):
+		"""
+		Adds the fingerprint column to the Record table unless it exists
+
+		and creates its unique index
+		"""
+
+		cursor.execute('''PRAGMA table_info(Record)''')
+		if "Fingerprint" not in [row[1] for row in cursor.fetchall()]:
+			cursor.execute('''ALTER TABLE Record ADD COLUMN Fingerprint TEXT''')
+		cursor.execute(FINGERPRINT_INDEX)
+
+	@staticmethod
+	def assign(cursor, record_id, fingerprint):
+		"""
+		Moves the fingerprint from the earlier record having it, if any,
+
+		to the record inserted with the given ID
+
+		Parameters:
+		----------
+			cursor : sqlite3.Cursor
+				Cursor of the report database
+
+			record_id : int
+				ID of the record in the Record table
+
+			fingerprint : str
+				Fingerprint of the record, None if it has none
+
+		Return:
+		------
+			None
+		"""
+
+		if fingerprint is None:
+			return
+		cursor.execute('''UPDATE Record SET Fingerprint = NULL
+			WHERE Fingerprint = ?''', (fingerprint,))
+		cursor.execute('''UPDATE Record SET Fingerprint = ? WHERE ID = ?''',
+			(fingerprint, record_id))
+
+	@staticmethod
+	def lookup(report, fingerprint):
+		"""
+		Returns the latest record of the fingerprint whose template can
+
+		still be opened. The local replica is queried while the report
+		database is not reachable
+
+		Parameters:
+		----------
+			report : str
+				Location of the report database
+
+			fingerprint : str
+				Fingerprint of the requested template
+
+		Return:
+		------
+			record : models.UsageRecord
+				Record of the template, None if there is none
+		"""
+
+		if fingerprint is None:
+			return None
+
+		try:
+			connection = sqlite3.connect(
+				"file:%s?mode=ro" % pathname2url(os.path.abspath(report)),
+				uri = True)
+		except sqlite3.Error:
+			try:
+				connection = sqlite3.connect(cache.replica(report))
+			except (OSError, sqlite3.Error):
+				return None
+
+		try:
+			records = UsageRecord.fetch(
+				connection.cursor(), "WHERE Fingerprint = ?", (fingerprint,))
+		except sqlite3.Error:
+			# The report database has no fingerprints yet
+			return None
+		finally:
+			connection.close()
+		for record in records:
+			if record.link and os.path.exists(record.link):
+				return record
+		return None
@@ -0,0 +1,366 @@
+"""
+An impact module for computing the number of tests and the total cost
+of every combination of subassembly or part and change type at once
+"""
+
+__author__ = "Monish Mohanan"
+__version__ = "1.0"
+
+# Importing required libraries
+try:
+	import os
+	import csv
+	import sqlite3
+	from fpdf import FPDF
+	from instrumentation import tracer
+	from localcache import CACHE_FOLDER
+except ImportError as e:
+	from tkinter import messagebox
+	messagebox.showwarning("Import Error", str(e))
+
+# The XLSX export is only offered if openpyxl is installed
+try:
+	import openpyxl
+except ImportError:
+	openpyxl = None
+
+# Defining the necessary constants
+IMPACT_DATABASE = CACHE_FOLDER + "impact.db"
+IMPACT_FOLDER = "report/"
+IMPACT_NAME = "Test Cost Impact Matrix"
+IMPACT_TABLE = '''CREATE TABLE IF NOT EXISTS Impact(
+	TestDigest TEXT NOT NULL,
+	CostDigest TEXT NOT NULL,
+	ChangeType INTEGER NOT NULL,
+	Subassembly TEXT NOT NULL,
+	Part TEXT NOT NULL,
+	Position INTEGER NOT NULL,
+	Tests INTEGER NOT NULL,
+	Cost REAL NOT NULL,
+	Missing INTEGER NOT NULL
+	)'''
+IMPACT_INDEX = '''CREATE INDEX IF NOT EXISTS ImpactVersion
+	ON Impact(TestDigest, CostDigest)'''
+HEADINGS = (
+	"Change Type", "Subassembly", "Part Name", "Column",
+	"Tests", "Total Cost (EUR)", "Missing")
+
+class ImpactRow:
+	"""
+	A class to represent the impact of a change type on a subassembly
+
+	or a part
+
+	Attributes:
+	----------
+		change_type : int
+			Number of the change type
+
+		subassembly, part : str
+			Subassembly and part name, NA for the whole subassembly
+
+		column : int
+			Search column in the test database
+
+		tests : int
+			Number of tests of the combination
+
+		cost : float
+			Total cost of the tests with a known cost
+
+		missing : int
+			Number of tests without a work package id or a cost
+	"""
+
+	__slots__ = (
+		"change_type", "subassembly", "part", "column",
+		"tests", "cost", "missing")
+
+	def __init__(self, change_type, subassembly, part, column,
+			tests = 0, cost = 0.0, missing = 0):
+		self.change_type = change_type
+		self.subassembly = subassembly
+		self.part = part
+		self.column = column
+		self.tests = tests
+		self.cost = cost
+		self.missing = missing
+
+	def values(self):
+		return (self.change_type, self.subassembly, self.part, self.column,
+			self.tests, round(self.cost, 2), self.missing)
+
+class ImpactMatrix:
+	"""
+	A class for computing, caching and exporting the impact matrix
+
+	Every search column is read once, the change type bitmasks of its
+	rows are split over all the change types in the same pass. The
+	matrix is kept in a cache table per version of the test and cost
+	files and is computed again only when one of them changes
+
+	Attributes:
+	----------
+		snapshot : datastore.DataSnapshot
+			Loaded test and cost databases
+
+		info : infobase.InfoBase
+			Change types, subassemblies and parts
+
+		path : str
+			Location of the cache database
+
+	Method:
+	------
+		combinations : Returns the subassemblies and parts to compute
+
+		compute : Computes the matrix from the loaded databases
+
+		load : Returns the cached matrix or computes it
+
+		store : Caches the matrix
+
+		export_csv : Writes the matrix as CSV
+
+		export_xlsx : Writes the matrix as XLSX
+
+		export_pdf : Writes the matrix as PDF
+
+		export : Writes the matrix in every available format
+	"""
+
+	def __init__(self, snapshot, info, path = IMPACT_DATABASE):
+		"""
+		Constructs the identifiers of the impact matrix
+
+		Parameters:
+		----------
+			snapshot : datastore.DataSnapshot
+				Loaded test and cost databases
+
+			info : infobase.InfoBase
+				Change types, subassemblies and parts
+
+			path : str
+				Location of the cache database
+		"""
+
+		self.snapshot = snapshot
+		self.info = info
+		self.path = path
+		self.versions = tuple(
+			snapshot.signatures[field].digest for field in ("Test", "Cost"))
+		self.rows = list()
+
+	def combinations(self):
+		"""
+		Returns every subassembly and every part with its search column
+
+		Parameters:
+		----------
+			None
+
+		Return:
+		------
+			combinations : list
+				(subassembly, part, column) of every selection
+		"""
+
+		combinations = list()
+		for subassembly, column in self.info.subassemblies.items():
+			combinations.append((subassembly, "NA", column))
+			parts = self.info.subassembly_and_parts.get(subassembly, dict())
+			for part, position in parts.items():
+				combinations.append((subassembly, part, position))
+		return combinations
+
+	def compute(self):
+		"""
+		Computes the number of tests and the total cost of every
+
+		combination from the loaded databases
+
+		Parameters:
+		----------
+			None
+
+		Return:
+		------
+			rows : list
+				ImpactRow of every combination and change type
+		"""
+
+		test_index = self.snapshot.test_index
+		costs = self.snapshot.cost_index.costs
+		changes = [(number, 1 << number)
+			for number in sorted(self.info.change_types)]
+
+		# Resolving the cost of every test once for all the combinations
+		prices = [None if item.wpid is None else costs.get(item.wpid)
+			for item in test_index.items]
+
+		rows = list()
+		with tracer.span("impact_matrix") as span:
+			for subassembly, part, column in self.combinations():
+				cells = dict((number, ImpactRow(
+					number, subassembly, part, column))
+					for number, bit in changes)
+				for mask, price in zip(test_index.column(column - 1), prices):
+					if not mask:
+						continue
+					for number, bit in changes:
+						if mask & bit:
+							cell = cells[number]
+							cell.tests += 1
+							if price is None:
+								cell.missing += 1
+							else:
+								cell.cost += price
+				rows.extend(cells[number] for number, bit in changes)
+			span.count("combinations", len(rows))
+		self.rows = rows
+		return rows
+
+	def load(self):
+		"""
+		Returns the cached matrix of the loaded versions of the test
+
+		and cost files, computing and caching it if there is none
+
+		Parameters:
+		----------
+			None
+
+		Return:
+		------
+			rows : list
+				ImpactRow of every combination and change type
+		"""
+
+		os.makedirs(os.path.dirname(self.path) or ".", exist_ok = True)
+		cache = sqlite3.connect(self.path)
+		try:
+			cache.execute(IMPACT_TABLE)
+			cache.execute(IMPACT_INDEX)
+			rows = cache.execute('''SELECT ChangeType, Subassembly, Part,
+				Position, Tests, Cost, Missing FROM Impact
+				WHERE TestDigest = ? AND CostDigest = ?
+				ORDER BY rowid''', self.versions).fetchall()
+		finally:
+			cache.close()
+
+		if rows:
+			self.rows = [ImpactRow(*row) for row in rows]
+		else:
+			self.store(self.compute())
+		return self.rows
+
+	def store(self, rows):
+		"""
+		Replaces the cached matrix by the given rows
+
+		Parameters:
+		----------
+			rows : list
+				ImpactRow of every combination and change type
+
+		Return:
+		------
+			None
+		"""
+
+		cache = sqlite3.connect(self.path)
+		try:
+			with cache:
+				cache.execute(IMPACT_TABLE)
+				cache.execute('''DELETE FROM Impact''')
+				cache.executemany('''INSERT INTO Impact(TestDigest,
+					CostDigest, ChangeType, Subassembly, Part, Position,
+					Tests, Cost, Missing) VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+					[self.versions + row.values() for row in rows])
+		finally:
+			cache.close()
+
+	def export_csv(self, path):
+		"""
+		Writes the matrix to a CSV file
+		"""
+
+		with open(path, "w", newline = "") as output:
+			writer = csv.writer(output)
+			writer.writerow(HEADINGS)
+			writer.writerows(row.values() for row in self.rows)
+
+	def export_xlsx(self, path):
+		"""
+		Writes the matrix to an XLSX file
+		"""
+
+		workbook = openpyxl.Workbook()
+		sheet = workbook.active
+		sheet.title = "Impact"
+		sheet.append(HEADINGS)
+		for row in self.rows:
+			sheet.append(row.values())
+		workbook.save(path)
+
+	def export_pdf(self, path):
+		"""
+		Writes the matrix to a PDF file, one table per change type
+		"""
+
+		widths = (60, 60, 20, 25, 40, 25)
+		pdf = FPDF(orientation = 'P', unit = 'mm', format = 'A4')
+		pdf.add_page()
+		pdf.set_font("Arial", "B", size = 12)
+		pdf.cell(190, 10, txt = IMPACT_NAME, align = 'C')
+		pdf.ln()
+
+		for number, change in sorted(self.info.change_types.items()):
+			pdf.ln(4)
+			pdf.set_font("Arial", "B", size = 10)
+			pdf.cell(sum(widths), 8, txt = change, border = 1)
+			pdf.ln()
+			pdf.set_font("Arial", "B", size = 8)
+			for heading, width in zip(HEADINGS[1:], widths):
+				pdf.cell(width, 7, txt = heading, align = 'C', border = 1)
+			pdf.ln()
+			pdf.set_font("Arial", size = 8)
+			for row in self.rows:
+				if row.change_type != number:
+					continue
+				for value, width in zip(row.values()[1:], widths):
+					if isinstance(value, float):
+						value = "%.2f" % value
+					pdf.cell(width, 6, txt = str(value), align = 'C', border = 1)
+				pdf.ln()
+		pdf.output(path)
+
+	def export(self, folder = IMPACT_FOLDER):
+		"""
+		Writes the matrix as CSV, PDF and, if openpyxl is installed,
+
+		XLSX to the folder
+
+		Parameters:
+		----------
+			folder : str
+				Location of the exported files
+
+		Return:
+		------
+			paths : list
+				Locations of the exported files
+		"""
+
+		os.makedirs(folder, exist_ok = True)
+		exports = [("csv", self.export_csv), ("pdf", self.export_pdf)]
+		if openpyxl is not None:
+			exports.append(("xlsx", self.export_xlsx))
+
+		paths = list()
+		for extension, export in exports:
+			path = os.path.join(folder, ".".join((IMPACT_NAME, extension)))
+			export(path)
+			paths.append(path)
+		return paths
@@ -0,0 +1,100 @@
+"""
+An info module for loading the change types, subassemblies, parts,
+users and paths of the application from the primary database info.db
+"""
+
+__author__ = "Monish Mohanan"
+__version__ = "1.0"
+
+# Importing required libraries
+try:
+	import sqlite3
+except ImportError as e:
+	from tkinter import messagebox
+	messagebox.showwarning("Import Error", str(e))
+
+# Defining the necessary constants
+INFO_DATABASE = "database/info.db"
+PART_TABLES = (
+	"Subassembly_1", "Subassembly_2",
+	"Subassembly_3", "Subassembly_4",
+	"Subassembly_5", "Subassembly_6",
+	)
+
+class InfoBase:
+	"""
+	A class for loading the contents of the primary database
+
+	Attributes:
+	----------
+		path : str
+			Location of the primary database
+
+	Method:
+	------
+		search_column : Returns the test database column of a selection
+	"""
+
+	def __init__(self, path = INFO_DATABASE):
+		"""
+		Queries the primary database and assigns its contents
+
+		Parameters:
+		----------
+			path : str
+				Location of the primary database
+		"""
+
+		info = sqlite3.connect(path)
+		try:
+			cur = info.cursor()
+			cur.execute('''SELECT Number, Changes FROM ChangeTypes''')
+			self.change_types = dict((col[0], col[1]) for col in cur.fetchall())
+			cur.execute('''SELECT Name, Position FROM subAssembly''')
+			self.subassemblies = dict(
+				(col[0], col[1]) for col in cur.fetchall())
+			partlist = list()
+			for table in PART_TABLES:
+				cur.execute('''SELECT PartName, Position FROM %s''' % table)
+				partlist.append(dict((col[0], col[1]) for col in cur.fetchall()))
+			cur.execute('''SELECT Name FROM Requesters''')
+			self.requesters = [col[0] for col in cur.fetchall()]
+			cur.execute('''SELECT Name FROM Creators''')
+			self.creators = [col[0] for col in cur.fetchall()]
+			cur.execute('''SELECT Name, Path FROM Databases''')
+			self.databases = dict((col[0], col[1]) for col in cur.fetchall())
+			cur.execute('''SELECT Name, Path FROM Storage''')
+			self.records = dict((col[0], col[1]) for col in cur.fetchall())
+		finally:
+			info.close()
+
+		# Pairing the subassemblies with their parts
+		self.subassembly_keys = list(self.subassemblies.keys())
+		required_keys = tuple(
+			self.subassembly_keys[val] for val in range(len(PART_TABLES)))
+		self.subassembly_and_parts = dict(
+			(key, value) for key, value in zip(required_keys, partlist))
+
+	def search_column(self, subassembly, part = None):
+		"""
+		Returns the test database column of the subassembly, or of the
+
+		part if one is selected
+
+		Parameters:
+		----------
+			subassembly : str
+				Selected subassembly
+
+			part : str
+				Selected part, empty or None for the whole subassembly
+
+		Return:
+		------
+			column : int
+				Search column in the test database
+		"""
+
+		if part:
+			return self.subassembly_and_parts[subassembly][part]
+		return self.subassemblies[subassembly]
@@ -0,0 +1,470 @@
+"""
+An instrumentation module for timing the stages of the Test and Cost
+Template application and exporting the measurements
+"""
+
+__author__ = "Monish Mohanan"
+__version__ = "1.0"
+
+# Importing required libraries
+try:
+	import os
+	import json
+	import logging
+	import threading
+	import time
+	from contextlib import contextmanager
+	from datetime import datetime
+except ImportError as e:
+	from tkinter import messagebox
+	messagebox.showwarning("Import Error", str(e))
+
+# Defining the necessary constants
+TRACE_ENABLED = os.environ.get("TESTCOSTAPP_TRACE", "1") != "0"
+TRACE_FILE = "TestCostApp.trace.log"
+SLOW_REQUEST_THRESHOLD = 3.0
+
+class Span:
+	"""
+	A class to represent a single timed stage of the application
+
+	Attributes:
+	----------
+		name : str
+			Name of the stage being timed
+
+		parent : Span
+			Enclosing stage, None for a top level request
+
+	Method:
+	------
+		count : Increments a counter of the stage
+
+		find : Returns the first nested stage with the given name
+
+		as_dict : Returns the stage and its children as a dictionary
+
+		breakdown : Returns the stage tree as readable lines
+	"""
+
+	def __init__(self, name, parent = None):
+		"""
+		Constructs the identifiers of the timed stage
+
+		Parameters:
+		----------
+			name : str
+				Name of the stage being timed
+
+			parent : Span
+				Enclosing stage, None for a top level request
+		"""
+
+		self.name = name
+		self.parent = parent
+		self.started = datetime.now()
+		self.start = time.perf_counter()
+		self.end = None
+		self.counters = dict()
+		self.children = list()
+
+	@property
+	def duration(self):
+		"""
+		Elapsed seconds of the stage, measured up to now if it is open
+		"""
+
+		end = self.end if self.end is not None else time.perf_counter()
+		return end - self.start
+
+	def count(self, counter, value = 1):
+		"""
+		Increments the counter of the stage by the given value
+
+		Parameters:
+		----------
+			counter : str
+				Name of the counter e.g. rows_scanned
+
+			value : int
+				Amount to be added to the counter
+
+		Return:
+		------
+			None
+		"""
+
+		self.counters[counter] = self.counters.get(counter, 0) + value
+
+	def find(self, name):
+		"""
+		Returns the first stage with the given name in the tree
+
+		Parameters:
+		----------
+			name : str
+				Name of the stage to look for
+
+		Return:
+		------
+			span : Span
+				Matching stage or None if it was not recorded
+		"""
+
+		if self.name == name:
+			return self
+		for child in self.children:
+			span = child.find(name)
+			if span is not None:
+				return span
+		return None
+
+	def as_dict(self):
+		"""
+		Returns the stage and its children as a dictionary
+		"""
+
+		return {
+			"name" : self.name,
+			"started" : self.started.isoformat(timespec = "milliseconds"),
+			"duration" : round(self.duration, 6),
+			"counters" : self.counters,
+			"children" : [child.as_dict() for child in self.children]
+			}
+
+	def breakdown(self, depth = 0):
+		"""
+		Returns the stage tree as indented lines of text
+
+		Parameters:
+		----------
+			depth : int
+				Indentation level of the stage
+
+		Return:
+		------
+			lines : list
+				Readable lines with durations and counters
+		"""
+
+		counters = ", ".join(
+			"%s=%s" % (key, value) for key, value in self.counters.items())
+		lines = ["%s%s: %.3fs %s" % (
+			"  " * depth, self.name, self.duration, counters)]
+		for child in self.children:
+			lines.extend(child.breakdown(depth + 1))
+		return lines
+
+class NullSpan:
+	"""
+	A stand-in for Span used while the instrumentation is disabled
+	"""
+
+	name = None
+	duration = 0.0
+	counters = dict()
+	children = list()
+
+	def count(self, counter, value = 1):
+		pass
+
+	def find(self, name):
+		return None
+
+NULL_SPAN = NullSpan()
+
+class JsonLinesExporter:
+	"""
+	A class for writing the finished requests to a local file, one
+
+	JSON document per line
+
+	Attributes:
+	----------
+		path : str
+			Location of the trace file
+
+	Method:
+	------
+		export : Appends the request to the trace file
+	"""
+
+	def __init__(self, path):
+		"""
+		Constructs the identifiers of the exporter
+
+		Parameters:
+		----------
+			path : str
+				Location of the trace file
+		"""
+
+		self.path = path
+		self.lock = threading.Lock()
+
+	def export(self, span):
+		"""
+		Appends the finished request to the trace file
+
+		Parameters:
+		----------
+			span : Span
+				Top level stage of the request
+
+		Return:
+		------
+			None
+		"""
+
+		line = json.dumps(span.as_dict())
+		try:
+			with self.lock:
+				with open(self.path, "a") as trace:
+					trace.write(line + "\n")
+		except OSError:
+			logging.error("Trace could not be written to %s" % self.path)
+
+class Tracer:
+	"""
+	A class for recording nestable timing spans per thread
+
+	Attributes:
+	----------
+		exporter : JsonLinesExporter
+			Destination of the finished requests, None to skip export
+
+		threshold : float
+			Duration in seconds above which a request is logged as slow
+
+		enabled : bool
+			Switches the instrumentation on or off
+
+	Method:
+	------
+		span : Context manager timing a stage of the request
+
+		detached : Context manager timing a concurrent stage
+
+		count : Increments a counter of the current stage
+
+		adopt : Moves the stages of a finished span under the current stage
+
+		current : Returns the innermost open stage
+
+		last : Returns the last finished request with the given name
+
+		mark_ready : Records the time taken for the application to be ready
+	"""
+
+	def __init__(self, exporter = None, threshold = SLOW_REQUEST_THRESHOLD,
+			enabled = TRACE_ENABLED):
+		"""
+		Constructs the identifiers of the tracer
+
+		Parameters:
+		----------
+			exporter : JsonLinesExporter
+				Destination of the finished requests
+
+			threshold : float
+				Duration in seconds above which a request is logged as slow
+
+			enabled : bool
+				Switches the instrumentation on or off
+		"""
+
+		self.exporter = exporter
+		self.threshold = threshold
+		self.enabled = enabled
+		self.local = threading.local()
+		self.created = time.perf_counter()
+		self.ready = None
+		self.finished = dict()
+
+	def current(self):
+		"""
+		Returns the innermost open stage of the calling thread
+		"""
+
+		stack = getattr(self.local, "stack", None)
+		if not self.enabled or not stack:
+			return NULL_SPAN
+		return stack[-1]
+
+	def last(self, name):
+		"""
+		Returns the last finished request with the given name
+
+		Parameters:
+		----------
+			name : str
+				Name of the top level stage e.g. search
+
+		Return:
+		------
+			span : Span
+				Finished request or None if there is none yet
+		"""
+
+		return self.finished.get(name)
+
+	def mark_ready(self):
+		"""
+		Records the seconds elapsed since start up, keeping the latest
+
+		mark when several loaders finish one after the other
+
+		Parameters:
+		----------
+			None
+
+		Return:
+		------
+			None
+		"""
+
+		elapsed = time.perf_counter() - self.created
+		if self.ready is None or elapsed > self.ready:
+			self.ready = elapsed
+
+	def count(self, counter, value = 1):
+		"""
+		Increments the counter of the innermost open stage
+
+		Parameters:
+		----------
+			counter : str
+				Name of the counter e.g. rows_scanned
+
+			value : int
+				Amount to be added to the counter
+
+		Return:
+		------
+			None
+		"""
+
+		self.current().count(counter, value)
+
+	def adopt(self, span):
+		"""
+		Moves the nested stages of a span finished in another thread
+
+		under the innermost open stage, e.g. a search run ahead of time
+		is timed as part of the request that uses it
+
+		Parameters:
+		----------
+			span : Span
+				Finished stage whose children are moved
+
+		Return:
+		------
+			None
+		"""
+
+		parent = self.current()
+		if parent is NULL_SPAN or not isinstance(span, Span):
+			return
+		for child in span.children:
+			child.parent = parent
+			parent.children.append(child)
+
+	@contextmanager
+	def span(self, name):
+		"""
+		Times the enclosed block as a stage of the current request,
+
+		or as a new request if no stage is open in the thread
+
+		Parameters:
+		----------
+			name : str
+				Name of the stage
+
+		Return:
+		------
+			span : Span
+				The open stage, NULL_SPAN if disabled
+		"""
+
+		if not self.enabled:
+			yield NULL_SPAN
+			return
+
+		stack = getattr(self.local, "stack", None)
+		if stack is None:
+			stack = self.local.stack = list()
+
+		parent = stack[-1] if stack else None
+		span = Span(name, parent)
+		if parent is not None:
+			parent.children.append(span)
+		stack.append(span)
+		try:
+			yield span
+		finally:
+			span.end = time.perf_counter()
+			stack.pop()
+			if parent is None:
+				self.finish(span)
+
+	@contextmanager
+	def detached(self, name):
+		"""
+		Times the enclosed block as a stage of the innermost open stage
+
+		without making it the current stage, for stages that run
+		concurrently with their siblings in the same thread e.g. the
+		coroutines of an event loop
+
+		Parameters:
+		----------
+			name : str
+				Name of the stage
+
+		Return:
+		------
+			span : Span
+				The open stage, NULL_SPAN if disabled or outside a request
+		"""
+
+		parent = self.current()
+		if parent is NULL_SPAN:
+			yield NULL_SPAN
+			return
+
+		span = Span(name, parent)
+		parent.children.append(span)
+		try:
+			yield span
+		finally:
+			span.end = time.perf_counter()
+
+	def finish(self, span):
+		"""
+		Exports the finished request and logs the stage breakdown
+
+		if the request was slower than the threshold
+
+		Parameters:
+		----------
+			span : Span
+				Top level stage of the request
+
+		Return:
+		------
+			None
+		"""
+
+		self.finished[span.name] = span
+		if self.exporter is not None:
+			self.exporter.export(span)
+
+		if span.duration >= self.threshold:
+			logging.warning(
+				"Slow request (%.3fs > %.3fs)\n%s" % (
+					span.duration, self.threshold,
+					"\n".join(span.breakdown())))
+
+tracer = Tracer(JsonLinesExporter(TRACE_FILE))
@@ -0,0 +1,174 @@
+"""
+An I/O module for running the file writes and the report database
+operations of a template generation concurrently
+"""
+
+__author__ = "Monish Mohanan"
+__version__ = "1.0"
+
+# Importing required libraries
+try:
+	import os
+	import uuid
+	import asyncio
+	from concurrent.futures import ThreadPoolExecutor
+	from instrumentation import tracer
+except ImportError as e:
+	from tkinter import messagebox
+	messagebox.showwarning("Import Error", str(e))
+
+# Defining the necessary constants
+FILE_WORKERS = 4
+IO_TIMEOUT = 60.0
+
+class IOLayer:
+	"""
+	A class for running blocking file and SQLite work from asyncio
+
+	File work runs on its own pool so that a slow network share does
+	not hold up the local disk. SQLite work runs on a single thread,
+	which keeps a connection on the thread that created it and the
+	statements in the order they were issued
+
+	The timeout only abandons the wait, a thread already running the
+	operation cannot be interrupted and finishes it later. The writes
+	are therefore atomic and idempotent, and the journaled records keep
+	their idempotency key, so an operation reported as timed out that
+	lands afterwards does not conflict with its retry
+
+	Attributes:
+	----------
+		file_workers : int
+			Number of file operations running at the same time
+
+		timeout : float
+			Seconds after which an operation is abandoned
+
+	Method:
+	------
+		run : Runs a coroutine to completion from synchronous code
+
+		file : Runs a function on the file pool
+
+		database : Runs a function on the SQLite thread
+
+		write : Writes bytes to a file
+	"""
+
+	def __init__(self, file_workers = FILE_WORKERS, timeout = IO_TIMEOUT):
+		"""
+		Constructs the executors of the I/O layer
+
+		Parameters:
+		----------
+			file_workers : int
+				Number of file operations running at the same time
+
+			timeout : float
+				Seconds after which an operation is abandoned
+		"""
+
+		self.files = ThreadPoolExecutor(
+			max_workers = file_workers, thread_name_prefix = "file-io")
+		self.sqlite = ThreadPoolExecutor(
+			max_workers = 1, thread_name_prefix = "sqlite-io")
+		self.timeout = timeout
+
+	@staticmethod
+	def run(coroutine):
+		"""
+		Runs the coroutine on a new event loop in the calling thread
+
+		Parameters:
+		----------
+			coroutine : coroutine
+				Operations to be run
+
+		Return:
+		------
+			result : object
+				Result of the coroutine
+		"""
+
+		return asyncio.run(coroutine)
+
+	async def file(self, function, *args):
+		"""
+		Runs the function on the file pool within the timeout, the
+
+		function keeps running on its thread after a timeout
+		"""
+
+		loop = asyncio.get_running_loop()
+		return await asyncio.wait_for(
+			loop.run_in_executor(self.files, function, *args), self.timeout)
+
+	async def database(self, function, *args):
+		"""
+		Runs the function on the SQLite thread within the timeout, the
+
+		function keeps running on the thread after a timeout
+		"""
+
+		loop = asyncio.get_running_loop()
+		return await asyncio.wait_for(
+			loop.run_in_executor(self.sqlite, function, *args), self.timeout)
+
+	@staticmethod
+	def write_file(path, data):
+		"""
+		Writes the data next to the path and moves it in place, so an
+
+		abandoned write never leaves a truncated file behind. Every
+		write has its own temporary file, so a write that timed out and
+		its retry by the outbox can finish in any order and both leave
+		the complete file
+
+		Parameters:
+		----------
+			path : str
+				Location of the file
+
+			data : bytes
+				Contents of the file
+
+		Return:
+		------
+			None
+		"""
+
+		temporary = ".".join((path, uuid.uuid4().hex, "part"))
+		try:
+			with open(temporary, "wb") as output:
+				output.write(data)
+			os.replace(temporary, path)
+		except BaseException:
+			if os.path.exists(temporary):
+				os.remove(temporary)
+			raise
+
+	async def write(self, path, data, stage):
+		"""
+		Writes the data to the file as a stage of the current request
+
+		Parameters:
+		----------
+			path : str
+				Location of the file
+
+			data : bytes
+				Contents of the file
+
+			stage : str
+				Name of the stage e.g. network_write
+
+		Return:
+		------
+			None
+		"""
+
+		with tracer.detached(stage) as span:
+			await self.file(IOLayer.write_file, path, data)
+			span.count("bytes_written", len(data))
+
+io = IOLayer()
@@ -0,0 +1,254 @@
+"""
+A local cache module for keeping copies of the network hosted test,
+cost and report databases on the local disk
+"""
+
+__author__ = "Monish Mohanan"
+__version__ = "1.0"
+
+# Importing required libraries
+try:
+	import os
+	import json
+	import shutil
+	import sqlite3
+	import hashlib
+	import logging
+	import threading
+	import traceback
+	from instrumentation import tracer
+except ImportError as e:
+	from tkinter import messagebox
+	messagebox.showwarning("Import Error", str(e))
+
+# Defining the necessary constants
+CACHE_FOLDER = "cache/"
+CACHE_INDEX = "index.json"
+MANIFEST_SUFFIX = ".manifest"
+
+class LocalCache:
+	"""
+	A class for a read-through cache of network files on the local disk
+
+	A cached copy is revalidated against the manifest published next
+	to the source file, e.g. costfile.xlsx.manifest, or against the
+	size and modification time of the source if there is no manifest.
+	The file is copied again only when the source has changed and the
+	cached copy is used if the source cannot be reached
+
+	Attributes:
+	----------
+		folder : str
+			Location of the cache folder on the local disk
+
+	Method:
+	------
+		local_path : Returns the location of the cached copy
+
+		remote_state : Returns the state of the source file
+
+		fetch : Returns an up to date copy of a file
+
+		backup : Copies an SQLite database consistently
+
+		replica : Returns an up to date copy of an SQLite database
+
+		refresh_async : Refreshes a copy in the background
+	"""
+
+	def __init__(self, folder = CACHE_FOLDER):
+		"""
+		Constructs the identifiers of the cache
+
+		Parameters:
+		----------
+			folder : str
+				Location of the cache folder on the local disk
+		"""
+
+		self.folder = folder
+		self.index_path = os.path.join(folder, CACHE_INDEX)
+		self.lock = threading.Lock()
+		self.locks = dict()
+		self.index = dict()
+		try:
+			with open(self.index_path) as index:
+				self.index = json.load(index)
+		except (OSError, ValueError):
+			pass
+
+	def local_path(self, source):
+		"""
+		Returns the location of the cached copy of the source file
+
+		Parameters:
+		----------
+			source : str
+				Location of the file in the network
+
+		Return:
+		------
+			path : str
+				Location of the copy in the cache folder
+		"""
+
+		key = hashlib.sha1(os.path.abspath(source).encode()).hexdigest()
+		return os.path.join(
+			self.folder, "_".join((key[:12], os.path.basename(source))))
+
+	@staticmethod
+	def remote_state(source):
+		"""
+		Returns the state of the source file from its manifest if one
+
+		is published, otherwise from its size and modification time
+
+		Parameters:
+		----------
+			source : str
+				Location of the file in the network
+
+		Return:
+		------
+			state : dict
+				Manifest contents or size and modification time
+		"""
+
+		try:
+			with open(source + MANIFEST_SUFFIX) as manifest:
+				return {"manifest" : json.load(manifest)}
+		except (OSError, ValueError):
+			info = os.stat(source)
+			return {"size" : info.st_size, "mtime" : info.st_mtime_ns}
+
+	def fetch(self, source, copy = None):
+		"""
+		Returns the location of an up to date copy of the source file
+
+		Parameters:
+		----------
+			source : str
+				Location of the file in the network
+
+			copy : function
+				Copies the source to a path, shutil.copy2 by default
+
+		Return:
+		------
+			path : str
+				Location of the copy in the cache folder, or the source
+				if it can neither be reached nor found in the cache
+		"""
+
+		local = self.local_path(source)
+		with tracer.span("cache_fetch") as span:
+			try:
+				state = LocalCache.remote_state(source)
+			except OSError:
+				if os.path.exists(local):
+					logging.warning("%s is not reachable, "
+						"the cached copy is used" % source)
+					return local
+				return source
+
+			with self.lock:
+				lock = self.locks.setdefault(source, threading.Lock())
+
+			with lock:
+				if self.index.get(source) == state and os.path.exists(local):
+					span.count("cache_hits")
+					return local
+
+				# Copying to a temporary file first so that a reader never
+				# sees a partly written copy
+				os.makedirs(self.folder, exist_ok = True)
+				temporary = local + ".part"
+				(copy or shutil.copy2)(source, temporary)
+				os.replace(temporary, local)
+				span.count("bytes_copied", os.path.getsize(local))
+
+				with self.lock:
+					self.index[source] = state
+					with open(self.index_path, "w") as index:
+						json.dump(self.index, index)
+		return local
+
+	@staticmethod
+	def backup(source, destination):
+		"""
+		Copies an SQLite database consistently with the backup API
+
+		Parameters:
+		----------
+			source : str
+				Location of the database in the network
+
+			destination : str
+				Location of the copy
+
+		Return:
+		------
+			None
+		"""
+
+		if os.path.exists(destination):
+			os.remove(destination)
+		original = sqlite3.connect(source)
+		copy = sqlite3.connect(destination)
+		try:
+			original.backup(copy)
+		finally:
+			copy.close()
+			original.close()
+
+	def replica(self, source):
+		"""
+		Returns the location of an up to date read-only replica of the
+
+		SQLite database for running the report queries locally
+
+		Parameters:
+		----------
+			source : str
+				Location of the database in the network
+
+		Return:
+		------
+			path : str
+				Location of the replica in the cache folder
+		"""
+
+		return self.fetch(source, copy = LocalCache.backup)
+
+	def refresh_async(self, source, database = False):
+		"""
+		Refreshes the cached copy of the source in a background thread
+
+		Parameters:
+		----------
+			source : str
+				Location of the file in the network
+
+			database : bool
+				True if the source is an SQLite database
+
+		Return:
+		------
+			thread : threading.Thread
+				Thread performing the refresh
+		"""
+
+		def refresh():
+			try:
+				if database:
+					self.replica(source)
+				else:
+					self.fetch(source)
+			except Exception:
+				logging.error(traceback.format_exc())
+
+		thread = threading.Thread(target = refresh, daemon = True)
+		thread.start()
+		return thread
+
+cache = LocalCache()
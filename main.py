@@ -12,6 +12,9 @@ of the application.
 		MainWindow - For obtaining input combination from the user
 		ConfirmationWindow - For confirming the procured results
 		Settings - For modifying paths, users & report generation
+		TestFinder - For finding the combinations using a test
+		HistoryFinder - For searching the generated templates
+		QualityViewer - For viewing the data problems of the databases
 		
 """
 
@@ -25,7 +28,8 @@ try:
 	import logging
 	import traceback
 	import time
-	import xlrd
+	import multiprocessing
+	from functools import partial
 	from concurrent.futures import ThreadPoolExecutor
 	from PIL import ImageTk, Image
 	import tkinter as tk
@@ -35,9 +39,20 @@ try:
 	from tkinter.filedialog import askopenfile
 	from babel.numbers import format_currency
 	from win32com import client
-	from report import TransmissionReport
-	from searchbase import LinearSearch
+	from report import TransmissionReport, MetricsReport
 	from template import TransmissionTemplate
+	from instrumentation import tracer
+	from datastore import DataStore, WorkbookWatcher
+	from localcache import cache
+	from outbox import outbox
+	from archive import ReportArchive
+	from history import RecordIndex
+	from infobase import InfoBase
+	from models import TestItem
+	from impact import ImpactMatrix
+	from recost import RecostJob
+	from quality import DataQuality, scan_async
+	from prefetch import SearchPrefetcher
 except ImportError as e:
 	from tkinter import messagebox
 	messagebox.showwarning("Import Error", str(e))
@@ -52,54 +67,31 @@ except Exception as e:
 	raise e
 
 try:
-	info = sqlite3.connect('database/info.db')
-	cur = info.cursor()
-	cur.execute('''SELECT Number, Changes FROM ChangeTypes''')
-	change_types = dict((col[0], col[1]) for col in cur.fetchall())
-	cur.execute('''SELECT Name, Position FROM subAssembly''')
-	subassemblies = dict((col[0], col[1]) for col in cur.fetchall())
-	cur.execute('''SELECT PartName, Position FROM Subassembly_1''')
-	subassembly_1 = dict((col[0], col[1]) for col in cur.fetchall())
-	cur.execute('''SELECT PartName, Position FROM Subassembly_2''')
-	subassembly_2 = dict((col[0], col[1]) for col in cur.fetchall())
-	cur.execute('''SELECT PartName, Position FROM Subassembly_3''')
-	subassembly_3 = dict((col[0], col[1]) for col in cur.fetchall())
-	cur.execute('''SELECT PartName, Position FROM Subassembly_4''')
-	subassembly_4 = dict((col[0], col[1]) for col in cur.fetchall())
-	cur.execute('''SELECT PartName, Position FROM Subassembly_5''')
-	subassembly_5 = dict((col[0], col[1]) for col in cur.fetchall())
-	cur.execute('''SELECT PartName, Position FROM Subassembly_6''')
-	subassembly_6 = dict((col[0], col[1]) for col in cur.fetchall())
-	cur.execute('''SELECT Name FROM Requesters''')
-	requesters = [col[0] for col in cur.fetchall()]
-	cur.execute('''SELECT Name FROM Creators''')
-	creators = [col[0] for col in cur.fetchall()]
-	cur.execute('''SELECT Name, Path FROM Databases''')
-	databases = dict((col[0], col[1]) for col in cur.fetchall())
-	cur.execute('''SELECT Name, Path FROM Storage''')
-	records = dict((col[0], col[1]) for col in cur.fetchall())
+	infobase = InfoBase()
 except Exception as e:
 	messagebox.showwarning("SQL Query Error", str(e))
 	logging.error(traceback.format_exc())
 	sys.exit(0)
 else:
-	partlist = (
-		subassembly_1, subassembly_2,
-		subassembly_3, subassembly_4,
-		subassembly_5, subassembly_6,
-		)
-	subassembly_keys = list(subassemblies.keys())
-	keys = (0, 1, 2, 3, 4, 5)
-	required_keys = tuple((subassembly_keys[val]) for val in keys)
-	subassembly_and_parts = dict(
-		(key, value) for key, value in zip(required_keys, partlist))
-finally:
-	info.close()
+	change_types = infobase.change_types
+	subassemblies = infobase.subassemblies
+	requesters = infobase.requesters
+	creators = infobase.creators
+	databases = infobase.databases
+	records = infobase.records
+	subassembly_keys = infobase.subassembly_keys
+	subassembly_and_parts = infobase.subassembly_and_parts
 
 MAIN_WINDOW_TITLE = "TEST AND COST TEMPLATE"
 MAIN_WINDOW_RESOLUTION = "850x650"
 CONFIRMATION_WINDOW_TITLE = "CONFIRMATION SCREEN"
 CONFIRMATION_WINDOW_RESOLUTION = "800x650"
+FINDER_WINDOW_TITLE = "FIND TESTS"
+FINDER_WINDOW_RESOLUTION = "800x420"
+HISTORY_WINDOW_TITLE = "SEARCH HISTORY"
+HISTORY_WINDOW_RESOLUTION = "800x420"
+QUALITY_WINDOW_TITLE = "DATA QUALITY"
+QUALITY_WINDOW_RESOLUTION = "800x420"
 SETTINGS_WINDOW_TITLE = "SETTINGS"
 SETTINGS_WINDOW_RESOLUTION = "550x500"
 DATA_ADDITION_WINDOW_TITLE = "ADD FIELDS"
@@ -116,6 +108,7 @@ TEMPLATE_IMAGE = "images/folder.png"
 REPORT_IMAGE = "images/report.png"
 TEMPLATE_PATH = "templates/"
 REPORT_PATH = "report/"
+VIRTUAL_BUFFER = 20
 
 
 
@@ -136,15 +129,29 @@ class MainWindow:
 
 		workflow : Triggers workflow based on input validation
 
+		search : Searches the test and cost databases for the selection
+
 		validate_inputs : Validates the input recieved from the user
 
 		on_subassembly_change : Subassembly selection in the application
 
 		on_part_change : Part name selection in the application
 
+		prefetch : Starts the search of the selection in the background
+
 		documentation : Opens the documentation
 
 		settings : Instantiates the settings window of the application
+
+		find_tests : Instantiates the test finder window
+
+		search_history : Instantiates the history finder window
+
+		cost_matrix : Exports the cost impact matrix
+
+		recost : Exports the generated templates costed again
+
+		data_quality : Instantiates the data quality window
 	"""
 
 	def __init__(self, master):
@@ -203,6 +210,28 @@ class MainWindow:
 		tk.Button(self.master, image = self.report_image, bg = 'white',
 			command = lambda:os.startfile(self.report_path)).place(x = 800, y = 150)
 
+		# Test finder button
+		ttk.Button(
+			self.master,
+			text = "Find Tests",
+			command = self.find_tests).place(x = 630, y = 100)
+		ttk.Button(
+			self.master,
+			text = "Cost Matrix",
+			command = self.cost_matrix).place(x = 630, y = 135)
+		ttk.Button(
+			self.master,
+			text = "History",
+			command = self.search_history).place(x = 715, y = 100)
+		ttk.Button(
+			self.master,
+			text = "Recost",
+			command = self.recost).place(x = 715, y = 135)
+		ttk.Button(
+			self.master,
+			text = "Data Quality",
+			command = self.data_quality).place(x = 630, y = 65)
+
 		# ------------------------CHANGE TYPE LAYOUT----------------------------
 
 		self.pos = 0
@@ -222,7 +251,8 @@ class MainWindow:
 				bg = 'white', fg = 'black', 
 				font = ('Times New Roman', 13),
 				variable = self.change_type, 
-				value = number).place(x = 50, y = 95 + 30 * self.pos)
+				value = number,
+				command = self.prefetch).place(x = 50, y = 95 + 30 * self.pos)
 			self.pos += 1
 
 		# -----------------------SUB ASSEMBLY LAYOUT---------------------------
@@ -324,7 +354,7 @@ class MainWindow:
 			activebackground = '#24025F',
 			bd = 6, command = self.validate_inputs).place(x = 245, y = 590)
 
-	def confirmation_window(self, test, cost, **kwargs):
+	def confirmation_window(self, items, **kwargs):
 		"""
 		Instantiate the confirmation window from the 
 
@@ -341,11 +371,8 @@ class MainWindow:
 			part : str
 				Selected part in the application
 
-			test : dict
-				Work package IDs and test names
-
-			cost : dict
-				Work package IDs and costs
+			items : list
+				TestItem of every test to be performed
 
 		Return:
 		------
@@ -353,8 +380,8 @@ class MainWindow:
 		"""
 
 		self.confirmation = tk.Toplevel(self.master)
-		self.app = ConfirmationWindow(self.confirmation, test,
-										cost, **kwargs)
+		self.app = ConfirmationWindow(
+			self.confirmation, items, self.search_span, self.snapshot, **kwargs)
 
 	def workflow(self):
 		"""
@@ -395,30 +422,80 @@ class MainWindow:
 		# Verify if the databases are loaded in the application
 		while not self.load_validation: print("loading database...")
 
-		# Assign the test and cost database workbook objects to identifiers
-		self.test_database = test_database.result()
-		self.cost_database = cost_database.result()
+		# Take the current snapshot of the databases, a reload in the
+		# background does not affect the search in progress
+		self.snapshot = datastore.snapshot()
 
-		# Set the search column for the test database
-		if change_type in range(1, 5):
-			if bool(part):
-				self.search_column = subassembly_and_parts[subassembly][part]
-			else:
+		with tracer.span("search") as self.search_span:
+			test_results, cost_results = self.search(change_type, subassembly, part)
+
+		# Invoke the confirmation screen if the tests & costs are validated
+		if (self.test_valid and self.cost_valid):
+			if not bool(part):
 				part = "NA"
-				self.search_column = subassemblies[subassembly]
+			self.inputs = {
+				"Change Type" : change_types[change_type],
+				"Subassembly" : subassembly,
+				"Part Name" : part,
+				"Requester" : requester,
+				"Creator" : creator,
+				"Comment" : comment
+				}
+			MainWindow.confirmation_window(
+				self, TestItem.join(test_results, cost_results), **self.inputs)
+
+	def search(self, change_type, subassembly, part):
+		"""
+		Search the loaded test and cost databases for the selection
+
+		and validate the results
+
+		Parameters:
+		----------
+			change_type : int
+				Selected change type in the application
+
+			subassembly : str
+				Selected subassembly in the application
+
+			part : str
+				Selected part in the application
+
+		Return:
+		------
+			test_results : dict or str
+				Work package IDs and test names, or a warning message
 
-		# Instantiate LinearSearch and extract the test results
-		search = LinearSearch(
-			change_type, 
-			self.test_database, 
-			self.cost_database)
-		test_results = search.extract_test(self.search_column)
+			cost_results : dict or str
+				Work package IDs and costs, or a warning message
+		"""
+
+		cost_results = None
+
+		# Set the search column for the test database
+		if change_type in range(1, 5):
+			self.search_column = infobase.search_column(subassembly, part)
+
+		# Take the results prefetched for the selection, the tests and
+		# costs are searched here only if the selection or the databases
+		# changed since. The prefetched timings are moved under the search
+		# so the metrics of the generation keep them
+		prefetched = prefetcher.result(
+			change_type, subassembly, part, self.snapshot)
+		if prefetched is None:
+			test_results, found_costs = SearchPrefetcher.compute(
+				self.snapshot, change_type, self.search_column)
+		else:
+			tracer.count("prefetched")
+			tracer.adopt(prefetched.span)
+			test_results = prefetched.test_results
+			found_costs = prefetched.cost_results
 
 		# Validate if the results contain the correct test data
 		# Set the validation flag based on the condition
 		if isinstance(test_results, dict):
 			if test_results:
-				if "NULL" not in test_results.keys():
+				if None not in test_results.keys():
 					self.test_valid = True
 				else:
 					messagebox.showwarning(
@@ -435,7 +512,7 @@ class MainWindow:
 
 		# Extract the costs if the test data is valid
 		if self.test_valid:
-			cost_results = search.extract_cost(test_results.keys())
+			cost_results = found_costs
 
 			# Validate if the results contain the correct cost data
 			# Set the validation flag based on the condition
@@ -453,19 +530,7 @@ class MainWindow:
 				logging.error(self.critical)
 				sys.exit(0)
 
-
-		# Invoke the confirmation screen if the tests & costs are validated
-		if (self.test_valid and self.cost_valid):
-			self.inputs = {
-				"Change Type" : change_types[change_type],
-				"Subassembly" : subassembly,
-				"Part Name" : part,
-				"Requester" : requester,
-				"Creator" : creator,
-				"Comment" : comment
-				}
-			MainWindow.confirmation_window(self, test_results, 
-											cost_results, **self.inputs)
+		return test_results, cost_results
 
 	def validate_inputs(self):
 		"""
@@ -571,6 +636,7 @@ class MainWindow:
 			self.menu.add_command(
 				label = item, 
 				command = lambda x = item: self.on_part_change(x))
+		self.prefetch()
 
 	def on_part_change(self, selected):
 		"""
@@ -587,7 +653,17 @@ class MainWindow:
 		"""
 
 		self.part.set(selected)
+		self.prefetch()
+
+	def prefetch(self):
+		"""
+		Starts searching the tests and costs of the selection in the
+
+		background once the change type and the subassembly are chosen
+		"""
 
+		prefetcher.prefetch(
+			self.change_type.get(), self.subassembly.get(), self.part.get())
 
 	def documentation(self):
 		try:
@@ -599,11 +675,95 @@ class MainWindow:
 			logging.error(traceback.format_exc())
 
 	def settings(self):
+		cache.refresh_async(records["Report"], database = True)
 		self.settings = tk.Toplevel(self.master)
 		self.settingsapp = Settings(self.settings)
 
+	def find_tests(self):
+		self.finder = tk.Toplevel(self.master)
+		self.finderapp = TestFinder(self.finder)
+
+	def search_history(self):
+		self.history = tk.Toplevel(self.master)
+		self.historyapp = HistoryFinder(self.history)
+
+	def data_quality(self):
+		if datastore.snapshot().cost_index is None:
+			messagebox.showinfo("Loading", "The databases are loading...")
+			return
+		self.quality = tk.Toplevel(self.master)
+		self.qualityapp = QualityViewer(self.quality)
+
+	def cost_matrix(self):
+		"""
+		Exports the number of tests and the total cost of every
+
+		subassembly and part for every change type
+
+		Parameters:
+		----------
+			None
+
+		Return:
+		------
+			None
+		"""
+
+		snapshot = datastore.snapshot()
+		if snapshot.test_index is None or snapshot.cost_index is None:
+			messagebox.showinfo("Loading", "The databases are loading...")
+			return
+		try:
+			matrix = ImpactMatrix(snapshot, infobase)
+			matrix.load()
+			paths = matrix.export()
+			messagebox.showinfo(
+				"Success", "The cost matrix has been exported to " +
+				", ".join(os.path.basename(path) for path in paths))
+		except Exception as e:
+			messagebox.showwarning(
+				"Report Error",
+				"Sorry..! Could not export the cost matrix. " + str(e))
+			logging.error(traceback.format_exc())
+
+	def recost(self):
+		"""
+		Exports the old and new total of every generated template
+
+		against the loaded test and cost databases
+
+		Parameters:
+		----------
+			None
+
+		Return:
+		------
+			None
+		"""
+
+		snapshot = datastore.snapshot()
+		if snapshot.test_index is None or snapshot.cost_index is None:
+			messagebox.showinfo("Loading", "The databases are loading...")
+			return
+		try:
+			job = RecostJob(
+				snapshot, infobase,
+				cache.replica(records["Report"]),
+				ReportArchive(records["Report"]))
+			job.run()
+			job.store()
+			paths = job.export()
+			messagebox.showinfo(
+				"Success", "The recosting has been exported to " +
+				", ".join(os.path.basename(path) for path in paths))
+		except Exception as e:
+			messagebox.showwarning(
+				"Report Error",
+				"Sorry..! Could not recost the templates. " + str(e))
+			logging.error(traceback.format_exc())
+
 	@staticmethod
-	def load_databases(value):
+	def load_databases(value, field = "Test"):
 		"""
 		Load the test and the cost database in memory by creating objects
 
@@ -612,23 +772,236 @@ class MainWindow:
 			value : str
 				Location of the database file
 
+			field : str
+				Test or Cost
+
 		Return:
 		------
-			wb : xlrd.book.Book object
+			wb : xlrd.book.Book or costbook.CostBook object
 				Workbook object of the database file
+
+			signature : datastore.FileSignature
+				Size, modification time and digest of the file
 		"""
 
 		# Try loading the database file 
 		try:
-			wb = xlrd.open_workbook(value)
+			wb, signature = DataStore.opener(field)(value)
+			tracer.mark_ready()
 		except Exception as e:
 			messagebox.showwarning("Database Error", str(e))
 			logging.error(traceback.format_exc())
 			sys.exit(0)
 
 		# Return the workbook object if the load is successful
-		return wb
+		return wb, signature
+
+
+class VirtualTreeview:
+	"""
+	A class for showing a long list of tests in a ttk.Treeview without
+
+	inserting all of them when the window opens
+
+	Only the visible rows and a buffer are inserted, more rows are
+	inserted when the view is scrolled close to the last inserted row.
+	Filtering and sorting reorder the list of shown tests and update
+	the rows already inserted instead of rebuilding the tree
+
+	Attributes:
+	----------
+		tree : ttk.Treeview
+			Tree view showing the tests
+
+		scroll_bar : ttk.Scrollbar
+			Vertical scroll bar of the tree view
+
+		items : list
+			TestItem of every test
+
+		buffer : int
+			Number of rows inserted beyond the visible ones
+
+	Method:
+	------
+		extend : Inserts the next rows of the list
+
+		show : Shows a test in a row of the tree view
+
+		on_scroll : Inserts more rows when the end is scrolled into view
+
+		filter : Shows the tests containing a text
+
+		sort : Sorts the shown tests by name, cost or number
+
+		key : Returns the sort key of a column
+	"""
+
+	def __init__(self, tree, scroll_bar, items, buffer = VIRTUAL_BUFFER):
+		"""
+		Constructs the list model and inserts the first rows
+
+		Parameters:
+		----------
+			tree : ttk.Treeview
+				Tree view showing the tests
+
+			scroll_bar : ttk.Scrollbar
+				Vertical scroll bar of the tree view
+
+			items : list
+				TestItem of every test
+
+			buffer : int
+				Number of rows inserted beyond the visible ones
+		"""
+
+		self.tree = tree
+		self.scroll_bar = scroll_bar
+		self.items = items
+		self.buffer = buffer
+		self.window = int(tree["height"]) + buffer
+		self.rows = list(range(len(items)))
+		self.loaded = 0
+		self.pending = False
+		self.text = ""
+		self.order = ("number", False)
+		self.tree.configure(yscrollcommand = self.on_scroll)
+		self.extend(self.window)
+
+	def extend(self, count):
+		"""
+		Inserts the next rows of the list of shown tests
+
+		Parameters:
+		----------
+			count : int
+				Number of rows to be inserted
+
+		Return:
+		------
+			None
+		"""
+
+		self.pending = False
+		end = min(self.loaded + count, len(self.rows))
+		for position in range(self.loaded, end):
+			self.show(position)
+		self.loaded = max(self.loaded, end)
+
+	def show(self, position):
+		"""
+		Shows the test at the position of the list in the row of the
+
+		same position, reusing the row if it is already inserted
+
+		Parameters:
+		----------
+			position : int
+				Position in the list of shown tests
+
+		Return:
+		------
+			None
+		"""
+
+		index = self.rows[position]
+		item = self.items[index]
+		row = str(position)
+		values = (item.name, str(item.cost))
+		if self.tree.exists(row):
+			self.tree.item(row, text = str(index + 1), values = values)
+			self.tree.move(row, "", position)
+		else:
+			self.tree.insert(
+				"", position, iid = row, text = str(index + 1), values = values)
+
+	def on_scroll(self, first, last):
+		"""
+		Moves the scroll bar and inserts more rows once the last
+
+		inserted rows are in view
+		"""
+
+		self.scroll_bar.set(first, last)
+		if (float(last) > 0.9 and self.loaded < len(self.rows)
+				and not self.pending):
+			self.pending = True
+			self.tree.after_idle(self.extend, self.buffer)
+
+	def reset(self):
+		"""
+		Shows the list of tests again from its first row, hiding the
+
+		rows beyond the new list
+		"""
+
+		loaded = min(len(self.rows), self.window)
+		for position in range(loaded, self.loaded):
+			self.tree.detach(str(position))
+		for position in range(loaded):
+			self.show(position)
+		self.loaded = loaded
+		self.tree.yview_moveto(0)
+
+	def filter(self, text):
+		"""
+		Shows the tests whose names contain the text, narrowing the
+
+		shown tests while the text is being extended
+
+		Parameters:
+		----------
+			text : str
+				Text to be searched in the test names
+
+		Return:
+		------
+			None
+		"""
+
+		text = text.strip().lower()
+		if text.startswith(self.text):
+			rows = self.rows
+		else:
+			column, reverse = self.order
+			rows = sorted(range(len(self.items)),
+				key = self.key(column), reverse = reverse)
+		self.rows = [index for index in rows
+			if text in self.items[index].name.lower()]
+		self.text = text
+		self.reset()
+
+	def sort(self, column):
+		"""
+		Sorts the shown tests by a column, again in reverse
+
+		Parameters:
+		----------
+			column : str
+				name, cost or number
+
+		Return:
+		------
+			None
+		"""
+
+		previous, reverse = self.order
+		reverse = not reverse if column == previous else False
+		self.order = (column, reverse)
+		self.rows.sort(key = self.key(column), reverse = reverse)
+		self.reset()
+
+	def key(self, column):
+		"""
+		Returns the sort key of the tests by a column
+		"""
 
+		if column == "name":
+			return lambda index: self.items[index].name.lower()
+		if column == "cost":
+			return lambda index: float(self.items[index].cost)
+		return lambda index: index
 
 class ConfirmationWindow:
 	"""
@@ -644,7 +1017,8 @@ class ConfirmationWindow:
 		generate_pdf : Generates the test and cost template
 	"""
 
-	def __init__(self, master, test, cost, **kwargs):
+	def __init__(self, master, items, search = None, snapshot = None,
+			**kwargs):
 		"""
 		Constructs the confirmation window of the application
 
@@ -653,11 +1027,14 @@ class ConfirmationWindow:
 			master : tkinter.Tk class
 				Base class for the construcation of the window
 
-			test : dict
-				Collection of work pacakge ids and test pairs
+			items : list
+				TestItem of every test to be performed
+
+			search : instrumentation.Span
+				Finished search of the tests and costs
 
-			cost : dict
-				Collection of work package ids and cost pairs
+			snapshot : datastore.DataSnapshot
+				Databases the tests and costs were searched in
 
 			**kwargs : dict
 				Contains change type, subassembly, part name,
@@ -672,8 +1049,9 @@ class ConfirmationWindow:
 		self.master.configure(background = 'white')
 
 		# Assigning the required identifiers
-		self.test_ = test
-		self.cost_ = cost
+		self.items = items
+		self.search_span = search
+		self.snapshot = snapshot
 		self.input_values = kwargs
 
 		# ------------------------------TITLE--------------------------------
@@ -734,13 +1112,8 @@ class ConfirmationWindow:
 			fg = 'white', bg = '#24025F',
 			font = ('Times New Roman', 15)).place(x = 20, y = 266)
 
-		# Pairing the test names with the appropriate costs
-		self.test_cost = tuple(
-			(x, y) for x, y in zip(self.test_.values(),self.cost_.values()))
-
 		# Calculating the total cost and rounding it upto 2 decimal values
-		self.total_cost = [float(num) for num in cost.values()]
-		self.total_cost = round(sum(self.total_cost), 2)
+		self.total_cost = TestItem.total(self.items)
 
 		# Tree view of the tests and the costs involved
 		tk.Frame(
@@ -762,23 +1135,38 @@ class ConfirmationWindow:
 		self.test_cost_display.column(
 			"#0", width = 50, minwidth = 70, stretch = tk.NO)
 		self.test_cost_display.heading(
-			"#0", text = "S.No.", anchor = tk.CENTER)
+			"#0", text = "S.No.", anchor = tk.CENTER,
+			command = lambda: self.test_cost_list.sort("number"))
 		self.test_cost_display.column(
 			"#1", width = 600, minwidth = 70, stretch = tk.NO)
 		self.test_cost_display.heading(
-			"#1", text = "Test Details", anchor = tk.CENTER)
+			"#1", text = "Test Details", anchor = tk.CENTER,
+			command = lambda: self.test_cost_list.sort("name"))
 		self.test_cost_display.column(
 			"#2", width = 117, minwidth = 77, stretch = tk.NO, anchor = tk.CENTER)
 		self.test_cost_display.heading(
-			"#2", text = "Cost (EUR)", anchor = tk.CENTER)
-		for index, data in enumerate(self.test_cost, start = 1):
-			self.test_cost_display.insert(
-				"",
-				index,
-				text = str(index),
-				values = (data[0], str(data[1])))
+			"#2", text = "Cost (EUR)", anchor = tk.CENTER,
+			command = lambda: self.test_cost_list.sort("cost"))
+
+		# Inserting the visible tests, the rest follow while scrolling
+		self.test_cost_list = VirtualTreeview(
+			self.test_cost_display, self.scroll_bar, self.items)
 		self.test_cost_display.place(x = 15, y = 308)
 
+		# Filtering the tests by their names
+		tk.Label(
+			self.master, text = "Filter",
+			fg = 'white', bg = '#24025F',
+			font = ('Times New Roman', 12)).place(x = 560, y = 268)
+		self.filter_text = tk.StringVar()
+		self.filter_text.trace_add(
+			"write",
+			lambda *args: self.test_cost_list.filter(self.filter_text.get()))
+		ttk.Entry(
+			self.master,
+			textvariable = self.filter_text,
+			width = 22).place(x = 610, y = 268)
+
 		# Total cost
 		f_cost = format_currency(self.total_cost, 'EUR', locale='de_DE')
 
@@ -799,21 +1187,17 @@ class ConfirmationWindow:
 			self.master,
 			text = "Confirm",
 			command = lambda: self.generate_pdf(
-				self.test_,
-				self.cost_,
+				self.items,
 				**self.input_values)).place(x = 610, y = 600)
 
-	def generate_pdf(self, test, cost, **kwargs):
+	def generate_pdf(self, items, **kwargs):
 		"""
 		Generates pdf file based on user request
 
 		Parameters:
 		----------
-			test : dict
-				Collection of work package ids and test names
-
-			costs : dict
-				Collection of work package ids and cost names
+			items : list
+				TestItem of every test to be performed
 
 			**kwargs : dict
 				Contains change type, subassembly, part name, 
@@ -831,14 +1215,345 @@ class ConfirmationWindow:
 			self.confirm_message)
 
 		if self.confirm_:
-			hdp_data = TransmissionTemplate(
-				test, cost, **kwargs)
+			hdp_data = TransmissionTemplate(items, self.snapshot, **kwargs)
+			hdp_data.search_span = self.search_span
+
+			# Offering the template generated earlier for the same request
+			duplicate = hdp_data.duplicate(records["Report"])
+			if duplicate is not None and messagebox.askyesno(
+					"Already generated",
+					"The same template was generated by %s on %s at %s."
+					"\n\nOpen it instead of generating a new one?" % (
+						duplicate.user, duplicate.date, duplicate.time)):
+				try:
+					os.startfile(duplicate.link)
+				except Exception:
+					messagebox.showwarning(
+						"Not available",
+						"Oops! The template cannot be accessed")
+					logging.error(traceback.format_exc())
+				self.master.destroy()
+				return
 			hdp_data.generate_template(**records)
 			self.master.destroy()
 		else:
 			self.master.destroy()
 			return
 
+class TestFinder:
+	"""
+	A class to represent the test finder window of the application
+
+	Attributes:
+	----------
+		master : tkinter.Tk class
+			Base class for the construction of the test finder window
+
+	Method:
+	------
+		on_query : Shows the tests matching the typed text
+	"""
+
+	def __init__(self, master):
+		"""
+		Constructs the test finder window of the application
+
+		Parameters:
+		----------
+			master : tkinter.Tk class
+				Base class for the construction of the window
+		"""
+
+		# Basic configuration of the window
+		self.master = master
+		self.master.title(FINDER_WINDOW_TITLE)
+		self.master.geometry(FINDER_WINDOW_RESOLUTION)
+		self.master.resizable(0, 0)
+		self.master.configure(background = 'white')
+
+		tk.Frame(
+			self.master,
+			width = 780,
+			height = 46,
+			background = '#24025F',
+			highlightthickness = 4).place(x = 10, y = 0)
+		tk.Label(
+			self.master, text = "Test name or work package ID",
+			fg = 'white', bg = '#24025F',
+			font = ('Times New Roman', 15)).place(x = 20, y = 9)
+		self.query = tk.StringVar()
+		self.query.trace_add("write", lambda *args: self.on_query())
+		self.entry = ttk.Entry(
+			self.master, textvariable = self.query, width = 50)
+		self.entry.place(x = 400, y = 13)
+		self.entry.focus_set()
+
+		# Tree view of the matching tests and the combinations using them
+		self.results = ttk.Treeview(self.master, height = 15)
+		self.results["columns"] = ("#1", "#2")
+		self.results.column("#0", width = 80, stretch = tk.NO)
+		self.results.heading("#0", text = "WP ID", anchor = tk.CENTER)
+		self.results.column("#1", width = 220, stretch = tk.NO)
+		self.results.heading("#1", text = "Test", anchor = tk.CENTER)
+		self.results.column("#2", width = 470, stretch = tk.NO)
+		self.results.heading(
+			"#2", text = "Column : change types", anchor = tk.CENTER)
+		self.results.place(x = 15, y = 55)
+
+		self.status = tk.Label(
+			self.master, text = "",
+			bg = 'white', fg = 'dark green',
+			font = ('helvetica', 10))
+		self.status.place(x = 15, y = 390)
+
+	def on_query(self):
+		"""
+		Shows the best matching tests of the typed text along with the
+
+		columns and change types using them
+
+		Parameters:
+		----------
+			None
+
+		Return:
+		------
+			None
+		"""
+
+		self.results.delete(*self.results.get_children())
+		search_index = datastore.snapshot().search_index
+		if search_index is None:
+			self.status.configure(text = "The test database is loading...")
+			return
+
+		for item, usages in search_index.query(self.query.get()):
+			self.results.insert(
+				"", tk.END,
+				text = "NA" if item.wpid is None else str(item.wpid),
+				values = (item.name, "; ".join(
+					"%s : %s" % (heading, ", ".join(map(str, changes)))
+					for heading, changes in usages)))
+		self.status.configure(
+			text = "%d tests shown" % len(self.results.get_children()))
+
+class HistoryFinder:
+	"""
+	A class to represent the history finder window of the application
+
+	Attributes:
+	----------
+		master : tkinter.Tk class
+			Base class for the construction of the history finder window
+
+	Method:
+	------
+		on_query : Shows the templates matching the typed text
+
+		on_open : Opens the selected template
+	"""
+
+	def __init__(self, master):
+		"""
+		Constructs the history finder window of the application
+
+		Parameters:
+		----------
+			master : tkinter.Tk class
+				Base class for the construction of the window
+		"""
+
+		# Basic configuration of the window
+		self.master = master
+		self.master.title(HISTORY_WINDOW_TITLE)
+		self.master.geometry(HISTORY_WINDOW_RESOLUTION)
+		self.master.resizable(0, 0)
+		self.master.configure(background = 'white')
+
+		# The index is searched in the local replica of the report database
+		self.index = RecordIndex(
+			cache.replica(records["Report"]),
+			ReportArchive(records["Report"]))
+		self.links = dict()
+
+		tk.Frame(
+			self.master,
+			width = 780,
+			height = 46,
+			background = '#24025F',
+			highlightthickness = 4).place(x = 10, y = 0)
+		tk.Label(
+			self.master, text = "Requester, part, test or comment",
+			fg = 'white', bg = '#24025F',
+			font = ('Times New Roman', 15)).place(x = 20, y = 9)
+		self.query = tk.StringVar()
+		self.query.trace_add("write", lambda *args: self.on_query())
+		self.entry = ttk.Entry(
+			self.master, textvariable = self.query, width = 50)
+		self.entry.place(x = 400, y = 13)
+		self.entry.focus_set()
+
+		# Tree view of the matching templates, double click opens one
+		self.results = ttk.Treeview(self.master, height = 15)
+		self.results["columns"] = ("#1", "#2", "#3", "#4", "#5")
+		self.results.column("#0", width = 80, stretch = tk.NO)
+		self.results.heading("#0", text = "Date", anchor = tk.CENTER)
+		self.results.column("#1", width = 130, stretch = tk.NO)
+		self.results.heading("#1", text = "Requester", anchor = tk.CENTER)
+		self.results.column("#2", width = 130, stretch = tk.NO)
+		self.results.heading("#2", text = "Change Type", anchor = tk.CENTER)
+		self.results.column("#3", width = 140, stretch = tk.NO)
+		self.results.heading("#3", text = "Subassembly", anchor = tk.CENTER)
+		self.results.column("#4", width = 190, stretch = tk.NO)
+		self.results.heading("#4", text = "Part Name", anchor = tk.CENTER)
+		self.results.column("#5", width = 100, stretch = tk.NO)
+		self.results.heading("#5", text = "Total Cost", anchor = tk.CENTER)
+		self.results.bind("<Double-1>", lambda event: self.on_open())
+		self.results.place(x = 15, y = 55)
+
+		self.status = tk.Label(
+			self.master, text = "",
+			bg = 'white', fg = 'dark green',
+			font = ('helvetica', 10))
+		self.status.place(x = 15, y = 390)
+
+	def on_query(self):
+		"""
+		Shows the generated templates best matching the typed text
+
+		Parameters:
+		----------
+			None
+
+		Return:
+		------
+			None
+		"""
+
+		self.results.delete(*self.results.get_children())
+		self.links = dict()
+		try:
+			hits = self.index.search(self.query.get())
+		except sqlite3.Error:
+			self.status.configure(text = "The history cannot be searched")
+			logging.error(traceback.format_exc())
+			return
+
+		for record in hits:
+			item = self.results.insert(
+				"", tk.END, text = record.date,
+				values = (
+					record.requester, record.change_type, record.subassembly,
+					record.part, " ".join((str(record.cost), "EUR"))))
+			self.links[item] = record.link
+		self.status.configure(
+			text = "%d templates shown" % len(self.links))
+
+	def on_open(self):
+		"""
+		Opens the PDF of the selected template
+		"""
+
+		for item in self.results.selection():
+			try:
+				os.startfile(self.links[item])
+			except Exception:
+				messagebox.showwarning(
+					"Not available",
+					"Oops! The template cannot be accessed")
+				logging.error(traceback.format_exc())
+
+class QualityViewer:
+	"""
+	A class to represent the data quality window of the application
+
+	Attributes:
+	----------
+		master : tkinter.Tk class
+			Base class for the construction of the data quality window
+
+	Method:
+	------
+		export : Exports the problems as CSV
+	"""
+
+	def __init__(self, master):
+		"""
+		Constructs the data quality window of the application
+
+		Parameters:
+		----------
+			master : tkinter.Tk class
+				Base class for the construction of the window
+		"""
+
+		# Basic configuration of the window
+		self.master = master
+		self.master.title(QUALITY_WINDOW_TITLE)
+		self.master.geometry(QUALITY_WINDOW_RESOLUTION)
+		self.master.resizable(0, 0)
+		self.master.configure(background = 'white')
+
+		# The problems are scanned when the databases load, the cached
+		# report of the loaded versions is shown
+		self.quality = DataQuality(datastore.snapshot(), infobase)
+		anomalies = self.quality.load()
+
+		tk.Frame(
+			self.master,
+			width = 780,
+			height = 46,
+			background = '#24025F',
+			highlightthickness = 4).place(x = 10, y = 0)
+		tk.Label(
+			self.master, text = "Problems of the test and cost databases",
+			fg = 'white', bg = '#24025F',
+			font = ('Times New Roman', 15)).place(x = 20, y = 9)
+		ttk.Button(
+			self.master,
+			text = "Export",
+			command = self.export).place(x = 690, y = 11)
+
+		# Tree view of the problems
+		self.results = ttk.Treeview(self.master, height = 15)
+		self.results["columns"] = ("#1", "#2", "#3", "#4")
+		self.results.column("#0", width = 150, stretch = tk.NO)
+		self.results.heading("#0", text = "Problem", anchor = tk.CENTER)
+		self.results.column("#1", width = 110, stretch = tk.NO)
+		self.results.heading("#1", text = "Sheet", anchor = tk.CENTER)
+		self.results.column("#2", width = 60, stretch = tk.NO)
+		self.results.heading("#2", text = "Row", anchor = tk.CENTER)
+		self.results.column("#3", width = 110, stretch = tk.NO)
+		self.results.heading("#3", text = "Value", anchor = tk.CENTER)
+		self.results.column("#4", width = 340, stretch = tk.NO)
+		self.results.heading("#4", text = "Detail", anchor = tk.CENTER)
+		self.results.place(x = 15, y = 55)
+		for anomaly in anomalies:
+			kind, sheet, row, value, detail = anomaly.values()
+			self.results.insert(
+				"", tk.END, text = kind,
+				values = (sheet, "" if row is None else row, value, detail))
+
+		self.status = tk.Label(
+			self.master, text = "%d problems found" % len(anomalies),
+			bg = 'white', fg = 'dark green',
+			font = ('helvetica', 10))
+		self.status.place(x = 15, y = 390)
+
+	def export(self):
+		"""
+		Exports the problems to the report folder
+		"""
+
+		try:
+			path = self.quality.export_csv()
+			self.status.configure(
+				text = "Exported to " + os.path.basename(path))
+		except Exception:
+			messagebox.showwarning(
+				"Report Error", "Sorry..! Could not export the problems")
+			logging.error(traceback.format_exc())
+
 class Settings:
 	"""
 	A class to represent the settings window of the application
@@ -852,6 +1567,8 @@ class Settings:
 	------
 		report : Generates the usage information of the application
 
+		metrics_report : Generates the performance report of the application
+
 		update_test_path : For updating the test database path
 
 		update_cost_path : For updating the cost database path
@@ -1032,6 +1749,10 @@ class Settings:
 			self.master, text = self.report_msg,
 			fg = 'black', bg = 'white',
 			font = ('helvetica 10 italic')).place(x = 20, y = 408)
+		ttk.Button(
+			self.master,
+			text = "Metrics",
+			command = self.metrics_report).place(x = 360, y = 408)
 		ttk.Button(
 			self.master,
 			text = "Report",
@@ -1062,7 +1783,37 @@ class Settings:
 		"""
 
 		try:
-			report_data = TransmissionReport(records["Report"])
+			report_data = TransmissionReport(
+				cache.replica(records["Report"]),
+				ReportArchive(records["Report"]))
+			report_data.generate_report()
+			messagebox.showinfo("Success", "The report has been generated")
+		except Exception as e:
+			messagebox.showwarning(
+				"Report Error",
+				"Sorry..! Could not generate report. "+str(e))
+			logging.error(traceback.format_exc())
+		self.master.destroy()
+
+	def metrics_report(self):
+		"""
+		Generates the performance percentiles of the application per
+
+		user machine and data file version
+
+		Parameters:
+		----------
+			None
+
+		Return:
+		------
+			None
+		"""
+
+		try:
+			report_data = MetricsReport(
+				cache.replica(records["Report"]),
+				ReportArchive(records["Report"]))
 			report_data.generate_report()
 			messagebox.showinfo("Success", "The report has been generated")
 		except Exception as e:
@@ -1141,14 +1892,17 @@ class Settings:
 		if result:
 			if self.new_test_path:
 				self.update_database(self.new_test_path, "Test")
+				datastore.set_path("Test", self.new_test_path)
 			if self.new_cost_path:
 				self.update_database(self.new_cost_path, "Cost")
+				datastore.set_path("Cost", self.new_cost_path)
 			if self.new_test_path or self.new_cost_path:
+				watcher.poke()
 				messagebox.showinfo(
 					"Success", 
 					"""The database has been successfully updated
-					\t\tKindly restart the application""")
-				sys.exit(0)
+					\tThe new data is loaded in the background""")
+				self.master.destroy()
 		else:
 			pass
 
@@ -1528,9 +2282,21 @@ class DataDeletion:
 			sys.exit(0)
 
 if __name__ == "__main__":
+	multiprocessing.freeze_support()
+	datastore = DataStore(databases)
 	executor = ThreadPoolExecutor(max_workers = 2)
-	test_database = executor.submit(MainWindow.load_databases, databases["Test"])
-	cost_database = executor.submit(MainWindow.load_databases, databases["Cost"])
+	test_database = executor.submit(
+		datastore.load, "Test", MainWindow.load_databases)
+	cost_database = executor.submit(
+		datastore.load, "Cost",
+		partial(MainWindow.load_databases, field = "Cost"))
+	scan_async(datastore, infobase, test_database, cost_database)
+	prefetcher = SearchPrefetcher(
+		datastore, infobase, (test_database, cost_database))
+	watcher = WorkbookWatcher(datastore)
+	watcher.start()
+	outbox.start()
+	cache.refresh_async(records["Report"], database = True)
 	window = tk.Tk()
 	application = MainWindow(window)
 	window.mainloop()
\ No newline at end of file
@@ -0,0 +1,226 @@
+"""
+A metrics module for recording the performance of every template
+generation in the report database next to the usage record
+"""
+
+__author__ = "Monish Mohanan"
+__version__ = "1.0"
+
+# Importing required libraries
+try:
+	import platform
+	from datetime import datetime
+	from instrumentation import tracer
+except ImportError as e:
+	from tkinter import messagebox
+	messagebox.showwarning("Import Error", str(e))
+
+# Defining the necessary constants
+METRICS_TABLE = '''CREATE TABLE IF NOT EXISTS Metrics(
+	ID INTEGER PRIMARY KEY,
+	RecordID INTEGER NOT NULL,
+	Date TEXT NOT NULL,
+	Machine TEXT NOT NULL,
+	TestVersion TEXT,
+	CostVersion TEXT,
+	LoadTime REAL,
+	SearchTime REAL,
+	CostTime REAL,
+	RenderTime REAL,
+	LocalWriteTime REAL,
+	NetworkWriteTime REAL,
+	Tests INTEGER,
+	PdfSize INTEGER)'''
+METRICS_INDEX = '''CREATE INDEX IF NOT EXISTS MetricsDate
+	ON Metrics(Date, Machine)'''
+
+# Timing columns of the Metrics table and the stage each is taken from
+TIMINGS = {
+	"SearchTime" : ("search", "test_search"),
+	"CostTime" : ("search", "cost_search"),
+	"RenderTime" : ("generation", "pdf_render"),
+	"LocalWriteTime" : ("generation", "local_write"),
+	"NetworkWriteTime" : ("generation", "network_write")
+	}
+
+class GenerationMetrics:
+	"""
+	A class for collecting the timings of a template generation
+
+	and storing them in the Metrics table of the report database
+
+	Attributes:
+	----------
+		generation : instrumentation.Span
+			Open stage of the template generation
+
+		versions : dict
+			SHA-1 digests of the searched test and cost database files
+
+		search : instrumentation.Span
+			Finished search of the tests and costs of the template
+
+	Method:
+	------
+		values : Returns the metrics of the generation
+
+		insert : Inserts the metrics of a generation
+
+		store : Inserts the metrics of the generation
+	"""
+
+	def __init__(self, generation, versions, search = None):
+		"""
+		Constructs the identifiers for recording the metrics
+
+		Parameters:
+		----------
+			generation : instrumentation.Span
+				Open stage of the template generation
+
+			versions : dict
+				SHA-1 digests of the searched test and cost database
+				files, empty if they are not known
+
+			search : instrumentation.Span
+				Finished search of the tests and costs of the template,
+				None if it was not timed
+		"""
+
+		# Assigning the stages of the request, the search is the one
+		# of this template and not the last one of the process
+		self.spans = {
+			"search" : search,
+			"generation" : generation
+			}
+		self.machine = platform.node()
+		self.test_version = versions.get("Test")
+		self.cost_version = versions.get("Cost")
+
+	def timing(self, column):
+		"""
+		Returns the duration of the stage recorded for the column
+
+		Parameters:
+		----------
+			column : str
+				Timing column of the Metrics table
+
+		Return:
+		------
+			duration : float
+				Seconds spent in the stage, None if it was not recorded
+		"""
+
+		request, stage = TIMINGS[column]
+		span = self.spans[request]
+		if span is None:
+			return None
+		span = span.find(stage)
+		return None if span is None else round(span.duration, 6)
+
+	def values(self, tests, pdf_size):
+		"""
+		Returns the metrics of the generation in the order of the columns
+
+		of the Metrics table after RecordID
+
+		Parameters:
+		----------
+			tests : int
+				Number of tests in the template
+
+			pdf_size : int
+				Size of the generated PDF in bytes
+
+		Return:
+		------
+			values : list
+				Date, machine, data versions, timings, tests and size
+		"""
+
+		return [
+			datetime.now().strftime("%Y-%m-%d"),
+			self.machine, self.test_version, self.cost_version,
+			tracer.ready, self.timing("SearchTime"),
+			self.timing("CostTime"), self.timing("RenderTime"),
+			self.timing("LocalWriteTime"),
+			self.timing("NetworkWriteTime"), tests, pdf_size]
+
+	@staticmethod
+	def insert(cursor, record_id, values):
+		"""
+		Inserts the metrics values returned by values for the given record
+
+		Parameters:
+		----------
+			cursor : sqlite3.Cursor
+				Cursor of the report database
+
+			record_id : int
+				ID of the usage record in the Record table
+
+			values : list
+				Metrics of the generation
+
+		Return:
+		------
+			None
+		"""
+
+		cursor.execute(METRICS_TABLE)
+		cursor.execute(METRICS_INDEX)
+		cursor.execute('''INSERT INTO Metrics(RecordID, Date, Machine,
+			TestVersion, CostVersion, LoadTime, SearchTime, CostTime,
+			RenderTime, LocalWriteTime, NetworkWriteTime, Tests, PdfSize
+			)VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+			[record_id] + list(values))
+
+	def store(self, cursor, record_id, tests, pdf_size):
+		"""
+		Inserts the metrics of the generation for the given record
+
+		Parameters:
+		----------
+			cursor : sqlite3.Cursor
+				Cursor of the report database
+
+			record_id : int
+				ID of the usage record in the Record table
+
+			tests : int
+				Number of tests in the template
+
+			pdf_size : int
+				Size of the generated PDF in bytes
+
+		Return:
+		------
+			None
+		"""
+
+		GenerationMetrics.insert(
+			cursor, record_id, self.values(tests, pdf_size))
+
+def percentile(values, rank):
+	"""
+	Returns the nearest-rank percentile of the values
+
+	Parameters:
+	----------
+		values : list
+			Sorted measurements without missing values
+
+		rank : int
+			Percentile to be returned e.g. 90
+
+	Return:
+	------
+		value : float
+			Percentile of the values, None if there are no values
+	"""
+
+	if not values:
+		return None
+	index = max(0, -(-rank * len(values) // 100) - 1)
+	return values[index]
@@ -0,0 +1,196 @@
+"""
+A model module for the tests, costs and usage records shared by the
+search, the windows, the template and the reports of the application
+"""
+
+__author__ = "Monish Mohanan"
+__version__ = "1.0"
+
+def parse_wpid(value):
+	"""
+	Returns the work package id of a cell of the test or the cost
+
+	database as an int, e.g. 1111111.0, "1111111" and "1111111.0"
+	all give 1111111
+
+	Parameters:
+	----------
+		value : float or str
+			Value of the cell
+
+	Return:
+	------
+		wpid : int
+			Work package id, None if the cell is not a work package id
+	"""
+
+	if isinstance(value, float):
+		if value.is_integer() and value > 0:
+			return int(value)
+		return None
+	text = str(value).strip()
+	if text.endswith(".0"):
+		text = text[:-2]
+	if text.isdigit() and int(text) > 0:
+		return int(text)
+	return None
+
+class TestItem:
+	"""
+	A class to represent a test to be performed along with its cost
+
+	Attributes:
+	----------
+		wpid : int
+			Work package id of the test, None if it is malformed
+
+		name : str
+			Name of the test
+
+		cost : float
+			Cost of the test, None if it is not searched yet
+
+	Method:
+	------
+		join : Pairs the tests and the costs by their work package ids
+
+		total : Returns the total cost of the tests
+	"""
+
+	__slots__ = ("wpid", "name", "cost")
+
+	def __init__(self, wpid, name, cost = None):
+		self.wpid = wpid
+		self.name = name
+		self.cost = cost
+
+	def __repr__(self):
+		return "TestItem(%r, %r, %r)" % (self.wpid, self.name, self.cost)
+
+	@classmethod
+	def join(cls, tests, costs):
+		"""
+		Pairs every test with its cost by the work package id
+
+		Parameters:
+		----------
+			tests : dict
+				Work package ids and test names
+
+			costs : dict
+				Work package ids and costs
+
+		Return:
+		------
+			items : list
+				TestItem of every test in the order of the test database
+		"""
+
+		return [cls(wpid, name, costs.get(wpid))
+			for wpid, name in tests.items()]
+
+	@staticmethod
+	def total(items):
+		"""
+		Returns the total cost of the tests rounded to 2 decimals
+		"""
+
+		return round(sum(float(item.cost) for item in items), 2)
+
+class UsageRecord:
+	"""
+	A class to represent a generated template recorded in report.db
+
+	Attributes:
+	----------
+		id : int
+			Number of the record
+
+		date : str
+			Date of the generation in %d/%m/%Y
+
+		time : str
+			Time of the generation in %H:%M:%S
+
+		requester, creator : str
+			Requester and creator of the template
+
+		change_type : str
+			Change type of the template
+
+		tests : int
+			Number of tests in the template
+
+		cost : float
+			Total cost of the template
+
+		link : str
+			Location of the template in the server
+
+		user : str
+			User who generated the template
+
+		subassembly, part : str
+			Subassembly and part name of the template
+
+	Method:
+	------
+		fetch : Reads the records of the report database
+	"""
+
+	COLUMNS = (
+		"ID", "Date", "Time", "Requester", "Creator", "Changetype",
+		"Test", "Cost", "Link", "User", "Subassembly", "Partname"
+		)
+
+	__slots__ = (
+		"id", "date", "time", "requester", "creator", "change_type",
+		"tests", "cost", "link", "user", "subassembly", "part"
+		)
+
+	def __init__(self, id, date, time, requester, creator, change_type,
+			tests, cost, link, user, subassembly, part):
+		self.id = id
+		self.date = date
+		self.time = time
+		self.requester = requester
+		self.creator = creator
+		self.change_type = change_type
+		self.tests = tests
+		self.cost = cost
+		self.link = link
+		self.user = user
+		self.subassembly = subassembly
+		self.part = part
+
+	def __repr__(self):
+		return "UsageRecord(%r, %r, %r)" % (self.id, self.date, self.link)
+
+	@classmethod
+	def fetch(cls, cursor, where = "", parameters = (), source = "Record"):
+		"""
+		Reads the records of the report database in one query
+
+		Parameters:
+		----------
+			cursor : sqlite3.Cursor object
+				Cursor of the report database
+
+			where : str
+				Optional condition of the query e.g. WHERE ID > ?
+
+			parameters : tuple
+				Parameters of the condition
+
+			source : str
+				Table or subquery holding the records
+
+		Return:
+		------
+			records : list
+				UsageRecord of every matching row
+		"""
+
+		cursor.execute('''SELECT %s FROM %s %s''' % (
+			", ".join(cls.COLUMNS), source, where), parameters)
+		return [cls(*row) for row in cursor.fetchall()]
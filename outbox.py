@@ -0,0 +1,576 @@
+"""
+An outbox module for journaling the usage records on the local disk
+and synchronising them with the shared report database in batches
+"""
+
+__author__ = "Monish Mohanan"
+__version__ = "1.0"
+
+# Importing required libraries
+try:
+	import os
+	import json
+	import time
+	import sqlite3
+	import logging
+	import threading
+	import traceback
+	from urllib.request import pathname2url
+	from iolayer import IOLayer
+	from metrics import GenerationMetrics
+	from history import RecordIndex, RecordFingerprint
+	from localcache import CACHE_FOLDER
+	from archive import ReportArchive, ARCHIVE_DAYS
+except ImportError as e:
+	from tkinter import messagebox
+	messagebox.showwarning("Import Error", str(e))
+
+# Defining the necessary constants
+OUTBOX_DATABASE = CACHE_FOLDER + "outbox.db"
+SYNC_INTERVAL = 60.0
+SYNC_BATCH = 100
+MAX_ATTEMPTS = 5
+
+# Errors of a server that is offline, locked or busy, the records are
+# tried again later without counting the attempt against them
+TRANSIENT_ERRORS = (OSError, sqlite3.OperationalError)
+ARCHIVE_INTERVAL = 24 * 3600.0
+RECORD_COLUMNS = (
+	"Date", "Time", "Requester", "Creator", "Changetype", "Test", "Cost",
+	"Link", "User", "Subassembly", "Partname")
+OUTBOX_TABLE = '''CREATE TABLE IF NOT EXISTS Outbox(
+	Key TEXT PRIMARY KEY,
+	Report TEXT NOT NULL,
+	Record TEXT NOT NULL,
+	Metrics TEXT,
+	Source TEXT,
+	Destination TEXT,
+	Queued REAL NOT NULL,
+	Attempts INTEGER NOT NULL DEFAULT 0,
+	Error TEXT
+	)'''
+FAILED_TABLE = '''CREATE TABLE IF NOT EXISTS OutboxFailed(
+	Key TEXT PRIMARY KEY,
+	Report TEXT NOT NULL,
+	Record TEXT NOT NULL,
+	Metrics TEXT,
+	Source TEXT,
+	Destination TEXT,
+	Queued REAL NOT NULL,
+	Attempts INTEGER NOT NULL DEFAULT 0,
+	Error TEXT
+	)'''
+COUNT_TABLE = '''CREATE TABLE IF NOT EXISTS RecordCount(
+	Report TEXT PRIMARY KEY,
+	Records INTEGER NOT NULL
+	)'''
+KEY_TABLE = '''CREATE TABLE IF NOT EXISTS RecordKey(
+	Key TEXT PRIMARY KEY,
+	RecordID INTEGER NOT NULL
+	)'''
+
+class ReportOutbox:
+	"""
+	A class for a durable journal of the usage records waiting to be
+
+	inserted in the shared report database
+
+	A generation only writes to the journal on the local disk. The
+	syncer inserts the journaled records in the report database in one
+	transaction per batch, together with an idempotency key per record,
+	so a batch interrupted after its commit is never inserted twice.
+	A template whose copy could not be written to the server folder is
+	copied from the local folder before its record is inserted
+
+	A batch failing on a bad record is retried one record at a time,
+	so a bad record does not hold back the others. A record failing
+	MAX_ATTEMPTS times is moved to the OutboxFailed table of the
+	journal for a manual review. An offline, locked or busy report
+	database only postpones the records, it never counts as an attempt
+
+	Attributes:
+	----------
+		path : str
+			Location of the journal on the local disk
+
+	Method:
+	------
+		connect : Opens the journal
+
+		report : Opens the shared report database without creating it
+
+		number : Returns the number of the next template
+
+		enqueue : Journals a usage record
+
+		pending : Returns the number of journaled records
+
+		flush : Synchronises every journaled record
+
+		retry : Synchronises a failed batch one record at a time
+
+		fail : Records the failed attempt of journaled records
+
+		sync : Inserts a batch of records in one transaction
+
+		maintain : Archives the old records once a day
+
+		start : Starts the syncer
+
+		poke : Triggers a synchronisation
+	"""
+
+	def __init__(self, path = OUTBOX_DATABASE):
+		"""
+		Constructs the identifiers of the outbox
+
+		Parameters:
+		----------
+			path : str
+				Location of the journal on the local disk
+		"""
+
+		self.path = path
+		self.lock = threading.Lock()
+		self.syncer = None
+		self.archived = dict()
+
+	def connect(self):
+		"""
+		Opens the journal, creating it the first time
+		"""
+
+		os.makedirs(os.path.dirname(self.path) or ".", exist_ok = True)
+		journal = sqlite3.connect(self.path, timeout = 30)
+		journal.execute(OUTBOX_TABLE)
+		journal.execute(FAILED_TABLE)
+		journal.execute(COUNT_TABLE)
+		return journal
+
+	@staticmethod
+	def report(path):
+		"""
+		Opens the shared report database, failing instead of creating an
+
+		empty database if the path is not reachable
+		"""
+
+		return sqlite3.connect(
+			"file:%s?mode=rw" % pathname2url(os.path.abspath(path)),
+			uri = True, timeout = 30)
+
+	def number(self, report):
+		"""
+		Returns the number of the next template, the records of the
+
+		report database and the journaled ones count. The last number
+		of records read is used while the report database is not
+		reachable
+
+		Parameters:
+		----------
+			report : str
+				Location of the report database
+
+		Return:
+		------
+			number : int
+				Number of the next template, None if the report database
+				has never been reached
+		"""
+
+		journal = self.connect()
+		try:
+			pending = journal.execute('''SELECT COUNT(Key) FROM Outbox
+				WHERE Report = ?''', (report,)).fetchone()[0]
+			try:
+				database = ReportOutbox.report(report)
+				try:
+					records = ReportArchive.count(database)
+				finally:
+					database.close()
+			except sqlite3.Error:
+				row = journal.execute('''SELECT Records FROM RecordCount
+					WHERE Report = ?''', (report,)).fetchone()
+				if row is None:
+					return None
+				records = row[0]
+			else:
+				with journal:
+					journal.execute('''INSERT OR REPLACE INTO
+						RecordCount(Report, Records) VALUES(?, ?)''',
+						(report, records))
+		finally:
+			journal.close()
+		return records + pending + 1
+
+	def enqueue(self, key, report, record, metrics = None,
+			source = None, destination = None):
+		"""
+		Journals the usage record and wakes the syncer
+
+		Parameters:
+		----------
+			key : str
+				Idempotency key of the record
+
+			report : str
+				Location of the report database
+
+			record : dict
+				Values of the Record columns
+
+			metrics : list
+				Values of GenerationMetrics, None if not collected
+
+			source, destination : str
+				Local and server location of a template still to be
+				copied to the server folder, None if it is written
+
+		Return:
+		------
+			None
+		"""
+
+		journal = self.connect()
+		try:
+			with journal:
+				journal.execute('''INSERT INTO Outbox(Key, Report, Record,
+					Metrics, Source, Destination, Queued)
+					VALUES(?, ?, ?, ?, ?, ?, ?)''', (
+						key, report, json.dumps(record),
+						None if metrics is None else json.dumps(metrics),
+						source, destination, time.time()))
+		finally:
+			journal.close()
+		self.poke()
+
+	def pending(self):
+		"""
+		Returns the number of records waiting to be synchronised
+		"""
+
+		journal = self.connect()
+		try:
+			return journal.execute(
+				'''SELECT COUNT(Key) FROM Outbox''').fetchone()[0]
+		finally:
+			journal.close()
+
+	def flush(self):
+		"""
+		Synchronises the journaled records in batches, oldest first,
+
+		leaving a batch journaled while its report database is offline,
+		locked or busy and skipping the records that fail on their own
+
+		Parameters:
+		----------
+			None
+
+		Return:
+		------
+			synced : int
+				Number of records inserted or found already inserted
+		"""
+
+		synced = 0
+		with self.lock:
+			journal = self.connect()
+			try:
+				reports = [row[0] for row in journal.execute(
+					'''SELECT DISTINCT Report FROM Outbox''').fetchall()]
+				for report in reports:
+					reachable = True
+					skipped = set()
+					while reachable:
+						rows = journal.execute('''SELECT Key, Record,
+							Metrics, Source, Destination FROM Outbox
+							WHERE Report = ? ORDER BY Queued LIMIT ?''',
+							(report, SYNC_BATCH + len(skipped))).fetchall()
+						batch = [row for row in rows
+							if row[0] not in skipped][:SYNC_BATCH]
+						if not batch:
+							break
+						try:
+							self.sync(report, batch)
+						except TRANSIENT_ERRORS as e:
+							self.fail(journal, batch, e, counted = False)
+							logging.warning("%d records wait for %s: %s" % (
+								len(batch), report, e))
+							reachable = False
+							continue
+						except Exception:
+							done, failed, error = self.retry(
+								journal, report, batch)
+							synced += done
+							skipped.update(failed)
+							reachable = error is None
+							continue
+						with journal:
+							journal.executemany(
+								'''DELETE FROM Outbox WHERE Key = ?''',
+								[(row[0],) for row in batch])
+						synced += len(batch)
+					if reachable:
+						self.maintain(report)
+			finally:
+				journal.close()
+		return synced
+
+	def retry(self, journal, report, batch):
+		"""
+		Synchronises the records of a failed batch one at a time,
+
+		moving a record to the OutboxFailed table once it has failed
+		MAX_ATTEMPTS times. The retry stops at the first offline, locked
+		or busy error, which is not counted against the record
+
+		Parameters:
+		----------
+			journal : sqlite3.Connection
+				Open journal
+
+			report : str
+				Location of the report database
+
+			batch : list
+				Key, record, metrics, source and destination of the
+				journaled records
+
+		Return:
+		------
+			synced : int
+				Number of records inserted
+
+			failed : list
+				Keys of the records that failed
+
+			error : Exception
+				Offline, locked or busy error that stopped the retry,
+				None if every record was tried
+		"""
+
+		synced = 0
+		failed = list()
+		for row in batch:
+			key = row[0]
+			try:
+				self.sync(report, [row])
+			except TRANSIENT_ERRORS as e:
+				self.fail(journal, [row], e, counted = False)
+				logging.warning("Records wait for %s: %s" % (report, e))
+				return synced, failed, e
+			except Exception as e:
+				failed.append(key)
+				self.fail(journal, [row], e)
+				attempts = journal.execute('''SELECT Attempts FROM Outbox
+					WHERE Key = ?''', (key,)).fetchone()[0]
+				if attempts < MAX_ATTEMPTS:
+					logging.warning("Record %s could not be inserted in %s, "
+						"attempt %d of %d: %s" % (
+							key, report, attempts, MAX_ATTEMPTS, e))
+					continue
+				with journal:
+					journal.execute('''INSERT OR REPLACE INTO OutboxFailed
+						SELECT * FROM Outbox WHERE Key = ?''', (key,))
+					journal.execute('''DELETE FROM Outbox WHERE Key = ?''',
+						(key,))
+				logging.error("Record %s could not be inserted in %s after "
+					"%d attempts, it is kept in OutboxFailed of %s: %s" % (
+						key, report, attempts, self.path, e))
+				continue
+			with journal:
+				journal.execute('''DELETE FROM Outbox WHERE Key = ?''', (key,))
+			synced += 1
+		return synced, failed, None
+
+	@staticmethod
+	def fail(journal, batch, error, counted = True):
+		"""
+		Keeps the error of a failed attempt of the journaled records and
+
+		counts the attempt unless the error is transient
+		"""
+
+		with journal:
+			journal.executemany('''UPDATE Outbox
+				SET Attempts = Attempts + ?, Error = ?
+				WHERE Key = ?''',
+				[(int(counted), str(error), row[0]) for row in batch])
+
+	def maintain(self, report):
+		"""
+		Archives the old records of the report database once a day
+
+		Parameters:
+		----------
+			report : str
+				Location of the report database
+
+		Return:
+		------
+			None
+		"""
+
+		if time.time() - self.archived.get(report, 0) < ARCHIVE_INTERVAL:
+			return
+		self.archived[report] = time.time()
+		try:
+			ReportArchive(report).archive(ARCHIVE_DAYS)
+		except (OSError, sqlite3.Error):
+			logging.error(traceback.format_exc())
+
+	def sync(self, report, batch):
+		"""
+		Copies the templates missing in the server folder and inserts
+
+		the records of the batch, their search index rows and their
+		fingerprints in one transaction, skipping the keys already
+		inserted
+
+		Parameters:
+		----------
+			report : str
+				Location of the report database
+
+			batch : list
+				Key, record, metrics, source and destination of the
+				journaled records
+
+		Return:
+		------
+			None
+		"""
+
+		for key, record, metrics, source, destination in batch:
+			if source is None:
+				continue
+			if not os.path.exists(source):
+				logging.warning("%s is missing, it is not copied to %s" % (
+					source, destination))
+				continue
+			with open(source, "rb") as template:
+				IOLayer.write_file(destination, template.read())
+
+		database = ReportOutbox.report(report)
+		try:
+			with database:
+				cursor = database.cursor()
+				cursor.execute(KEY_TABLE)
+				RecordIndex.ensure(cursor)
+				RecordFingerprint.ensure(cursor)
+				for key, record, metrics, source, destination in batch:
+					cursor.execute('''SELECT RecordID FROM RecordKey
+						WHERE Key = ?''', (key,))
+					if cursor.fetchone() is not None:
+						continue
+					values = json.loads(record)
+					cursor.execute('''INSERT INTO Record(%s) VALUES(%s)''' % (
+						", ".join(RECORD_COLUMNS),
+						", ".join("?" * len(RECORD_COLUMNS))),
+						[values[column] for column in RECORD_COLUMNS])
+					record_id = cursor.lastrowid
+					cursor.execute('''INSERT INTO RecordKey(Key, RecordID)
+						VALUES(?, ?)''', (key, record_id))
+					RecordIndex.index(cursor, record_id, values)
+					RecordFingerprint.assign(
+						cursor, record_id, values.get("Fingerprint"))
+					if metrics is not None:
+						GenerationMetrics.insert(
+							cursor, record_id, json.loads(metrics))
+		finally:
+			database.close()
+
+	def start(self, interval = SYNC_INTERVAL):
+		"""
+		Starts the syncer unless it is running, it synchronises the
+
+		records left by a previous session straight away
+		"""
+
+		with self.lock:
+			if self.syncer is None:
+				self.syncer = ReportSyncer(self, interval)
+				self.syncer.start()
+
+	def poke(self):
+		"""
+		Triggers a synchronisation without waiting for the interval
+		"""
+
+		self.start()
+		self.syncer.poke()
+
+class ReportSyncer(threading.Thread):
+	"""
+	A background thread synchronising the outbox with the report
+
+	databases until the application exits
+
+	Attributes:
+	----------
+		outbox : ReportOutbox
+			Journal of the records
+
+		interval : float
+			Seconds between two attempts
+
+	Method:
+	------
+		run : Synchronises the outbox until stopped
+
+		poke : Triggers a synchronisation without waiting
+
+		stop : Stops the syncer
+	"""
+
+	def __init__(self, outbox, interval = SYNC_INTERVAL):
+		"""
+		Constructs the identifiers of the syncer
+
+		Parameters:
+		----------
+			outbox : ReportOutbox
+				Journal of the records
+
+			interval : float
+				Seconds between two attempts
+		"""
+
+		threading.Thread.__init__(self, name = "ReportSyncer", daemon = True)
+		self.outbox = outbox
+		self.interval = interval
+		self.wake = threading.Event()
+		self.wake.set()
+		self.stopped = False
+
+	def run(self):
+		"""
+		Synchronises the outbox whenever it is poked or the interval ends
+		"""
+
+		while not self.stopped:
+			self.wake.wait(self.interval)
+			self.wake.clear()
+			try:
+				self.outbox.flush()
+			except Exception:
+				logging.error(traceback.format_exc())
+
+	def poke(self):
+		"""
+		Triggers a synchronisation without waiting for the interval
+		"""
+
+		self.wake.set()
+
+	def stop(self):
+		"""
+		Stops the syncer after the running synchronisation
+		"""
+
+		self.stopped = True
+		self.wake.set()
+
+outbox = ReportOutbox()
@@ -0,0 +1,245 @@
+"""
+A prefetch module for searching the tests and costs of a selection in
+the background while the user fills in the rest of the form
+"""
+
+__author__ = "Monish Mohanan"
+__version__ = "1.0"
+
+# Importing required libraries
+try:
+	import logging
+	import threading
+	from concurrent.futures import ThreadPoolExecutor, CancelledError
+	from instrumentation import tracer
+	from searchbase import LinearSearch
+except ImportError as e:
+	from tkinter import messagebox
+	messagebox.showwarning("Import Error", str(e))
+
+class SearchResult:
+	"""
+	A class to represent the search of a selection on a snapshot
+
+	Attributes:
+	----------
+		key : tuple
+			Change type, subassembly and part of the selection
+
+		snapshot : datastore.DataSnapshot
+			Databases the search ran on
+
+		test_results : dict or str
+			Work package IDs and test names, or a warning message
+
+		cost_results : dict or str
+			Work package IDs and costs, or a warning message, None if
+			the tests were not valid
+
+		span : instrumentation.Span
+			Finished stage of the search with its test and cost stages
+	"""
+
+	__slots__ = ("key", "snapshot", "test_results", "cost_results", "span")
+
+	def __init__(self, key, snapshot, test_results, cost_results, span):
+		self.key = key
+		self.snapshot = snapshot
+		self.test_results = test_results
+		self.cost_results = cost_results
+		self.span = span
+
+class SearchPrefetcher:
+	"""
+	A class for searching the selection speculatively
+
+	The search of a selection starts in a background thread as soon as
+	its change type and subassembly are chosen. A new selection replaces
+	the pending one, a search not started yet is cancelled and a search
+	finished for an older selection is discarded. Generate takes the
+	result if it was searched for the same selection on the current
+	snapshot of the databases, otherwise it searches as before
+
+	Attributes:
+	----------
+		store : datastore.DataStore
+			Data store of the loaded databases
+
+		info : infobase.InfoBase
+			Change types, subassemblies and parts
+
+		loads : tuple
+			Loads of the test and cost databases to wait for
+
+	Method:
+	------
+		compute : Searches the tests and costs of a selection
+
+		prefetch : Starts the search of a selection
+
+		run : Searches the pending selection in the background
+
+		result : Returns the prefetched result of a selection
+	"""
+
+	def __init__(self, store, info, loads = ()):
+		"""
+		Constructs the identifiers of the prefetcher
+
+		Parameters:
+		----------
+			store : datastore.DataStore
+				Data store of the loaded databases
+
+			info : infobase.InfoBase
+				Change types, subassemblies and parts
+
+			loads : tuple
+				concurrent.futures.Future of the database loads
+		"""
+
+		self.store = store
+		self.info = info
+		self.loads = loads
+		self.executor = ThreadPoolExecutor(
+			max_workers = 1, thread_name_prefix = "SearchPrefetcher")
+		self.lock = threading.Lock()
+		self.key = None
+		self.future = None
+
+	@staticmethod
+	def compute(snapshot, change_type, column):
+		"""
+		Searches the tests of the column and, if they are all valid,
+
+		their costs without warning the user
+
+		Parameters:
+		----------
+			snapshot : datastore.DataSnapshot
+				Loaded test and cost databases
+
+			change_type : int
+				Selected change type
+
+			column : int
+				Search column in the test database
+
+		Return:
+		------
+			test_results : dict or str
+				Work package IDs and test names, or a warning message
+
+			cost_results : dict or str
+				Work package IDs and costs, or a warning message, None
+				if the tests are not valid
+		"""
+
+		search = LinearSearch(
+			change_type,
+			snapshot.test_workbook,
+			snapshot.cost_workbook,
+			cost_index = snapshot.cost_index,
+			test_index = snapshot.test_index)
+		with tracer.span("test_search"):
+			test_results = search.extract_test(column)
+
+		cost_results = None
+		if (isinstance(test_results, dict) and test_results
+				and None not in test_results.keys()):
+			with tracer.span("cost_search"):
+				cost_results = search.extract_cost(test_results.keys())
+		return test_results, cost_results
+
+	def prefetch(self, change_type, subassembly, part):
+		"""
+		Starts the search of the selection unless it is already pending,
+
+		cancelling the search of the previous selection
+
+		Parameters:
+		----------
+			change_type : int
+				Selected change type, 0 if none
+
+			subassembly, part : str
+				Selected subassembly and part, empty if none
+
+		Return:
+		------
+			None
+		"""
+
+		if (change_type not in self.info.change_types
+				or subassembly not in self.info.subassemblies):
+			return
+
+		key = (change_type, subassembly, part or "")
+		with self.lock:
+			if key == self.key:
+				return
+			if self.future is not None:
+				self.future.cancel()
+			self.key = key
+			self.future = self.executor.submit(self.run, key)
+
+	def run(self, key):
+		"""
+		Searches the selection once the databases are loaded, unless a
+
+		newer selection replaced it in the meantime
+		"""
+
+		for load in self.loads:
+			load.result()
+		with self.lock:
+			if key != self.key:
+				return None
+
+		change_type, subassembly, part = key
+		snapshot = self.store.snapshot()
+		column = self.info.search_column(subassembly, part)
+		with tracer.span("prefetch") as span:
+			test_results, cost_results = SearchPrefetcher.compute(
+				snapshot, change_type, column)
+		return SearchResult(key, snapshot, test_results, cost_results, span)
+
+	def result(self, change_type, subassembly, part, snapshot):
+		"""
+		Returns the prefetched search of the selection, waiting for it
+
+		if it is still running
+
+		Parameters:
+		----------
+			change_type : int
+				Selected change type
+
+			subassembly, part : str
+				Selected subassembly and part, empty if none
+
+			snapshot : datastore.DataSnapshot
+				Snapshot the result has to be searched on
+
+		Return:
+		------
+			result : SearchResult
+				Prefetched result, None if the selection or the snapshot
+				differ or the search failed
+		"""
+
+		with self.lock:
+			if self.key != (change_type, subassembly, part or ""):
+				return None
+			future = self.future
+
+		try:
+			result = future.result()
+		except CancelledError:
+			return None
+		except Exception:
+			logging.warning("The prefetched search failed", exc_info = True)
+			return None
+		if result is None or result.snapshot is not snapshot:
+			return None
+		return result
@@ -0,0 +1,385 @@
+"""
+A quality module for scanning the test and cost databases for the
+data problems once, when they are loaded, instead of during a request
+"""
+
+__author__ = "Monish Mohanan"
+__version__ = "1.0"
+
+# Importing required libraries
+try:
+	import os
+	import csv
+	import sqlite3
+	import logging
+	import threading
+	import traceback
+	from collections import defaultdict
+	from instrumentation import tracer
+	from models import parse_wpid
+	from searchbase import (
+		FIRST_ROW, WPID_COLUMN, ID_COLUMN, COST_COLUMN, ChangeTypeMatcher)
+	from impact import ImpactMatrix, IMPACT_DATABASE, IMPACT_FOLDER
+except ImportError as e:
+	from tkinter import messagebox
+	messagebox.showwarning("Import Error", str(e))
+
+# Defining the necessary constants
+QUALITY_NAME = "Test Cost Data Quality"
+QUALITY_TABLE = '''CREATE TABLE IF NOT EXISTS Quality(
+	TestDigest TEXT NOT NULL,
+	CostDigest TEXT NOT NULL,
+	Kind TEXT NOT NULL,
+	Sheet TEXT,
+	Row INTEGER,
+	Value TEXT,
+	Detail TEXT
+	)'''
+HEADINGS = ("Problem", "Sheet", "Row", "Value", "Detail")
+MALFORMED_WPID = "Malformed WPID"
+DUPLICATE_TEST = "Duplicate test"
+UNREADABLE_CHANGE = "Unreadable change types"
+UNKNOWN_CHANGE = "Unknown change type"
+MISSING_COST = "Missing cost"
+CONFLICTING_COST = "Conflicting costs"
+NO_COST = "Test without cost"
+
+class Anomaly:
+	"""
+	A class to represent a data problem of the test or cost database
+
+	Attributes:
+	----------
+		kind : str
+			Kind of the problem e.g. Malformed WPID
+
+		sheet : str
+			Sheet of the problem
+
+		row : int
+			Row of the sheet as numbered in Excel, None for a problem
+			spanning several rows
+
+		value : str
+			Offending value
+
+		detail : str
+			Explanation of the problem
+	"""
+
+	__slots__ = ("kind", "sheet", "row", "value", "detail")
+
+	def __init__(self, kind, sheet, row, value, detail = ""):
+		self.kind = kind
+		self.sheet = sheet
+		self.row = row
+		self.value = value
+		self.detail = detail
+
+	def values(self):
+		return (self.kind, self.sheet, self.row, str(self.value), self.detail)
+
+class DataQuality:
+	"""
+	A class for scanning, caching and exporting the data problems of
+
+	the loaded databases
+
+	The databases are scanned from their loaded indexes and raw columns
+	in one pass per column. The problems are kept in a cache table per
+	version of the test and cost files, so a version is scanned once
+	whatever the number of sessions
+
+	Attributes:
+	----------
+		snapshot : datastore.DataSnapshot
+			Loaded test and cost databases
+
+		info : infobase.InfoBase
+			Change types, subassemblies and parts
+
+		path : str
+			Location of the cache database
+
+	Method:
+	------
+		scan_tests : Scans the test database
+
+		scan_costs : Scans the cost database
+
+		scan : Scans both databases
+
+		load : Returns the cached problems or scans the databases
+
+		store : Caches the problems
+
+		export_csv : Writes the problems as CSV
+	"""
+
+	def __init__(self, snapshot, info, path = IMPACT_DATABASE):
+		"""
+		Constructs the identifiers of the scan
+
+		Parameters:
+		----------
+			snapshot : datastore.DataSnapshot
+				Loaded test and cost databases
+
+			info : infobase.InfoBase
+				Change types, subassemblies and parts
+
+			path : str
+				Location of the cache database
+		"""
+
+		self.snapshot = snapshot
+		self.info = info
+		self.path = path
+		self.versions = tuple(
+			snapshot.signatures[field].digest for field in ("Test", "Cost"))
+		self.anomalies = list()
+
+	def scan_tests(self):
+		"""
+		Returns the malformed and duplicate work package ids and the
+
+		change types that cannot be read in the search columns
+
+		Parameters:
+		----------
+			None
+
+		Return:
+		------
+			anomalies : list
+				Anomaly of every problem of the test database
+		"""
+
+		test_index = self.snapshot.test_index
+		sheet = test_index.sheet
+		anomalies = list()
+
+		rows = defaultdict(list)
+		cells = sheet.col_values(WPID_COLUMN, FIRST_ROW)
+		for row, (cell, item) in enumerate(
+				zip(cells, test_index.items), start = FIRST_ROW + 1):
+			if item.wpid is not None:
+				rows[item.wpid].append(row)
+			elif str(cell).strip() or item.name.strip():
+				anomalies.append(Anomaly(
+					MALFORMED_WPID, sheet.name, row, cell,
+					"%s is left out of every search" % item.name))
+		for wpid, found in rows.items():
+			if len(found) > 1:
+				anomalies.append(Anomaly(
+					DUPLICATE_TEST, sheet.name, found[0], wpid,
+					"Also in rows %s" % ", ".join(map(str, found[1:]))))
+
+		known = ChangeTypeMatcher.mask(self.info.change_types)
+		invalid = test_index.matcher.invalid
+		columns = sorted(set(column for subassembly, part, column
+			in ImpactMatrix(self.snapshot, self.info).combinations()))
+		for column in columns:
+			masks = test_index.column(column - 1)
+			values = sheet.col_values(column - 1, FIRST_ROW)
+			for row, (value, mask) in enumerate(
+					zip(values, masks), start = FIRST_ROW + 1):
+				if not mask or value in invalid:
+					if str(value).strip() not in ("", "0", "0.0"):
+						anomalies.append(Anomaly(
+							UNREADABLE_CHANGE, sheet.name, row, value,
+							"Column %d" % column))
+				elif mask & ~known:
+					anomalies.append(Anomaly(
+						UNKNOWN_CHANGE, sheet.name, row, value,
+						"Column %d" % column))
+		return anomalies
+
+	def scan_costs(self):
+		"""
+		Returns the malformed work package ids, the missing costs, the
+
+		work packages with different costs in several sheets and the
+		tests without a cost
+
+		Parameters:
+		----------
+			None
+
+		Return:
+		------
+			anomalies : list
+				Anomaly of every problem of the cost database
+		"""
+
+		cost_index = self.snapshot.cost_index
+		anomalies = list()
+		for sheet in self.snapshot.cost_workbook.sheets():
+			if sheet.ncols <= COST_COLUMN:
+				continue
+			for row, (package, cost) in enumerate(zip(
+					sheet.col_values(ID_COLUMN, 1),
+					sheet.col_values(COST_COLUMN, 1)), start = 2):
+				wpid = parse_wpid(package)
+				if wpid is None:
+					if str(package).strip():
+						anomalies.append(Anomaly(
+							MALFORMED_WPID, sheet.name, row, package))
+					continue
+				try:
+					float(cost)
+				except (TypeError, ValueError):
+					anomalies.append(Anomaly(
+						MISSING_COST, sheet.name, row, wpid,
+						"Cost cell %r" % cost))
+
+		for wpid, found in sorted(cost_index.conflicts.items()):
+			anomalies.append(Anomaly(
+				CONFLICTING_COST, found[-1][0], None, wpid,
+				"; ".join("%s : %s" % (name, cost) for name, cost in found)))
+
+		test_index = self.snapshot.test_index
+		tests = dict((item.wpid, item.name) for item in test_index.items
+			if item.wpid is not None)
+		for wpid in sorted(tests.keys() - cost_index.costs.keys()):
+			anomalies.append(Anomaly(
+				NO_COST, test_index.sheet.name, None, wpid, tests[wpid]))
+		return anomalies
+
+	def scan(self):
+		"""
+		Scans the test and the cost databases
+
+		Parameters:
+		----------
+			None
+
+		Return:
+		------
+			anomalies : list
+				Anomaly of every problem found
+		"""
+
+		with tracer.span("data_quality") as span:
+			self.anomalies = self.scan_tests() + self.scan_costs()
+			span.count("anomalies", len(self.anomalies))
+		return self.anomalies
+
+	def load(self):
+		"""
+		Returns the cached problems of the loaded versions of the test
+
+		and cost files, scanning them and caching the problems if the
+		versions have not been scanned yet
+
+		Parameters:
+		----------
+			None
+
+		Return:
+		------
+			anomalies : list
+				Anomaly of every problem found
+		"""
+
+		os.makedirs(os.path.dirname(self.path) or ".", exist_ok = True)
+		cache = sqlite3.connect(self.path)
+		try:
+			cache.execute(QUALITY_TABLE)
+			rows = cache.execute('''SELECT Kind, Sheet, Row, Value, Detail
+				FROM Quality WHERE TestDigest = ? AND CostDigest = ?
+				ORDER BY rowid''', self.versions).fetchall()
+		finally:
+			cache.close()
+
+		# A scan without any problem is cached as one empty row
+		if rows:
+			self.anomalies = [Anomaly(*row) for row in rows if row[0]]
+		else:
+			self.store(self.scan())
+		return self.anomalies
+
+	def store(self, anomalies):
+		"""
+		Replaces the cached problems by the given ones
+
+		Parameters:
+		----------
+			anomalies : list
+				Anomaly of every problem found
+
+		Return:
+		------
+			None
+		"""
+
+		rows = [anomaly.values() for anomaly in anomalies] or [
+			("", None, None, None, None)]
+		cache = sqlite3.connect(self.path)
+		try:
+			with cache:
+				cache.execute(QUALITY_TABLE)
+				cache.execute('''DELETE FROM Quality''')
+				cache.executemany('''INSERT INTO Quality(TestDigest,
+					CostDigest, Kind, Sheet, Row, Value, Detail)
+					VALUES(?, ?, ?, ?, ?, ?, ?)''',
+					[self.versions + row for row in rows])
+		finally:
+			cache.close()
+
+	def export_csv(self, folder = IMPACT_FOLDER):
+		"""
+		Writes the problems to a CSV file in the folder and returns
+
+		its location
+		"""
+
+		os.makedirs(folder, exist_ok = True)
+		path = os.path.join(folder, QUALITY_NAME + ".csv")
+		with open(path, "w", newline = "") as output:
+			writer = csv.writer(output)
+			writer.writerow(HEADINGS)
+			writer.writerows(anomaly.values() for anomaly in self.anomalies)
+		return path
+
+def scan_async(store, info, *loads):
+	"""
+	Scans the databases of the store in a background thread once the
+
+	given loads are finished, logging a summary of the problems
+
+	Parameters:
+	----------
+		store : datastore.DataStore
+			Data store of the loaded databases
+
+		info : infobase.InfoBase
+			Change types, subassemblies and parts
+
+		*loads : concurrent.futures.Future
+			Loads of the test and cost databases to wait for
+
+	Return:
+	------
+		thread : threading.Thread
+			Thread performing the scan
+	"""
+
+	def scan():
+		try:
+			for load in loads:
+				load.result()
+			anomalies = DataQuality(store.snapshot(), info).load()
+		except Exception:
+			logging.error(traceback.format_exc())
+			return
+		if anomalies:
+			kinds = defaultdict(int)
+			for anomaly in anomalies:
+				kinds[anomaly.kind] += 1
+			logging.warning("Data quality: " + ", ".join(
+				"%d %s" % (count, kind) for kind, count in sorted(kinds.items())))
+
+	thread = threading.Thread(target = scan, name = "DataQuality", daemon = True)
+	thread.start()
+	return thread
@@ -0,0 +1,315 @@
+"""
+A recost module for comparing the totals of the generated templates
+with the totals of the same requests against the loaded databases
+"""
+
+__author__ = "Monish Mohanan"
+__version__ = "1.0"
+
+# Importing required libraries
+try:
+	import os
+	import csv
+	import sqlite3
+	from fpdf import FPDF
+	from instrumentation import tracer
+	from models import UsageRecord
+	from archive import ReportArchive
+	from impact import ImpactMatrix, IMPACT_DATABASE, IMPACT_FOLDER
+	from template import TransmissionTemplate
+except ImportError as e:
+	from tkinter import messagebox
+	messagebox.showwarning("Import Error", str(e))
+
+# Defining the necessary constants
+RECOST_NAME = "Test Cost Recosting"
+RECOST_TABLE = '''CREATE TABLE IF NOT EXISTS Recost(
+	RecordID INTEGER NOT NULL,
+	Date TEXT,
+	Changetype TEXT,
+	Subassembly TEXT,
+	Partname TEXT,
+	OldTests INTEGER,
+	NewTests INTEGER,
+	OldCost REAL,
+	NewCost REAL,
+	Delta REAL,
+	Added INTEGER,
+	Removed INTEGER,
+	Missing INTEGER,
+	CostDigest TEXT NOT NULL
+	)'''
+HEADINGS = (
+	"ID", "Date", "Change Type", "Subassembly", "Part Name",
+	"Old Tests", "New Tests", "Old Total (EUR)", "New Total (EUR)",
+	"Delta (EUR)", "Tests Added", "Tests Removed", "Missing")
+
+class RecostRow:
+	"""
+	A class to represent a generated template costed again
+
+	Attributes:
+	----------
+		record : models.UsageRecord
+			Record of the generated template
+
+		impact : impact.ImpactRow
+			Tests and total of its request in the loaded databases, None
+			if the request is no longer known
+
+	Method:
+	------
+		values : Returns the comparison in the order of the headings
+	"""
+
+	__slots__ = ("record", "impact")
+
+	def __init__(self, record, impact):
+		self.record = record
+		self.impact = impact
+
+	@property
+	def delta(self):
+		if self.impact is None:
+			return None
+		return round(self.impact.cost - float(self.record.cost), 2)
+
+	def values(self):
+		"""
+		Returns the old and new number of tests and totals, the delta
+
+		and the tests added and removed. The records hold the number of
+		tests only, so the tests added and removed are counted from the
+		difference of the numbers
+		"""
+
+		record = self.record
+		old_tests = int(float(record.tests))
+		old_cost = round(float(record.cost), 2)
+		if self.impact is None:
+			return (record.id, record.date, record.change_type,
+				record.subassembly, record.part, old_tests, None, old_cost,
+				None, None, None, None, None)
+		new_tests = self.impact.tests
+		return (record.id, record.date, record.change_type,
+			record.subassembly, record.part, old_tests, new_tests, old_cost,
+			round(self.impact.cost, 2), self.delta,
+			max(new_tests - old_tests, 0), max(old_tests - new_tests, 0),
+			self.impact.missing)
+
+class RecostJob:
+	"""
+	A class for costing every generated template again
+
+	The impact matrix holds the tests and the total of every request
+	of the loaded databases, computed in one pass over the indexes, so
+	a record is costed again by a lookup of its change type, subassembly
+	and part, whatever the number of records
+
+	Attributes:
+	----------
+		snapshot : datastore.DataSnapshot
+			Loaded test and cost databases
+
+		info : infobase.InfoBase
+			Change types, subassemblies and parts
+
+		report : str
+			Location of the report database or of its replica
+
+		archive : archive.ReportArchive
+			Yearly archives of the report database, if any
+
+		path : str
+			Location of the cache database
+
+	Method:
+	------
+		records : Reads the records and the archived ones
+
+		run : Costs every record again
+
+		store : Writes the comparison to the Recost table
+
+		export_csv : Writes the comparison as CSV
+
+		export_pdf : Writes the comparison as PDF
+
+		export : Writes the comparison in every format
+	"""
+
+	def __init__(self, snapshot, info, report, archive = None,
+			path = IMPACT_DATABASE):
+		"""
+		Constructs the identifiers of the job
+
+		Parameters:
+		----------
+			snapshot : datastore.DataSnapshot
+				Loaded test and cost databases
+
+			info : infobase.InfoBase
+				Change types, subassemblies and parts
+
+			report : str
+				Location of the report database or of its replica
+
+			archive : archive.ReportArchive
+				Yearly archives of the report database, if any
+
+			path : str
+				Location of the cache database
+		"""
+
+		self.snapshot = snapshot
+		self.info = info
+		self.report = report
+		self.archive = archive
+		self.path = path
+		self.rows = list()
+
+	def records(self):
+		"""
+		Returns the records of the report database and of its archives
+		"""
+
+		connection = sqlite3.connect(self.report)
+		try:
+			schemas = list()
+			if self.archive is not None:
+				schemas = self.archive.attach(connection)
+			return UsageRecord.fetch(
+				connection.cursor(), "ORDER BY ID", (),
+				ReportArchive.union("Record", schemas, UsageRecord.COLUMNS))
+		finally:
+			connection.close()
+
+	def run(self):
+		"""
+		Costs every record again against the loaded databases
+
+		Parameters:
+		----------
+			None
+
+		Return:
+		------
+			rows : list
+				RecostRow of every record, oldest first
+		"""
+
+		matrix = ImpactMatrix(self.snapshot, self.info)
+		matrix.load()
+
+		# The records hold the change types as printed in the templates
+		numbers = dict(
+			(TransmissionTemplate.short_change_type(change), number)
+			for number, change in self.info.change_types.items())
+		impacts = dict(
+			((row.change_type, row.subassembly, row.part), row)
+			for row in matrix.rows)
+
+		with tracer.span("recost") as span:
+			self.rows = [RecostRow(record, impacts.get((
+				numbers.get(record.change_type),
+				record.subassembly,
+				record.part or "NA")))
+				for record in self.records()]
+			span.count("records", len(self.rows))
+		return self.rows
+
+	def store(self):
+		"""
+		Replaces the comparison of the Recost table by the last run
+		"""
+
+		os.makedirs(os.path.dirname(self.path) or ".", exist_ok = True)
+		digest = self.snapshot.signatures["Cost"].digest
+		cache = sqlite3.connect(self.path)
+		try:
+			with cache:
+				cache.execute(RECOST_TABLE)
+				cache.execute('''DELETE FROM Recost''')
+				cache.executemany('''INSERT INTO Recost(RecordID, Date,
+					Changetype, Subassembly, Partname, OldTests, NewTests,
+					OldCost, NewCost, Delta, Added, Removed, Missing,
+					CostDigest) VALUES(%s)''' % ", ".join("?" * 14),
+					[row.values() + (digest,) for row in self.rows])
+		finally:
+			cache.close()
+
+	def export_csv(self, path):
+		"""
+		Writes the comparison to a CSV file
+		"""
+
+		with open(path, "w", newline = "") as output:
+			writer = csv.writer(output)
+			writer.writerow(HEADINGS)
+			writer.writerows(row.values() for row in self.rows)
+
+	def export_pdf(self, path):
+		"""
+		Writes the changed records and the total delta to a PDF file
+		"""
+
+		columns = (
+			(1, 20), (2, 25), (3, 30), (4, 25), (5, 12), (6, 12),
+			(7, 22), (8, 22), (9, 22))
+		headings = ("Date", "Change Type", "Subassembly", "Part Name",
+			"Old", "New", "Old Total", "New Total", "Delta")
+		changed = [row for row in self.rows if row.delta != 0]
+		unknown = sum(row.impact is None for row in self.rows)
+		delta = round(sum(row.delta for row in changed if row.delta), 2)
+
+		pdf = FPDF(orientation = 'P', unit = 'mm', format = 'A4')
+		pdf.add_page()
+		pdf.set_font("Arial", "B", size = 12)
+		pdf.cell(190, 10, txt = RECOST_NAME, align = 'C')
+		pdf.ln()
+		pdf.set_font("Arial", size = 9)
+		pdf.cell(190, 6, txt = "%d records, %d changed, %d no longer "
+			"found, total delta %.2f EUR" % (
+				len(self.rows), len(changed), unknown, delta))
+		pdf.ln(8)
+
+		pdf.set_font("Arial", "B", size = 8)
+		for heading, (index, width) in zip(headings, columns):
+			pdf.cell(width, 7, txt = heading, align = 'C', border = 1)
+		pdf.ln()
+		pdf.set_font("Arial", size = 7)
+		for row in changed:
+			values = row.values()
+			for index, width in columns:
+				value = values[index]
+				if value is None:
+					value = "-"
+				elif isinstance(value, float):
+					value = "%.2f" % value
+				pdf.cell(width, 6, txt = str(value), align = 'C', border = 1)
+			pdf.ln()
+		pdf.output(path)
+
+	def export(self, folder = IMPACT_FOLDER):
+		"""
+		Writes the comparison as CSV and PDF to the folder
+
+		Parameters:
+		----------
+			folder : str
+				Location of the exported files
+
+		Return:
+		------
+			paths : list
+				Locations of the exported files
+		"""
+
+		os.makedirs(folder, exist_ok = True)
+		paths = list()
+		for extension, export in (
+				("csv", self.export_csv), ("pdf", self.export_pdf)):
+			path = os.path.join(folder, ".".join((RECOST_NAME, extension)))
+			export(path)
+			paths.append(path)
+		return paths
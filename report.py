@@ -14,6 +14,9 @@ try:
 	from fpdf import FPDF
 	from tkinter import messagebox
 	from babel.numbers import format_currency
+	from metrics import percentile
+	from models import UsageRecord
+	from archive import ReportArchive, DATE_KEY
 except ImportError as e:
 	from tkinter import messagebox
 	messagebox.showwarning("Import Error", str(e))
@@ -30,12 +33,18 @@ class TransmissionReport:
 		path : str
 			Location of the report database in the server
 
+		archive : archive.ReportArchive
+			Yearly archives of the report database, if any
+
+		start, end : datetime.date
+			First and last date of the records, None if open
+
 	Method:
 	------
 		generate_report : Generates the usage information
 	"""
 
-	def __init__(self, path):
+	def __init__(self, path, archive = None, start = None, end = None):
 		"""
 		Constructs the required identifiers for generating the
 
@@ -45,6 +54,12 @@ class TransmissionReport:
 		----------
 			path : str
 				Location of the report database in the server
+
+			archive : archive.ReportArchive
+				Yearly archives of the report database, if any
+
+			start, end : datetime.date
+				First and last date of the records, None if open
 		"""
 
 		# Assigning the identifiers for report generation
@@ -68,24 +83,22 @@ class TransmissionReport:
 			messagebox.showwarning("Database Error", str(e))
 			sys.exit(0)
 		else:
-			cur.execute('''SELECT ID FROM Record''')
-			self.sno = [col[0] for col in cur.fetchall()]
-			cur.execute('''SELECT Date FROM Record''')
-			self.date = [col[0] for col in cur.fetchall()]
-			cur.execute('''SELECT Requester FROM Record''')
-			self.requester = [col[0] for col in cur.fetchall()]
-			cur.execute('''SELECT Creator FROM Record''')
-			self.creator = [col[0] for col in cur.fetchall()]
-			cur.execute('''SELECT Changetype FROM Record''')
-			self.changetype = [col[0] for col in cur.fetchall()]
-			cur.execute('''SELECT Cost FROM Record''')
-			self.cost = [col[0] for col in cur.fetchall()]
-			cur.execute('''SELECT Link FROM Record''')
-			self.link = [col[0] for col in cur.fetchall()]
-			cur.execute('''SELECT User FROM Record''')
-			self.user = [col[0] for col in cur.fetchall()]
-			cur.execute('''SELECT Subassembly FROM Record''')
-			self.subassembly = [col[0] for col in cur.fetchall()]
+			# The archives are attached only for the years of the range
+			schemas = list()
+			if archive is not None:
+				schemas = archive.attach(report, start, end)
+			where, parameters = list(), list()
+			for date, condition in ((start, ">="), (end, "<=")):
+				if date is not None:
+					where.append("%s %s ?" % (DATE_KEY, condition))
+					parameters.append(date.strftime("%Y%m%d"))
+			self.records = UsageRecord.fetch(
+				cur,
+				" ".join((
+					"WHERE " + " AND ".join(where) if where else "",
+					"ORDER BY ID")),
+				parameters,
+				ReportArchive.union("Record", schemas, UsageRecord.COLUMNS))
 		finally:
 			report.close()
 
@@ -125,23 +138,240 @@ class TransmissionReport:
 
 		# Usage information
 		self.pdf.set_font("Arial", size = 7)
-		for sno, date, requester, creator, cost, link, changetype, \
-		subassembly in zip(self.sno, self.date, self.requester, self.creator,
-			self.cost, self.link, self.changetype, self.subassembly):
-			self.pdf.cell(10, 10, txt = str(sno), align = 'C', border = 1)
-			self.pdf.cell(30, 10, txt = date, align = 'C', border = 1)
-			self.pdf.cell(45, 10, txt = requester, align = 'C', border = 1)
-			self.pdf.cell(45, 10, txt = creator, align = 'C', border = 1)
-			self.pdf.cell(45, 10, txt = changetype, align = 'C', border = 1)
-			self.pdf.cell(45, 10, txt = subassembly, align = 'C', border = 1)
-			self.pdf.cell(20, 10, txt = str(cost), align = 'C', border = 1)
+		for record in self.records:
+			self.pdf.cell(10, 10, txt = str(record.id), align = 'C', border = 1)
+			self.pdf.cell(30, 10, txt = record.date, align = 'C', border = 1)
+			self.pdf.cell(45, 10, txt = record.requester, align = 'C', border = 1)
+			self.pdf.cell(45, 10, txt = record.creator, align = 'C', border = 1)
+			self.pdf.cell(
+				45, 10, txt = record.change_type, align = 'C', border = 1)
+			self.pdf.cell(
+				45, 10, txt = record.subassembly, align = 'C', border = 1)
+			self.pdf.cell(20, 10, txt = str(record.cost), align = 'C', border = 1)
 			self.pdf.set_text_color(0, 0, 255)
 			self.pdf.cell(
 				20, 10, 
 				txt = "link", align = 'C', 
-				border = 1, link = os.path.join(link.replace("\\", "/")))
+				border = 1, link = os.path.join(record.link.replace("\\", "/")))
 			self.pdf.set_text_color(0, 0, 0)
 			self.pdf.ln()
 
 		self.pdf.output("report/Test Cost App Usage Report.pdf")
 
+class MetricsReport:
+	"""
+	A class for generating the performance percentiles of the
+
+	template generations over time
+
+	Attributes:
+	----------
+		path : str
+			Location of the report database in the server
+
+		archive : archive.ReportArchive
+			Yearly archives of the report database, if any
+
+		start, end : datetime.date
+			First and last date of the metrics, None if open
+
+	Method:
+	------
+		summarise : Groups the metrics and computes the percentiles
+
+		generate_report : Generates the performance report
+
+		write_section : Writes a table of percentiles to the report
+	"""
+
+	def __init__(self, path, archive = None, start = None, end = None):
+		"""
+		Constructs the required identifiers for generating the
+
+		performance report
+
+		Parameters:
+		----------
+			path : str
+				Location of the report database in the server
+
+			archive : archive.ReportArchive
+				Yearly archives of the report database, if any
+
+			start, end : datetime.date
+				First and last date of the metrics, None if open
+		"""
+
+		# Assigning the identifiers for report generation
+		self.title = "Test & Cost Template - Performance Report"
+		self.timings = {
+			"Load" : "LoadTime",
+			"Search" : "SearchTime",
+			"Cost" : "CostTime",
+			"Render" : "RenderTime",
+			"Local" : "LocalWriteTime",
+			"Network" : "NetworkWriteTime"
+			}
+		self.ranks = (50, 90)
+
+		# Querying the SQL database and extracting the information
+		try:
+			report = sqlite3.connect(path)
+			cur = report.cursor()
+		except Exception as e:
+			messagebox.showwarning("Database Error", str(e))
+			sys.exit(0)
+		else:
+			cur.execute('''SELECT name FROM sqlite_master
+				WHERE type = ? AND name = ?''', ("table", "Metrics"))
+			if cur.fetchone():
+				schemas = list()
+				if archive is not None:
+					schemas = archive.attach(report, start, end)
+				columns = ["Date", "Machine", "TestVersion", "CostVersion"]
+				columns += list(self.timings.values()) + ["Tests", "PdfSize"]
+				where, parameters = list(), list()
+				for date, condition in ((start, ">="), (end, "<=")):
+					if date is not None:
+						where.append("Date %s ?" % condition)
+						parameters.append(date.strftime("%Y-%m-%d"))
+				cur.execute('''SELECT substr(Date, 1, 7), Machine,
+					TestVersion, CostVersion, %s, Tests, PdfSize
+					FROM %s %s ORDER BY Date''' % (
+						", ".join(self.timings.values()),
+						ReportArchive.union("Metrics", schemas, columns),
+						"WHERE " + " AND ".join(where) if where else ""),
+					parameters)
+				self.rows = cur.fetchall()
+			else:
+				self.rows = list()
+		finally:
+			report.close()
+
+		if not os.path.exists("Report"):
+			os.mkdir("Report")
+
+	def summarise(self, group):
+		"""
+		Groups the metrics per month and computes the percentiles
+
+		Parameters:
+		----------
+			group : function
+				Returns the group name of a metrics row
+
+		Return:
+		------
+			summary : list
+				Group, month, count and the percentiles of every column
+		"""
+
+		groups = dict()
+		for row in self.rows:
+			groups.setdefault((group(row), row[0]), list()).append(row)
+
+		summary = list()
+		for (name, month), rows in sorted(groups.items()):
+			values = list()
+			for column in range(4, 4 + len(self.timings) + 2):
+				data = sorted(
+					row[column] for row in rows if row[column] is not None)
+				values.append(
+					tuple(percentile(data, rank) for rank in self.ranks))
+			summary.append((name, month, len(rows), values))
+		return summary
+
+	def generate_report(self):
+		"""
+		Generates the percentiles of the timings per user machine and
+
+		per data file version as a report (PDF format)
+
+		Parameters:
+		----------
+			None
+
+		Return:
+			None
+		"""
+
+		# PDF object with A4 sheet size and Landscape orientation
+		self.pdf = FPDF(orientation = 'L', unit = 'mm', format = 'A4')
+		self.pdf.add_page()
+
+		# Title
+		self.pdf.set_font("Arial", "B", size = 12)
+		self.pdf.set_text_color(255, 255, 255)
+		self.pdf.cell(277, 10, txt = self.title, align = 'C', fill = True)
+		self.pdf.ln()
+		self.pdf.set_text_color(0, 0, 0)
+
+		sections = {
+			"Per machine" : lambda row: row[1],
+			"Per data file version" : lambda row: " | ".join(
+				(str(row[2]), str(row[3])))
+			}
+		for heading, group in sections.items():
+			self.write_section(heading, self.summarise(group))
+
+		self.pdf.output("report/Test Cost App Performance Report.pdf")
+
+	def write_section(self, heading, summary):
+		"""
+		Writes a table of percentiles to the report
+
+		Parameters:
+		----------
+			heading : str
+				Heading of the table
+
+			summary : list
+				Output of the summarise method
+
+		Return:
+		------
+			None
+		"""
+
+		ranks = "/".join("p%d" % rank for rank in self.ranks)
+
+		# Headings
+		self.pdf.ln(4)
+		self.pdf.set_font("Arial", "B", size = 10)
+		self.pdf.cell(277, 8, txt = heading, border = 1)
+		self.pdf.ln()
+		self.pdf.set_font("Arial", "B", size = 7)
+		self.pdf.cell(85, 8, txt = "Group", align = 'C', border = 1)
+		self.pdf.cell(16, 8, txt = "Month", align = 'C', border = 1)
+		self.pdf.cell(10, 8, txt = "N", align = 'C', border = 1)
+		for name in self.timings.keys():
+			self.pdf.cell(
+				22, 8, txt = "%s %s (s)" % (name, ranks),
+				align = 'C', border = 1)
+		self.pdf.cell(17, 8, txt = "Tests " + ranks, align = 'C', border = 1)
+		self.pdf.cell(17, 8, txt = "KB " + ranks, align = 'C', border = 1)
+		self.pdf.ln()
+
+		# Percentiles
+		self.pdf.set_font("Arial", size = 6)
+		for name, month, count, values in summary:
+			self.pdf.cell(85, 7, txt = name[:70], border = 1)
+			self.pdf.cell(16, 7, txt = month, align = 'C', border = 1)
+			self.pdf.cell(10, 7, txt = str(count), align = 'C', border = 1)
+			for value in values[:len(self.timings)]:
+				self.pdf.cell(
+					22, 7, txt = " / ".join(
+						"-" if item is None else "%.3f" % item
+						for item in value),
+					align = 'C', border = 1)
+			self.pdf.cell(
+				17, 7, txt = " / ".join(
+					"-" if item is None else str(item)
+					for item in values[-2]),
+				align = 'C', border = 1)
+			self.pdf.cell(
+				17, 7, txt = " / ".join(
+					"-" if item is None else str(round(item / 1024))
+					for item in values[-1]),
+				align = 'C', border = 1)
+			self.pdf.ln()
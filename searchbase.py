@@ -9,19 +9,48 @@ __version__ = "1.0"
 # Importing required libraries
 try:
 	import re
+	import sys
+	import time
+	import heapq
+	import bisect
+	import hashlib
+	import xlrd
 	from tkinter import messagebox
+	from instrumentation import tracer
+	from models import TestItem, parse_wpid
 except ImportError as e:
 	from tkinter import messagebox
 	messagebox.showarning("Import Error", str(e))
 
+# Defining the sheet, rows and columns of the test database
+TEST_SHEET = 1
+FIRST_ROW = 3
+WPID_COLUMN = 0
+NAME_COLUMN = 1
+
+# Defining the columns of the cost database
+ID_COLUMN = 2
+COST_COLUMN = 16
+
+# Defining the separators of the change types in a cell e.g. "1, 3)"
+# and the highest change type a 64 bit bitmask holds
+CHANGE_SEPARATORS = ",;/&"
+MAX_CHANGE_TYPE = 63
+
+# Defining the length of the n-grams of the test search and the
+# number of results shown
+GRAM = 3
+SEARCH_RESULTS = 20
+
 class LinearSearch:
 	"""
 	A class for performing linear search based on the input criteria
 
 	Atributes:
 	---------
-		change_type : int
-			Selected change type in the application
+		change_type : int or iterable
+			Selected change type in the application, or several change
+			types of which a test has to match any
 
 		test_database : xlrd.book.Book object
 			Workbook object of the test database file
@@ -36,14 +65,15 @@ class LinearSearch:
 		extract_cost : Extracts the cost information
 	"""
 
-	def __init__(self, change_type, test_database, cost_database):
+	def __init__(self, change_type, test_database, cost_database,
+			cost_index = None, test_index = None):
 		"""
 		Constructs the required identifiers for initiating the search
 
 		Parameters:
 		----------
-			change_type : int
-				User selected change type
+			change_type : int or iterable
+				User selected change type, or several change types
 
 			test_database : xlrd.book.Book object
 				Workbook object of the test database file
@@ -51,6 +81,14 @@ class LinearSearch:
 			cost_database : xlrd.book.Book object
 				Workbook object of the cost database file
 
+			cost_index : CostIndex
+				Prebuilt index of the cost database, built on demand
+				if not provided
+
+			test_index : TestIndex
+				Prebuilt index of the test database, built on demand
+				if not provided
+
 		Return:
 		-------
 			None
@@ -60,10 +98,10 @@ class LinearSearch:
 		self.change_type_ = change_type
 		self.test_workbook = test_database
 		self.cost_workbook = cost_database
-		self.change = str(change_type)
-		self.test_wpids = list()
-		self.test_names = list()
-		self.cost_values = list()
+		self.cost_index = cost_index
+		self.test_index = test_index
+		self.change = ChangeTypeMatcher.mask(change_type)
+		self.matches = list()
 		self.test_results = dict()
 		self.cost_results = dict()
 
@@ -83,55 +121,42 @@ class LinearSearch:
 				Contains work package ids & test names as key & value pairs
 		"""
 
-		# Assigning the sheet number in the test database
-		self.test_sheet = self.test_workbook.sheet_by_index(1)
+		# Building the test index unless one is loaded already
+		if self.test_index is None:
+			self.test_index = TestIndex(self.test_workbook)
+		self.test_sheet = self.test_index.sheet
 
 		# Assigning the rows and columns to search
-		self.row = 3
+		self.row = FIRST_ROW
 		self.search_column = column - 1
 
 		# Warning message if there are no work package ids
 		self.no_wpid = """No tests available for the selection"""
 
-		# Searching for the entire row range in the search column
-		for row in range(self.row, self.test_sheet.nrows):
-			self.cell_ = str(self.test_sheet.cell_value(row, self.search_column))
-
-			# Searching for the selected type of change in the column
-			# Storing the test names and the work package ids separately
-			if re.search(rf"{self.change}", self.cell_):
-				self.test_wpids.append(
-					self.test_sheet.cell_value(row, 0))
-				self.test_names.append(
-					str(self.test_sheet.cell_value(row, 1)))
+		# Searching for the entire row range in the search column, the
+		# change types of every cell are parsed once into a bitmask
+		masks = self.test_index.column(self.search_column)
+		for item, mask in zip(self.test_index.items, masks):
+
+			# Searching for the selected types of change in the column
+			# Taking the work package id and the test name of the row
+			if mask & self.change:
+				self.matches.append(item)
 			else:
 				continue
 
+		# Recording the scanned rows and the matched tests
+		tracer.count("rows_scanned", max(self.test_sheet.nrows - self.row, 0))
+		tracer.count("tests_matched", len(self.matches))
+
 		# Returning warning message if there aren't any work package ids
-		if not bool(self.test_wpids):
+		if not bool(self.matches):
 			return self.no_wpid
 
-		# Returning warning message if there aren't any test names
-		if not bool(self.test_names):
-			return "No test data available"
-
-		# Replacing the values as "NULL" if the ids contain inconsistent data
-		self.workpackage_ids = list()
-		for workpackage_id in self.test_wpids:
-			if (isinstance(workpackage_id, float) 
-					or len(workpackage_id) == 7):
-				self.workpackage_ids.append(str(int(workpackage_id)))
-			else:
-				self.workpackage_ids.append("NULL")
-
-		# Returning mismatch warning if there is any mismatch in the data
-		if not (len(self.workpackage_ids) == len(self.test_names)):
-			return "Data mismatch"
-
 		# Assigning work package ids & test names to the test_results
-		# as respective key and value pairs
-		for key, value in zip(self.workpackage_ids, self.test_names):
-			self.test_results[key] = (value.encode("ascii", "ignore")).decode()
+		# as respective key and value pairs, a malformed id is None
+		for item in self.matches:
+			self.test_results[item.wpid] = item.name
 
 		return self.test_results
 
@@ -150,24 +175,15 @@ class LinearSearch:
 			self.cost_results : dict
 				Contains workpackage ids and their respective costs as
 				key & value pairs 
-				ids - string and costs - float
+				ids - int and costs - float
 		"""
 
 		self.wp_ids_ = wp_ids
 
-		self.cost_data = {}
-
-		for sheet in self.cost_workbook.sheets():
-
-			for row in range(1, sheet.nrows):
-				package = str(sheet.cell_value(row, 2))
-				cost = sheet.cell_value(row, 16)
-
-				if package != None and package != "":
-					try:
-						self.cost_data[package] = round(float(cost), 1)
-					except:
-						continue
+		# Building the cost index unless one is loaded already
+		if self.cost_index is None:
+			self.cost_index = CostIndex(self.cost_workbook)
+		self.cost_data = self.cost_index.costs
 
 		for test in self.wp_ids_:
 			try:
@@ -179,3 +195,616 @@ class LinearSearch:
 			return "Missing workpackage/cost info in cost database"
 		else:
 			return self.cost_results
+
+class ChangeTypeMatcher:
+	"""
+	A class for parsing the change types of the test database cells
+
+	A cell lists the change types it is affected by, e.g. 2.0, "1, 3)"
+	or "3), 4)". Its value is parsed once into a bitmask with the bit
+	of every listed change type set and the parsed forms are cached,
+	so a search compares integers instead of matching text. Only
+	whole numbers match, 1 does not match a cell listing 11. Numbers
+	above MAX_CHANGE_TYPE, e.g. a work package id, are left out of the
+	bitmask and their cells are kept in invalid
+
+	Atributes:
+	---------
+		separators : str
+			Characters separating the change types in a cell
+
+	Method:
+	-------
+		mask : Returns the bitmask of change types
+
+		parse : Returns the bitmask of a cell value
+
+		types : Returns the change types of a cell value
+
+		decode : Returns the change types of a bitmask
+
+		matches : Checks a cell value against change types
+	"""
+
+	def __init__(self, separators = CHANGE_SEPARATORS):
+		"""
+		Constructs the tokenizer and the cache of the matcher
+
+		Parameters:
+		----------
+			separators : str
+				Characters separating the change types in a cell
+		"""
+
+		self.separators = separators
+		self.tokens = re.compile(r"[\s()%s]+" % re.escape(separators))
+		self.cache = dict()
+		self.invalid = set()
+
+	@staticmethod
+	def mask(change_types):
+		"""
+		Returns the bitmask of one or several change types
+
+		Parameters:
+		----------
+			change_types : int or iterable
+				Change type numbers
+
+		Return:
+		------
+			mask : int
+				Bitmask with the bit of every change type set
+		"""
+
+		if isinstance(change_types, (int, str)):
+			change_types = (change_types,)
+		mask = 0
+		for change in change_types:
+			mask |= 1 << int(change)
+		return mask
+
+	def parse(self, value):
+		"""
+		Returns the bitmask of the change types listed in a cell
+
+		Parameters:
+		----------
+			value : float or str
+				Value of the cell
+
+		Return:
+		------
+			mask : int
+				Bitmask of the listed change types, 0 if there is none
+		"""
+
+		try:
+			return self.cache[value]
+		except KeyError:
+			pass
+
+		mask = 0
+		for token in self.tokens.split(str(value)):
+			try:
+				number = float(token)
+			except ValueError:
+				continue
+			if not number.is_integer() or number <= 0:
+				continue
+			if number <= MAX_CHANGE_TYPE:
+				mask |= 1 << int(number)
+			else:
+				self.invalid.add(value)
+		self.cache[value] = mask
+		return mask
+
+	def types(self, value):
+		"""
+		Returns the change types listed in a cell as a frozenset
+		"""
+
+		return ChangeTypeMatcher.decode(self.parse(value))
+
+	@staticmethod
+	def decode(mask):
+		"""
+		Returns the change types of a bitmask as a frozenset
+		"""
+
+		return frozenset(
+			change for change in range(mask.bit_length()) if mask >> change & 1)
+
+	def matches(self, value, change_types):
+		"""
+		Checks if a cell lists any of the change types
+		"""
+
+		return bool(self.parse(value) & ChangeTypeMatcher.mask(change_types))
+
+class TestIndex:
+	"""
+	A class for reading the work package ids and the test names of
+
+	the test database once, when the workbook is loaded
+
+	The change types of a column are parsed the first time the column
+	is searched and kept for the later searches
+
+	Atributes:
+	---------
+		test_database : xlrd.book.Book object
+			Workbook object of the test database file
+
+		matcher : ChangeTypeMatcher
+			Parser of the change types of the cells
+
+	Method:
+	-------
+		parse : Reads the test of a row
+
+		column : Returns the change types of every row of a column
+	"""
+
+	def __init__(self, test_database, matcher = None):
+		"""
+		Constructs the index of the test database
+
+		Parameters:
+		----------
+			test_database : xlrd.book.Book object
+				Workbook object of the test database file
+
+			matcher : ChangeTypeMatcher
+				Parser of the change types of the cells
+		"""
+
+		self.sheet = test_database.sheet_by_index(TEST_SHEET)
+		self.matcher = matcher or ChangeTypeMatcher()
+		self.items = [TestIndex.parse(self.sheet, row)
+			for row in range(FIRST_ROW, self.sheet.nrows)]
+		self.columns = dict()
+
+	@staticmethod
+	def parse(sheet, row):
+		"""
+		Reads the work package id and the test name of a row
+
+		Parameters:
+		----------
+			sheet : xlrd.sheet.Sheet object
+				Sheet of the test database
+
+			row : int
+				Row of the test
+
+		Return:
+		------
+			item : TestItem
+				Test of the row without its cost
+		"""
+
+		name = str(sheet.cell_value(row, NAME_COLUMN))
+		return TestItem(
+			parse_wpid(sheet.cell_value(row, WPID_COLUMN)),
+			name.encode("ascii", "ignore").decode())
+
+	def column(self, column):
+		"""
+		Returns the bitmask of the change types of every row of a column
+
+		Parameters:
+		----------
+			column : int
+				Column of the test sheet, starting from 0
+
+		Return:
+		------
+			masks : list
+				Bitmask of every test row in the order of the items
+		"""
+
+		masks = self.columns.get(column)
+		if masks is None:
+			masks = [self.matcher.parse(value)
+				for value in self.sheet.col_values(column, FIRST_ROW)]
+			self.columns[column] = masks
+		return masks
+
+class TestSearchIndex:
+	"""
+	A class for finding the tests by a part of their names or work
+
+	package ids, along with the columns and change types using them
+
+	The names and ids are indexed by their n-grams for the queries of
+	GRAM characters or more and by their words for shorter queries.
+	While a query is being typed, the matches of the previous query
+	are narrowed down instead of looking the query up again.
+	The results are ranked by an exact id, a prefix, the start of a
+	word and any other match, then by the length of the name
+
+	Atributes:
+	---------
+		test_index : TestIndex
+			Index of the test database
+
+	Method:
+	-------
+		usages : Returns the columns and change types of every test
+
+		candidates : Returns the rows which may match a query
+
+		rank : Returns the rank of a matching row
+
+		query : Returns the ranked tests matching a text
+	"""
+
+	def __init__(self, test_index):
+		"""
+		Constructs the n-gram and word indexes of the tests
+
+		Parameters:
+		----------
+			test_index : TestIndex
+				Index of the test database
+		"""
+
+		self.test_index = test_index
+		self.keys = list()
+		self.grams = dict()
+		self.words = list()
+		for row, item in enumerate(test_index.items):
+			wpid = "" if item.wpid is None else str(item.wpid)
+			key = " ".join((wpid, " ".join(item.name.lower().split())))
+			self.keys.append(key)
+			for gram in set(
+					key[start:start + GRAM]
+					for start in range(len(key) - GRAM + 1)):
+				self.grams.setdefault(gram, list()).append(row)
+			self.words.extend((word, row) for word in set(key.split()))
+		self.words.sort()
+		self.used = self.usages()
+		self.last = ("", list())
+
+	def usages(self):
+		"""
+		Returns the columns and the change types using every test
+
+		Parameters:
+		----------
+			None
+
+		Return:
+		------
+			usages : list
+				(column heading, change types) pairs of every row
+		"""
+
+		sheet = self.test_index.sheet
+		usages = [list() for item in self.test_index.items]
+		for column in range(NAME_COLUMN + 1, sheet.ncols):
+			heading = str(sheet.cell_value(FIRST_ROW - 1, column))
+			for row, mask in enumerate(self.test_index.column(column)):
+				if mask:
+					usages[row].append(
+						(heading, sorted(ChangeTypeMatcher.decode(mask))))
+		return usages
+
+	def candidates(self, text):
+		"""
+		Returns the rows containing every n-gram of the text, or a word
+
+		starting with the text if it is shorter than an n-gram
+		"""
+
+		if len(text) < GRAM:
+			start = bisect.bisect_left(self.words, (text,))
+			end = bisect.bisect_left(self.words, (text + "\uffff",))
+			return set(row for word, row in self.words[start:end])
+
+		postings = list()
+		for start in range(len(text) - GRAM + 1):
+			rows = self.grams.get(text[start:start + GRAM])
+			if rows is None:
+				return set()
+			postings.append(rows)
+		postings.sort(key = len)
+		rows = set(postings[0])
+		for posting in postings[1:]:
+			rows.intersection_update(posting)
+		return rows
+
+	def rank(self, row, text):
+		"""
+		Returns the rank of a row matching the text
+		"""
+
+		key = self.keys[row]
+		wpid, _, name = key.partition(" ")
+		if text == wpid:
+			order = 0
+		elif wpid.startswith(text) or name.startswith(text):
+			order = 1
+		elif (" " + text) in key:
+			order = 2
+		else:
+			order = 3
+		return (order, len(name), row)
+
+	def query(self, text, limit = SEARCH_RESULTS):
+		"""
+		Returns the tests matching the text in the order of their ranks
+
+		Parameters:
+		----------
+			text : str
+				Part of a test name or a work package id
+
+			limit : int
+				Maximum number of results
+
+		Return:
+		------
+			results : list
+				(TestItem, usages) of the best matching tests
+		"""
+
+		text = " ".join(text.lower().split())
+		if not text:
+			return list()
+		# The matches of a shorter query are word prefixes, not substrings,
+		# so they can only be narrowed from a query of an n-gram or more
+		previous, rows = self.last
+		if not (len(previous) >= GRAM and text.startswith(previous)):
+			rows = self.candidates(text)
+		rows = [row for row in rows if text in self.keys[row]]
+		self.last = (text, rows)
+		best = heapq.nsmallest(limit, (self.rank(row, text) for row in rows))
+		return [(self.test_index.items[row], self.used[row])
+			for order, length, row in best]
+
+class CostIndex:
+	"""
+	A class for indexing the costs of the cost database by their
+
+	work package ids
+
+	Every sheet is parsed into its own map along with a fingerprint
+	of its contents. When a new version of the workbook is indexed,
+	the maps of the sheets with an unchanged fingerprint are reused
+	and only the work package ids of the changed sheets are merged
+	again. A work package found in several sheets takes the cost of
+	the last of those sheets in the workbook order and is reported
+	in the conflicts
+
+	The sheets are indexed serially from their id and cost columns,
+	the expensive reading of the sheet XML is spread over several
+	processes when the workbook is opened by costbook.CostBook
+
+	Atributes:
+	---------
+		cost_database : xlrd.book.Book object
+			Workbook object of the cost database file
+
+		previous : CostIndex
+			Index of the previous version of the cost database
+
+	Method:
+	-------
+		fingerprint : Returns the fingerprint of a sheet
+
+		parse : Reads the work package ids and costs of a sheet
+
+		build : Indexes the sheets of the workbook
+
+		merge : Resolves the cost of the given work package ids
+	"""
+
+	def __init__(self, cost_database, previous = None):
+		"""
+		Constructs the index of the cost database
+
+		Parameters:
+		----------
+			cost_database : xlrd.book.Book object
+				Workbook object of the cost database file
+
+			previous : CostIndex
+				Index of the previous version of the cost database
+		"""
+
+		self.cost_workbook = cost_database
+		self.order = list()
+		self.sheets = dict()
+		self.fingerprints = dict()
+		self.costs = dict()
+		self.conflicts = dict()
+		self.build(previous)
+
+	@staticmethod
+	def fingerprint(sheet):
+		"""
+		Returns the fingerprint of the id and cost columns of a sheet
+
+		Parameters:
+		----------
+			sheet : xlrd.sheet.Sheet object
+				Sheet of the cost database
+
+		Return:
+		------
+			fingerprint : str
+				SHA-1 of the work package ids and costs of the sheet
+		"""
+
+		digest = hashlib.sha1()
+		if sheet.ncols > COST_COLUMN:
+			digest.update(repr(sheet.col_values(ID_COLUMN, 1)).encode())
+			digest.update(repr(sheet.col_values(COST_COLUMN, 1)).encode())
+		return digest.hexdigest()
+
+	@staticmethod
+	def parse(sheet):
+		"""
+		Reads the work package ids and the costs of a sheet
+
+		Parameters:
+		----------
+			sheet : xlrd.sheet.Sheet object
+				Sheet of the cost database
+
+		Return:
+		------
+			costs : dict
+				Work package ids and their costs in the sheet
+		"""
+
+		if sheet.ncols <= COST_COLUMN:
+			return dict()
+
+		tracer.count("rows_scanned", max(sheet.nrows - 1, 0))
+		parsed = dict()
+		for package, cost in zip(
+				sheet.col_values(ID_COLUMN, 1),
+				sheet.col_values(COST_COLUMN, 1)):
+			package = parse_wpid(package)
+
+			if package is not None:
+				try:
+					parsed[package] = round(float(cost), 1)
+				except:
+					continue
+		return parsed
+
+	def build(self, previous = None):
+		"""
+		Indexes the sheets of the workbook, reusing the unchanged
+
+		sheets of the previous index
+
+		Parameters:
+		----------
+			previous : CostIndex
+				Index of the previous version of the cost database
+
+		Return:
+		------
+			None
+		"""
+
+		changed = set()
+		for sheet in self.cost_workbook.sheets():
+			name = sheet.name
+			fingerprint = CostIndex.fingerprint(sheet)
+			self.order.append(name)
+			self.fingerprints[name] = fingerprint
+			if (previous is not None
+					and previous.fingerprints.get(name) == fingerprint):
+				self.sheets[name] = previous.sheets[name]
+			else:
+				self.sheets[name] = CostIndex.parse(sheet)
+				changed.add(name)
+		tracer.count("sheets_parsed", len(changed))
+
+		# Merging every package if the sheets were added, removed or
+		# reordered, otherwise only the packages of the changed sheets
+		if previous is None or previous.order != self.order:
+			self.merge(set().union(*self.sheets.values()))
+			return
+
+		self.costs = dict(previous.costs)
+		self.conflicts = dict(previous.conflicts)
+		packages = set()
+		for name in changed:
+			packages.update(previous.sheets[name])
+			packages.update(self.sheets[name])
+		self.merge(packages)
+
+	def merge(self, packages):
+		"""
+		Resolves the cost of the given work package ids from the sheets
+
+		Parameters:
+		----------
+			packages : set
+				Work package ids to be resolved
+
+		Return:
+		------
+			None
+		"""
+
+		for package in packages:
+			found = [(name, self.sheets[name][package])
+				for name in self.order if package in self.sheets[name]]
+			self.conflicts.pop(package, None)
+			if not found:
+				self.costs.pop(package, None)
+				continue
+			self.costs[package] = found[-1][1]
+			if len(set(cost for name, cost in found)) > 1:
+				self.conflicts[package] = found
+
+def benchmark(path, change_types = (1,), rounds = 1000):
+	"""
+	Measures the cost per row of matching the change types of every
+
+	column of the test database with a regular expression, with a new
+	matcher and with the parsed columns of a test index
+
+	Parameters:
+	----------
+		path : str
+			Location of the test database file
+
+		change_types : tuple
+			Change types to be matched
+
+		rounds : int
+			Number of times every column is matched
+
+	Return:
+	------
+		timings : dict
+			Nanoseconds per row of every approach
+	"""
+
+	index = TestIndex(xlrd.open_workbook(path))
+	values = [index.sheet.col_values(column, FIRST_ROW)
+		for column in range(2, index.sheet.ncols)]
+	rows = sum(len(column) for column in values) * rounds
+	mask = ChangeTypeMatcher.mask(change_types)
+	pattern = "|".join(str(change) for change in change_types)
+
+	def regex():
+		for _ in range(rounds):
+			for column in values:
+				for value in column:
+					re.search(rf"{pattern}", str(value))
+
+	def matcher():
+		for _ in range(rounds):
+			parser = ChangeTypeMatcher()
+			for column in values:
+				for value in column:
+					parser.parse(value) & mask
+
+	def cached():
+		for _ in range(rounds):
+			for column in range(2, index.sheet.ncols):
+				for cell in index.column(column):
+					cell & mask
+
+	timings = dict()
+	for name, function in (
+			("regex", regex), ("matcher", matcher), ("cached", cached)):
+		start = time.perf_counter()
+		function()
+		timings[name] = (time.perf_counter() - start) / rows * 1e9
+	return timings
+
+if __name__ == "__main__":
+	timings = benchmark(*sys.argv[1:2] or ["database/testfile.xlsx"])
+	for name, timing in timings.items():
+		print("%-8s %8.1f ns per row" % (name, timing))
@@ -0,0 +1,596 @@
+"""
+A service module for serving the search and the template generation
+of the Test and Cost Template application over HTTP
+
+	Endpoints:
+	---------
+		GET /changetypes - Change types from info.db
+		GET /subassemblies - Subassemblies and their search columns
+		GET /parts?subassembly= - Parts of a subassembly
+		GET /search?change=&subassembly=&part= - Tests and costs
+		GET /impact - Tests and total cost of every combination
+		GET /quality - Data problems of the test and cost databases
+		POST /template - Generates the template and returns the PDF
+		POST /bundle - Renders many templates into one PDF
+
+	Usage:
+	-----
+		python service.py --host 0.0.0.0 --port 8080 --workers 4
+		python service.py --processes 4
+"""
+
+__author__ = "Monish Mohanan"
+__version__ = "1.0"
+
+# Importing required libraries
+try:
+	import re
+	import sys
+	import json
+	import asyncio
+	import logging
+	import argparse
+	import threading
+	import traceback
+	from concurrent.futures import ThreadPoolExecutor
+	from urllib.parse import urlsplit, parse_qs
+	from infobase import InfoBase
+	from datastore import DataStore, WorkbookWatcher
+	from searchbase import LinearSearch
+	from models import TestItem
+	from workerpool import RenderPool
+	from impact import ImpactMatrix
+	from quality import DataQuality
+	from outbox import outbox
+	from template import TransmissionTemplate, NAME
+	from bundle import TemplateBundle
+	from instrumentation import tracer
+except ImportError as e:
+	print("Import Error", str(e))
+	sys.exit(0)
+
+# Defining the necessary constants
+SERVICE_HOST = "127.0.0.1"
+SERVICE_PORT = 8080
+RENDER_WORKERS = 4
+MAX_BODY = 64 * 1024
+USER_NAME = re.compile(r"[\w.-]+")
+STATUS = {
+	200 : "OK",
+	400 : "Bad Request",
+	404 : "Not Found",
+	405 : "Method Not Allowed",
+	413 : "Payload Too Large",
+	422 : "Unprocessable Entity",
+	500 : "Internal Server Error",
+	503 : "Service Unavailable"
+	}
+
+class ServiceError(Exception):
+	"""
+	An error answered to the client with the given HTTP status
+	"""
+
+	def __init__(self, status, message):
+		Exception.__init__(self, message)
+		self.status = status
+
+class TestCostService:
+	"""
+	A class to serve the search and the template generation over HTTP
+
+	from one process holding the test and cost databases in memory
+
+	Attributes:
+	----------
+		workers : int
+			Number of searches and renders running at the same time
+
+		processes : int
+			Number of processes rendering the templates from the shared
+			test and cost data, 0 to render in the threads
+
+	Method:
+	------
+		start : Loads the databases and serves the requests
+
+		handle : Parses a request and writes the response
+
+		search : Searches the tests and costs of a selection
+
+		template : Generates the template of a selection
+	"""
+
+	def __init__(self, workers = RENDER_WORKERS, processes = 0):
+		"""
+		Constructs the identifiers of the service
+
+		Parameters:
+		----------
+			workers : int
+				Number of searches and renders running at the same time
+
+			processes : int
+				Number of processes rendering the templates from the
+				shared test and cost data, 0 to render in the threads
+		"""
+
+		self.info = InfoBase()
+		self.store = DataStore(self.info.databases)
+		self.watcher = WorkbookWatcher(self.store)
+		self.pool = ThreadPoolExecutor(max_workers = workers)
+		self.store_lock = threading.Lock()
+		self.renderer = RenderPool(self.store, processes) if processes else None
+		self.routes = {
+			("GET", "/changetypes") : self.change_types,
+			("GET", "/subassemblies") : self.subassemblies,
+			("GET", "/parts") : self.parts,
+			("GET", "/search") : self.search_request,
+			("GET", "/impact") : self.impact_request,
+			("GET", "/quality") : self.quality_request,
+			("POST", "/template") : self.template_request,
+			("POST", "/bundle") : self.bundle_request
+			}
+
+	async def start(self, host = SERVICE_HOST, port = SERVICE_PORT):
+		"""
+		Loads the test and cost databases once and serves the requests
+
+		Parameters:
+		----------
+			host : str
+				Interface to listen on
+
+			port : int
+				Port to listen on
+
+		Return:
+		------
+			None
+		"""
+
+		loop = asyncio.get_running_loop()
+		await asyncio.gather(
+			loop.run_in_executor(self.pool, self.store.load, "Test"),
+			loop.run_in_executor(self.pool, self.store.load, "Cost"))
+		if self.renderer is not None:
+			await loop.run_in_executor(self.pool, self.renderer.start)
+		tracer.mark_ready()
+		loop.run_in_executor(
+			self.pool, DataQuality(self.store.snapshot(), self.info).load)
+		self.watcher.start()
+		outbox.start()
+
+		server = await asyncio.start_server(self.handle, host, port)
+		logging.warning("Test Cost service listening on %s:%d" % (host, port))
+		async with server:
+			await server.serve_forever()
+
+	async def handle(self, reader, writer):
+		"""
+		Parses an HTTP request, runs its endpoint and writes the response
+
+		Parameters:
+		----------
+			reader : asyncio.StreamReader
+				Stream of the request
+
+			writer : asyncio.StreamWriter
+				Stream of the response
+
+		Return:
+		------
+			None
+		"""
+
+		try:
+			try:
+				method, target, headers, body = await self.read_request(reader)
+				url = urlsplit(target)
+				query = dict(
+					(key, values[-1])
+					for key, values in parse_qs(url.query).items())
+				endpoint = self.routes.get((method, url.path))
+				if endpoint is None:
+					if any(path == url.path for _, path in self.routes):
+						raise ServiceError(405, "Method not allowed")
+					raise ServiceError(404, "Unknown endpoint")
+				status, content_type, content = await endpoint(query, body)
+			except ServiceError as e:
+				status, content_type, content = TestCostService.error(
+					e.status, str(e))
+			except Exception:
+				logging.error(traceback.format_exc())
+				status, content_type, content = TestCostService.error(
+					500, "Something is wrong. Please contact the developer")
+
+			writer.write((
+				"HTTP/1.1 %d %s\r\n"
+				"Content-Type: %s\r\n"
+				"Content-Length: %d\r\n"
+				"Connection: close\r\n\r\n" % (
+					status, STATUS[status], content_type, len(content))
+				).encode("latin-1") + content)
+			await writer.drain()
+		except (ConnectionError, asyncio.IncompleteReadError):
+			pass
+		finally:
+			writer.close()
+
+	@staticmethod
+	async def read_request(reader):
+		"""
+		Reads the request line, the headers and the body of a request
+
+		Parameters:
+		----------
+			reader : asyncio.StreamReader
+				Stream of the request
+
+		Return:
+		------
+			method : str
+				HTTP method of the request
+
+			target : str
+				Path and query of the request
+
+			headers : dict
+				Header names in lower case and their values
+
+			body : bytes
+				Body of the request
+		"""
+
+		try:
+			request_line = (await reader.readline()).decode("latin-1")
+			method, target, _ = request_line.split(" ", 2)
+		except ValueError:
+			raise ServiceError(400, "Malformed request line")
+
+		headers = dict()
+		while True:
+			line = (await reader.readline()).decode("latin-1").strip()
+			if not line:
+				break
+			name, _, value = line.partition(":")
+			headers[name.strip().lower()] = value.strip()
+
+		try:
+			length = int(headers.get("content-length", 0) or 0)
+		except ValueError:
+			raise ServiceError(400, "Content-Length must be a number")
+		if length < 0:
+			raise ServiceError(400, "Content-Length must not be negative")
+		if length > MAX_BODY:
+			raise ServiceError(413, "Request body is too large")
+		body = await reader.readexactly(length) if length else b""
+		return method.upper(), target, headers, body
+
+	@staticmethod
+	def json_response(data, status = 200):
+		return status, "application/json", json.dumps(data).encode()
+
+	@staticmethod
+	def error(status, message):
+		return TestCostService.json_response({"error" : message}, status)
+
+	async def change_types(self, query, body):
+		return TestCostService.json_response(self.info.change_types)
+
+	async def subassemblies(self, query, body):
+		return TestCostService.json_response(self.info.subassemblies)
+
+	async def parts(self, query, body):
+		subassembly = query.get("subassembly", "")
+		if subassembly not in self.info.subassembly_and_parts:
+			raise ServiceError(404, "Unknown subassembly")
+		return TestCostService.json_response(
+			self.info.subassembly_and_parts[subassembly])
+
+	async def search_request(self, query, body):
+		loop = asyncio.get_running_loop()
+		items, span = await loop.run_in_executor(
+			self.pool, self.search,
+			query.get("change"), query.get("subassembly"), query.get("part"))
+		return TestCostService.json_response({
+			"tests" : [
+				{"wpid" : item.wpid, "name" : item.name, "cost" : item.cost}
+				for item in items],
+			"total" : TestItem.total(items)
+			})
+
+	async def impact_request(self, query, body):
+		loop = asyncio.get_running_loop()
+		matrix = ImpactMatrix(self.store.snapshot(), self.info)
+		rows = await loop.run_in_executor(self.pool, matrix.load)
+		return TestCostService.json_response([
+			dict(zip(("change", "subassembly", "part", "column", "tests",
+				"cost", "missing"), row.values())) for row in rows])
+
+	async def quality_request(self, query, body):
+		loop = asyncio.get_running_loop()
+		quality = DataQuality(self.store.snapshot(), self.info)
+		anomalies = await loop.run_in_executor(self.pool, quality.load)
+		return TestCostService.json_response([
+			dict(zip(("problem", "sheet", "row", "value", "detail"),
+				anomaly.values())) for anomaly in anomalies])
+
+	async def template_request(self, query, body):
+		try:
+			inputs = json.loads(body or b"{}")
+		except ValueError:
+			raise ServiceError(400, "Request body is not valid JSON")
+		if not isinstance(inputs, dict):
+			raise ServiceError(400, "Request body must be a JSON object")
+		loop = asyncio.get_running_loop()
+		document = await loop.run_in_executor(
+			self.pool, self.template, inputs)
+		return 200, "application/pdf", document
+
+	async def bundle_request(self, query, body):
+		try:
+			inputs = json.loads(body or b"{}")
+		except ValueError:
+			raise ServiceError(400, "Request body is not valid JSON")
+		if not isinstance(inputs, dict):
+			raise ServiceError(400, "Request body must be a JSON object")
+		loop = asyncio.get_running_loop()
+		document = await loop.run_in_executor(
+			self.pool, self.bundle, inputs)
+		return 200, "application/pdf", document
+
+	def selection(self, change, subassembly, part = None):
+		"""
+		Validates the selection and returns its search column
+
+		Parameters:
+		----------
+			change : str
+				Selected change type
+
+			subassembly : str
+				Selected subassembly
+
+			part : str
+				Selected part, empty or None for the whole subassembly
+
+		Return:
+		------
+			change : int
+				Number of the change type
+
+			column : int
+				Search column in the test database
+		"""
+
+		try:
+			change = int(change)
+		except (TypeError, ValueError):
+			raise ServiceError(400, "Change type must be a number")
+		if change not in self.info.change_types:
+			raise ServiceError(404, "Unknown change type")
+		try:
+			column = self.info.search_column(subassembly, part)
+		except KeyError:
+			raise ServiceError(404, "Unknown subassembly or part")
+		return change, column
+
+	def search(self, change, subassembly, part = None, snapshot = None):
+		"""
+		Searches the tests and costs of the selection on the given or
+
+		the current snapshot of the databases
+
+		Parameters:
+		----------
+			change : str
+				Selected change type
+
+			subassembly : str
+				Selected subassembly
+
+			part : str
+				Selected part, empty or None for the whole subassembly
+
+			snapshot : datastore.DataSnapshot
+				Databases to search, None for the current ones
+
+		Return:
+		------
+			items : list
+				TestItem of every test of the selection
+
+			span : instrumentation.Span
+				Finished stage of the search
+		"""
+
+		change, column = self.selection(change, subassembly, part)
+		snapshot = snapshot or self.store.snapshot()
+		with tracer.span("search") as span:
+			search = LinearSearch(
+				change,
+				snapshot.test_workbook,
+				snapshot.cost_workbook,
+				cost_index = snapshot.cost_index,
+				test_index = snapshot.test_index)
+			with tracer.span("test_search"):
+				test_results = search.extract_test(column)
+			if isinstance(test_results, str):
+				raise ServiceError(422, test_results)
+			if not test_results:
+				raise ServiceError(422, "No tests for the selected combination")
+			if None in test_results:
+				raise ServiceError(
+					422, "Missing workpackage IDs in test database")
+			with tracer.span("cost_search"):
+				cost_results = search.extract_cost(test_results.keys())
+			if isinstance(cost_results, str):
+				raise ServiceError(422, cost_results)
+		return TestItem.join(test_results, cost_results), span
+
+	def template_values(self, inputs):
+		"""
+		Validates the fields of a template request and returns the values
+
+		of the template
+
+		Parameters:
+		----------
+			inputs : dict
+				change, subassembly, part, requester, creator and comment
+
+		Return:
+		------
+			change : int
+				Number of the change type
+
+			column : int
+				Search column in the test database
+
+			values : dict
+				Change type, subassembly, part name, requester, creator
+				and comment values of the template
+		"""
+
+		for field in ("change", "subassembly", "requester", "creator"):
+			if not inputs.get(field):
+				raise ServiceError(400, "Missing field: %s" % field)
+
+		change, column = self.selection(
+			inputs["change"], inputs["subassembly"], inputs.get("part"))
+		values = {
+			"Change Type" : self.info.change_types[change],
+			"Subassembly" : inputs["subassembly"],
+			"Part Name" : inputs.get("part") or "NA",
+			"Requester" : inputs["requester"],
+			"Creator" : inputs["creator"],
+			"Comment" : inputs.get("comment") or "None"
+			}
+		return change, column, values
+
+	def template(self, inputs):
+		"""
+		Generates the template of the selection, records it like the
+
+		application does and returns the PDF
+
+		Parameters:
+		----------
+			inputs : dict
+				change, subassembly, part, requester, creator, comment
+				and optionally the user requesting the template
+
+		Return:
+		------
+			document : bytes
+				Contents of the PDF file
+		"""
+
+		change, column, values = self.template_values(inputs)
+		user = inputs.get("user")
+		if user and not USER_NAME.fullmatch(str(user)):
+			raise ServiceError(400, "User must only contain letters, digits, "
+				"dots, dashes and underscores")
+
+		items = search = None
+		snapshot = self.store.snapshot()
+		if self.renderer is None:
+			items, search = self.search(
+				inputs["change"], inputs["subassembly"], inputs.get("part"),
+				snapshot)
+
+		# Rendering runs in parallel, the numbering of the files and the
+		# record in report.db are taken one template at a time. With the
+		# render processes, a worker searches the shared data and renders
+		# the template and only the record is written by the service
+		with tracer.span("generation") as span:
+			document = None
+			if items is None:
+				with tracer.span("pdf_render"):
+					items, document = self.renderer.render(
+						change, column, values)
+				if isinstance(items, str):
+					raise ServiceError(422, items)
+			template = TransmissionTemplate(items, snapshot, **values)
+			template.span = span
+			template.search_span = search
+			if user:
+				template.user = str(user).lower()
+				template.name = "_".join((template.user, NAME))
+
+			template.prepare_template(**self.info.records)
+			if document is None:
+				with tracer.span("pdf_render"):
+					template.render_template()
+			else:
+				template.data = document
+			with self.store_lock:
+				template.store_template()
+		if template.error:
+			logging.error("Template not recorded: %s" % template.error)
+		return template.document()
+
+	def bundle(self, inputs):
+		"""
+		Renders the templates of the selections into one PDF without
+
+		recording them, for the release reviews
+
+		Parameters:
+		----------
+			inputs : dict
+				templates, the list of template requests, and contents,
+				False to leave out the table of contents
+
+		Return:
+		------
+			document : bytes
+				Contents of the PDF file
+		"""
+
+		requests = inputs.get("templates")
+		if not isinstance(requests, list) or not requests:
+			raise ServiceError(400, "Missing field: templates")
+
+		templates = list()
+		for request in requests:
+			if not isinstance(request, dict):
+				raise ServiceError(400, "Every template must be a JSON object")
+			change, column, values = self.template_values(request)
+			items, span = self.search(
+				request["change"], request["subassembly"], request.get("part"))
+			templates.append(TransmissionTemplate(items, **values))
+
+		with tracer.span("bundle_render") as span:
+			span.count("templates", len(templates))
+			return TemplateBundle(
+				templates, bool(inputs.get("contents", True))).document()
+
+def main():
+	"""
+	Parses the command line and runs the service until interrupted
+	"""
+
+	parser = argparse.ArgumentParser(description = __doc__.split("\n")[1])
+	parser.add_argument("--host", default = SERVICE_HOST)
+	parser.add_argument("--port", type = int, default = SERVICE_PORT)
+	parser.add_argument("--workers", type = int, default = RENDER_WORKERS)
+	parser.add_argument("--processes", type = int, default = 0)
+	arguments = parser.parse_args()
+
+	logging.basicConfig(
+		filename = 'TestCostService.log',
+		format = '%(asctime)s - %(message)s',
+		datefmt = '%d-%b-%y %H:%M:%S')
+	service = TestCostService(arguments.workers, arguments.processes)
+	try:
+		asyncio.run(service.start(arguments.host, arguments.port))
+	except KeyboardInterrupt:
+		pass
+	finally:
+		if service.renderer is not None:
+			service.renderer.close()
+
+if __name__ == "__main__":
+	main()
@@ -8,14 +8,24 @@ __version__ = "1.0"
 
 # Importing required libraries
 try:
+	import uuid
+	import asyncio
 	import getpass
+	import logging
 	import os
 	import sqlite3
 	import decimal
+	import threading
 	from datetime import datetime
 	from fpdf import FPDF
 	from tkinter import messagebox
 	from babel.numbers import format_currency
+	from instrumentation import tracer
+	from metrics import GenerationMetrics
+	from iolayer import io
+	from outbox import outbox, RECORD_COLUMNS
+	from models import TestItem
+	from history import RecordFingerprint
 except ImportError as e:
 	from tkinter import messagebox
 	messagebox.showwarning("Import Error", str(e))
@@ -31,17 +41,177 @@ COMMENTS = "USER COMMENTS"
 NAME = "transmission_test_cost_template"
 LIMIT = 77
 
+class TemplateSkeleton:
+	"""
+	A class for the static blocks of the template drawn once per process
+
+	The logo is decoded once and the drawing operations of the header,
+	the column headers and the remarks are recorded once on a scratch
+	PDF object. A template stamps the recorded operations at its current
+	position and draws only its own values. A block is drawn normally
+	if the PDF object does not match the recording
+
+	Attributes:
+	----------
+		logo : dict
+			Decoded logo image, None until the first page
+
+		blocks : dict
+			Recorded operations of every block, None if the block
+			cannot be recorded
+
+	Method:
+	------
+		load : Returns the skeleton of the process
+
+		start_page : Adds a page with the fonts and the logo registered
+
+		record : Records the drawing operations of a block
+
+		stamp : Draws a block from its recording
+	"""
+
+	lock = threading.RLock()
+	current = None
+
+	def __init__(self):
+		self.logo = None
+		self.blocks = dict()
+
+	@classmethod
+	def load(cls):
+		"""
+		Returns the skeleton of the process, creating it the first time
+		"""
+
+		with cls.lock:
+			if cls.current is None:
+				cls.current = cls()
+			return cls.current
+
+	def start_page(self, pdf):
+		"""
+		Adds a page with the fill color and the fonts of the template and
+
+		registers the decoded logo, so that the recorded operations
+		refer to the same resources in every PDF object
+
+		Parameters:
+		----------
+			pdf : FPDF object
+				PDF object of the template
+
+		Return:
+		------
+			None
+		"""
+
+		pdf.add_page()
+		pdf.set_fill_color(220, 220, 220)
+		pdf.set_text_color(0, 0, 0)
+		pdf.set_font('Arial', 'B', size = 20)
+		pdf.set_font('Arial', size = 9)
+
+		# The logo is parsed by the first PDF object only, FPDF deletes
+		# the image data of its own copy when the file is written
+		images = getattr(pdf, "images", None)
+		if not isinstance(images, dict) or not hasattr(pdf, "_parsepng"):
+			return
+		if BOSCH_LOGO_IMAGE not in images:
+			with TemplateSkeleton.lock:
+				if self.logo is None:
+					self.logo = pdf._parsepng(BOSCH_LOGO_IMAGE)
+			images[BOSCH_LOGO_IMAGE] = dict(self.logo, i = len(images) + 1)
+
+	def record(self, draw):
+		"""
+		Records the operations drawn on a scratch PDF object
+
+		Parameters:
+		----------
+			draw : function
+				Draws the block from the current position of a PDF object
+
+		Return:
+		------
+			block : dict
+				Operations, origin and height of the block with the
+				fonts and images it refers to, None if the PDF object
+				does not keep its pages as text
+		"""
+
+		pdf = FPDF(orientation = 'P', unit = 'mm', format = 'A4')
+		self.start_page(pdf)
+		pages = getattr(pdf, "pages", None)
+		if not isinstance(pages, dict) or not isinstance(pages.get(1), str):
+			return None
+
+		origin = pdf.get_y()
+		start = len(pages[1])
+		draw(pdf)
+		if pdf.page != 1:
+			return None
+		return {
+			"operations" : pages[1][start:],
+			"origin" : origin,
+			"height" : pdf.get_y() - origin,
+			"fonts" : dict((key, font['i']) for key, font in pdf.fonts.items()),
+			"images" : dict((key, image['i']) for key, image in pdf.images.items())
+			}
+
+	def stamp(self, pdf, name, draw):
+		"""
+		Draws the block at the current position of the PDF object from
+
+		its recording, or with the drawing function if it cannot be
+		stamped. The operations are enclosed in a saved graphics state,
+		so the font and colors of the PDF object are unchanged after it
+
+		Parameters:
+		----------
+			pdf : FPDF object
+				PDF object of the template
+
+			name : str
+				Name of the block
+
+			draw : function
+				Draws the block, it must not depend on the template values
+
+		Return:
+		------
+			None
+		"""
+
+		if name not in self.blocks:
+			with TemplateSkeleton.lock:
+				if name not in self.blocks:
+					self.blocks[name] = self.record(draw)
+		block = self.blocks[name]
+
+		if (block is None
+				or any(pdf.fonts.get(key, {}).get('i') != number
+					for key, number in block["fonts"].items())
+				or any(pdf.images.get(key, {}).get('i') != number
+					for key, number in block["images"].items())):
+			draw(pdf)
+			return
+
+		if (pdf.get_y() + block["height"] > pdf.page_break_trigger
+				and pdf.accept_page_break()):
+			pdf.add_page()
+		pdf._out("q 1 0 0 1 0 %.4f cm\n%sQ" % (
+			(block["origin"] - pdf.get_y()) * pdf.k, block["operations"]))
+		pdf.set_xy(pdf.l_margin, pdf.get_y() + block["height"])
+
 class TransmissionTemplate:
 	"""
 	A class for generating Test & Cost template
 
 	Attributes:
 	----------
-		tests : dict
-			Collection of work package ids & test names 
-
-		costs : dict
-			Collection of work package ids and cost names
+		items : list
+			TestItem of every test to be performed
 
 		**kwargs : dict
 			Contains change type, subassembly, part, requester,
@@ -49,21 +219,46 @@ class TransmissionTemplate:
 
 	Method:
 	------
+		short_change_type : Returns the change type as recorded
+
+		duplicate : Returns the record of the same template, if any
+
 		generate_template : Generates the test and cost template
+
+		prepare_template : Assigns the locations and the time stamp
+
+		render_template : Draws the template on a new PDF object
+
+		draw_page : Draws the template on the current page
+
+		draw_header : Draws the logo, the title and the detail keys
+
+		draw_columns : Draws the second sub heading and the columns
+
+		draw_remarks : Draws the remarks and the comments sub heading
+
+		store_template : Writes the PDFs and journals the entry
+
+		store_async : Writes the PDFs and queues a missing server copy
+
+		queue_record : Journals the entry for the report database
+
+		document : Returns the rendered template as PDF bytes
 	"""
 
-	def __init__(self, tests, costs, **kwargs):
+	def __init__(self, items, snapshot = None, **kwargs):
 		"""
 		Constructs the required identifier for generating the 
 		template
 
 		Parameters:
 		----------
-			tests : dict
-				Collection of work package ids and test names
+			items : list
+				TestItem of every test to be performed
 
-			costs : dict
-				Collection of work package ids and cost names
+			snapshot : datastore.DataSnapshot
+				Databases the tests and costs were searched in, None
+				for a template that is not recorded
 
 			**kwargs : dict
 				Contains change type, subassembly, part name,
@@ -71,21 +266,18 @@ class TransmissionTemplate:
 		"""
 
 		# Assigning the identifiers for template generation
-		self.test_ = tests
-		self.cost_ = costs
+		self.items = items
 		self.input_values = kwargs
+		self.data = None
+		self.search_span = None
 
 		# Assigning the document name
 		self.user = getpass.getuser().lower()
 		self.name = "_".join((self.user, NAME))
 
 		# Formatting the change type for the template
-		self.format_changetype = self.input_values["Change Type"]
-		self.split_words = self.format_changetype.split()
-		if self.split_words[3] == "@":
-			self.format_changetype = " ".join(self.split_words[:3])
-		else:
-			self.format_changetype = " ".join(self.split_words[:4])
+		self.format_changetype = TransmissionTemplate.short_change_type(
+			self.input_values["Change Type"])
 		self.input_values["Change Type"] = self.format_changetype
 
 		# Assigning general input fields
@@ -116,22 +308,34 @@ class TransmissionTemplate:
 			}
 
 		# Assigning padding values for the data
-		self.padding = dict()
-		for test in self.test_.values():
-			if len(test) > LIMIT:
-				self.padding[test] = 2
-			else:
-				self.padding[test] = 1
+		self.padding = [2 if len(item.name) > LIMIT else 1
+			for item in self.items]
 
 		# Assigning page width and default cell height
 		self.width = 190
 		self.height = 8
 
-		self.total_test = len(self.test_)
-		self.total_cost = str(round(sum(self.cost_.values()), 2))
+		self.total_test = len(self.items)
+		self.total_cost = str(TestItem.total(self.items))
 		self.total = format_currency(self.total_cost, 'EUR', locale = 'de_DE')[:-2]
 		self.total = str(self.total).split(',')[0]
 
+		# Identifying the template by the digest of the cost database it
+		# was searched in, whatever the state of the file on the server
+		self.versions = dict()
+		if snapshot is not None:
+			self.versions = dict(
+				(field, signature.digest)
+				for field, signature in snapshot.signatures.items())
+		self.fingerprint = None
+		if self.versions.get("Cost") is not None:
+			self.fingerprint = RecordFingerprint.compute(
+				self.input_values["Change Type"],
+				self.input_values["Subassembly"],
+				self.input_values["Part Name"],
+				self.items,
+				self.versions["Cost"])
+
 		try:
 			data = sqlite3.connect('database/info.db')
 			cur = data.cursor()
@@ -139,17 +343,46 @@ class TransmissionTemplate:
 			messagebox.showwarning("Database Error", str(e))
 		else:
 			cur.execute('''SELECT Name, Path FROM Databases''')
-			databases = dict(
+			self.databases = dict(
 				(col[0], col[1]) for col in cur.fetchall())
-			self.test_name = os.path.basename(databases['Test'])
-			self.cost_name = os.path.basename(databases['Cost'])
+			self.test_name = os.path.basename(self.databases['Test'])
+			self.cost_name = os.path.basename(self.databases['Cost'])
 		finally:
 			data.close()
 
-		if not os.path.exists(TEMPLATE_FOLDER):
-			os.mkdir(TEMPLATE_FOLDER.split('/')[0])
+	@staticmethod
+	def short_change_type(change_type):
+		"""
+		Returns the change type as printed in the template and recorded
+
+		in the report database, its first three or four words
+		"""
+
+		split_words = change_type.split()
+		if split_words[3] == "@":
+			return " ".join(split_words[:3])
+		return " ".join(split_words[:4])
+
+	def duplicate(self, report):
+		"""
+		Returns the record of the template generated earlier for the same
+
+		combination, tests and cost database, if its PDF still exists
+
+		Parameters:
+		----------
+			report : str
+				Location of the report database
+
+		Return:
+		------
+			record : models.UsageRecord
+				Record of the existing template, None if there is none
+		"""
+
+		with tracer.span("duplicate_check"):
+			return RecordFingerprint.lookup(report, self.fingerprint)
 
-		
 	def generate_template(self, **path):
 		"""
 		Generate the test and cost template in the present working 
@@ -166,83 +399,109 @@ class TransmissionTemplate:
 			None
 		"""
 
+		with tracer.span("generation") as self.span:
+			self.prepare_template(**path)
+			with tracer.span("pdf_render"):
+				self.render_template()
+			self.store_template()
+
+		# Check if the PDFs are generated and the records are updated
+		# Display the output message to the user
+		if self.error:
+			messagebox.showwarning(
+				"Report Error",
+				"This record will not be captured"+self.error)
+		if self.generated:
+			messagebox.showinfo(
+				"Success", 
+				"The Test Cost information is generated")
+		else:
+			messagebox.showwarning(
+				"Failure", 
+				"The Test Cost information could not be generated")
+
+	def prepare_template(self, **path):
+		"""
+		Assign the locations and the time stamp of the generation
+
+		Parameters:
+		----------
+			**path : dict
+				Contains the location of server folder and report
+
+		Return:
+		------
+			None
+		"""
+
 		# Assigning the required identifiers
 		self.record_inputs = path
 		self.record_folder = path["Records"]
 		self.generated = False
+		self.error = None
+		os.makedirs(TEMPLATE_FOLDER, exist_ok = True)
 
 		self.now = datetime.now()
 		self.date = self.now.strftime("%d/%m/%Y")
 		self.time = self.now.strftime("%H:%M:%S")
 
+	def render_template(self):
+		"""
+		Draw the test and cost template on a new PDF object, the static
+		blocks are stamped from the skeleton of the process
+
+		Parameters:
+		----------
+			None
+
+		Return:
+		------
+			None
+		"""
+
 		# PDF object with A4 sheet size and Portrait orientation
+		self.data = None
+		skeleton = TemplateSkeleton.load()
 		self.pdf = FPDF(orientation = 'P', unit = 'mm', format = 'A4')
-		self.pdf.add_page()
-		self.pdf.set_fill_color(220, 220, 220)
+		skeleton.start_page(self.pdf)
+		self.draw_page(skeleton)
 
-		# Logo
-		self.pdf.set_font('Arial', 'B', size = 20)
-		self.pdf.image(BOSCH_LOGO_IMAGE, x = 11, y = 11, w = 40, h = 8.5)
-		self.pdf.cell(42.5, 10.5, border = 1)
+	def draw_page(self, skeleton):
+		"""
+		Draw the template from the current position of the PDF object
 
-		# Title 
-		self.pdf.set_font('Arial', 'B', size = 20)
-		self.pdf.set_text_color(0, 0, 0)
-		self.pdf.cell(147.5, 10.5, txt = TITLE, align = 'C', border = 1)
-		self.pdf.ln()
+		Parameters:
+		----------
+			skeleton : TemplateSkeleton
+				Recorded static blocks of the template
 
-		# First sub heading
-		self.pdf.set_font('Arial', 'B', size = 12)
-		self.pdf.cell(
-			self.width, 
-			self.height, 
-			txt = DETAILS, 
-			border = 1, 
-			fill = True)
-		self.pdf.ln()
+		Return:
+		------
+			None
+		"""
+
+		# Logo, title, first sub heading and the keys of the details
+		skeleton.stamp(self.pdf, "header", self.draw_header)
 
 		# General information
 		self.x1, self.y1 = self.pdf.get_x(), self.pdf.get_y()
-		for key, value in self.detail_one.items():
-			self.pdf.set_font('Arial', 'B', size = 10)
-			self.pdf.cell(50, 6, txt = key, border = 1)
-			self.pdf.set_font('Arial', size = 9)
+		self.pdf.set_font('Arial', size = 9)
+		for row, value in enumerate(self.detail_one.values()):
+			self.pdf.set_xy(self.x1 + 50, self.y1 + 6 * row)
 			self.pdf.cell(62, 6, txt = value, border = 1)
-			self.pdf.ln()
-
-		self.pdf.set_font('Arial', 'B', size = 10)
-		self.pdf.set_xy(self.x1 + 112, self.y1)
-		for key in self.detail_two.keys():
-			self.pdf.set_x(self.x1 + 112)
-			self.pdf.cell(35, 14, txt = key, border = 1, align = 'C')
-			self.pdf.ln()
 
-		self.pdf.set_font('Arial', size = 9)
 		self.pdf.set_xy(self.x1 + 147, self.y1)
 		for value in self.detail_two.values():
 			self.pdf.set_x(self.x1 + 147)
 			self.pdf.multi_cell(43, 7, txt = value, border = 1, align = 'C')
 
-		# Second sub heading
-		self.pdf.set_font('Arial', 'B', size = 12)
-		self.pdf.cell(
-			self.width,
-			self.height,
-			txt = TEST_AND_COST,
-			border = 1,
-			fill = True)
-		self.pdf.ln()
-
-		# Creating columns for the body of the template
-		self.pdf.set_font('Arial', 'B', size = 10)
-		for key, value in self.column_headers.items():
-			self.pdf.cell(value, self.height, txt = key, border = 1, align = 'C')
-		self.pdf.ln()
+		# Second sub heading and the columns for the body of the template
+		skeleton.stamp(self.pdf, "columns", self.draw_columns)
 
 		# Creating the serial numbers 
 		self.x2, self.y2 = self.pdf.get_x(), self.pdf.get_y()
 		self.pdf.set_font('Arial', size = 9)
-		for index, pad in enumerate(self.padding.values(), start = 1):
+		for index, pad in enumerate(self.padding, start = 1):
 			self.pdf.cell(
 				self.column_headers["S.No."], 
 				self.height * pad, 
@@ -253,30 +512,30 @@ class TransmissionTemplate:
 
 		# Writing the test names
 		self.pdf.set_xy(self.x2 + 10, self.y2)
-		for test in self.test_.values():
+		for item in self.items:
 			self.pdf.set_x(self.x2 + 10)
 			self.pdf.multi_cell(
 				self.column_headers["Test Name"], 
 				self.height, 
-				txt = test, 
+				txt = item.name, 
 				border = 1, 
 				align = 'L')
 
 		# Writing the cost values
 		self.pdf.set_xy(self.x2 + 135, self.y2)
-		for cost, pad in zip(self.cost_.values(), self.padding.values()):
+		for item, pad in zip(self.items, self.padding):
 			self.pdf.set_x(self.x2 + 135)
 			self.pdf.cell(
 				self.column_headers["Cost"],
 				self.height * pad,
-				txt = str(cost),
+				txt = str(item.cost),
 				border = 1,
 				align = 'C')
 			self.pdf.ln()
 
 		# Remark column
 		self.pdf.set_xy(self.x2 + 160, self.y2)
-		for blank, pad in zip(range(len(self.padding)), self.padding.values()):
+		for pad in self.padding:
 			self.pdf.set_x(self.x2 + 160)
 			self.pdf.cell(
 				self.column_headers["Remarks"],
@@ -305,26 +564,10 @@ class TransmissionTemplate:
 			border = 1)
 		self.pdf.ln()
 
-		# General remarks
-		self.pdf.set_font('Arial', 'B', size = 12)
-		self.pdf.cell(
-			self.width,
-			self.height,
-			txt = REMARKS,
-			border = 1, 
-			fill = True)
-		self.pdf.ln()
-		self.pdf.cell(self.width, self.height + 4, txt = " ", border = 1)
-		self.pdf.ln()
+		# General remarks and the sub heading of the user comments
+		skeleton.stamp(self.pdf, "remarks", self.draw_remarks)
 
 		# User comments
-		self.pdf.cell(
-			self.width,
-			self.height,
-			txt = COMMENTS,
-			border = 1,
-			fill = True)
-		self.pdf.ln()
 		self.pdf.set_font('Arial', size = 9)
 		self.pdf.cell(
 			self.width,
@@ -349,44 +592,234 @@ class TransmissionTemplate:
 						border = 1,
 						align = 'L')
 
-		# Creating PDFs and recording the entry in teh SQL database
+	def draw_header(self, pdf):
+		"""
+		Draw the logo, the title, the first sub heading and the keys of
+
+		the general information, ending at the first row of the details
+
+		Parameters:
+		----------
+			pdf : FPDF object
+				PDF object to draw on
+
+		Return:
+		------
+			None
+		"""
+
+		# Logo
+		pdf.set_font('Arial', 'B', size = 20)
+		pdf.image(BOSCH_LOGO_IMAGE, x = 11, y = 11, w = 40, h = 8.5)
+		pdf.cell(42.5, 10.5, border = 1)
+
+		# Title 
+		pdf.set_font('Arial', 'B', size = 20)
+		pdf.set_text_color(0, 0, 0)
+		pdf.cell(147.5, 10.5, txt = TITLE, align = 'C', border = 1)
+		pdf.ln()
+
+		# First sub heading
+		pdf.set_font('Arial', 'B', size = 12)
+		pdf.cell(
+			self.width, 
+			self.height, 
+			txt = DETAILS, 
+			border = 1, 
+			fill = True)
+		pdf.ln()
+
+		# Keys of the general information
+		x1, y1 = pdf.get_x(), pdf.get_y()
+		pdf.set_font('Arial', 'B', size = 10)
+		for key in self.detail_one.keys():
+			pdf.cell(50, 6, txt = key, border = 1)
+			pdf.ln()
+
+		pdf.set_xy(x1 + 112, y1)
+		for key in self.detail_two.keys():
+			pdf.set_x(x1 + 112)
+			pdf.cell(35, 14, txt = key, border = 1, align = 'C')
+			pdf.ln()
+		pdf.set_xy(x1, y1)
+
+	def draw_columns(self, pdf):
+		"""
+		Draw the second sub heading and the column headers
+		"""
+
+		# Second sub heading
+		pdf.set_font('Arial', 'B', size = 12)
+		pdf.cell(
+			self.width,
+			self.height,
+			txt = TEST_AND_COST,
+			border = 1,
+			fill = True)
+		pdf.ln()
+
+		# Creating columns for the body of the template
+		pdf.set_font('Arial', 'B', size = 10)
+		for key, value in self.column_headers.items():
+			pdf.cell(value, self.height, txt = key, border = 1, align = 'C')
+		pdf.ln()
+
+	def draw_remarks(self, pdf):
+		"""
+		Draw the general remarks and the sub heading of the user comments
+		"""
+
+		# General remarks
+		pdf.set_font('Arial', 'B', size = 12)
+		pdf.cell(
+			self.width,
+			self.height,
+			txt = REMARKS,
+			border = 1, 
+			fill = True)
+		pdf.ln()
+		pdf.cell(self.width, self.height + 4, txt = " ", border = 1)
+		pdf.ln()
+
+		# User comments
+		pdf.cell(
+			self.width,
+			self.height,
+			txt = COMMENTS,
+			border = 1,
+			fill = True)
+		pdf.ln()
+
+	def store_template(self):
+		"""
+		Write the rendered template to the present working directory
+
+		and the server folder and journal the entry for the SQL database
+
+		Parameters:
+		----------
+			None
+
+		Return:
+		------
+			None
+		"""
+
+		# Creating PDFs and journaling the entry in the outbox
 		try:
-			self.report = sqlite3.connect(self.record_inputs["Report"])
-			self.cur = self.report.cursor()
+			io.run(self.store_async())
 		except Exception as e:
-			messagebox.showwarning(
-				"Report Error",
-				"This record will not be captured"+str(e))
-		else:
-			self.cur.execute('''SELECT ID FROM Record''')
-			self.ids = self.cur.fetchall()
-			self.new_id = len(self.ids) + 1
-			self.pdf_name = "_".join((self.name, str(self.new_id)))
-			self.pdf_name = ".".join((self.pdf_name, "pdf"))
-			self.pdf.output(TEMPLATE_FOLDER + self.pdf_name)
-			self.path = str(os.path.join(self.record_folder, self.pdf_name))
-			self.pdf.output(self.path)
-			self.cur.execute('''INSERT INTO Record(Date, Time, Requester,Creator, 
-				Changetype, Test, Cost, Link, User, Subassembly, Partname
-				)VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',(
-					self.date, self.time, self.input_values["Requester"],
-					self.input_values["Creator"], self.input_values["Change Type"],
-					self.total_test, self.total_cost, self.path, self.user, 
-					self.input_values["Subassembly"], self.input_values["Part Name"]))
-			self.report.commit()
-			self.generated = True
-		finally:
-			self.report.close()
+			self.error = str(e) or type(e).__name__
 
-		# Check if the PDFs are generated and the records are updated
-		# Display the output message to the user
-		if self.generated:
-			messagebox.showinfo(
-				"Success", 
-				"The Test Cost information is generated")
-		else:
-			messagebox.showwarning(
-				"Failure", 
-				"The Test Cost information could not be generated")
+	async def store_async(self):
+		"""
+		Write the PDFs to the present working directory and the server
+
+		folder and journal the entry once the local file is written. A
+		copy that cannot be written to the server folder is journaled
+		with the entry and written by the syncer
+
+		Parameters:
+		----------
+			None
+
+		Return:
+		------
+			None
+		"""
+
+		data = self.document()
+		self.key = uuid.uuid4().hex
+		with tracer.detached("report_connect"):
+			self.new_id = await io.database(
+				outbox.number, self.record_inputs["Report"])
+		if self.new_id is None:
+			self.new_id = self.now.strftime("%Y%m%d%H%M%S")
+		self.pdf_name = "_".join((self.name, str(self.new_id)))
+		self.pdf_name = ".".join((self.pdf_name, "pdf"))
+		self.path = str(os.path.join(self.record_folder, self.pdf_name))
+
+		local = TEMPLATE_FOLDER + self.pdf_name
+		local_write, network_write = await asyncio.gather(
+			io.write(local, data, "local_write"),
+			io.write(self.path, data, "network_write"),
+			return_exceptions = True)
+		if isinstance(local_write, BaseException):
+			raise local_write
+
+		source = None
+		if isinstance(network_write, BaseException):
+			logging.warning("%s is written once the server is reachable: %s" % (
+				self.path, str(network_write) or type(network_write).__name__))
+			source = local
+
+		with tracer.detached("report_queue"):
+			await io.database(self.queue_record, len(data), source)
+		self.generated = True
+
+	def queue_record(self, pdf_size, source = None):
+		"""
+		Journal the entry and the performance metrics in the outbox
+
+		Parameters:
+		----------
+			pdf_size : int
+				Size of the generated PDF in bytes
+
+			source : str
+				Local copy to be written to the server folder, if any
+
+		Return:
+		------
+			None
+		"""
+
+		metrics = None
+		try:
+			metrics = GenerationMetrics(
+				self.span, self.versions, self.search_span).values(
+				self.total_test, pdf_size)
+		except Exception:
+			logging.error("Metrics could not be recorded", exc_info = True)
+
+		# The comment and the test names are only kept in the search index
+		record = dict(zip(RECORD_COLUMNS, (
+			self.date, self.time, self.input_values["Requester"],
+			self.input_values["Creator"], self.input_values["Change Type"],
+			self.total_test, self.total_cost, self.path, self.user,
+			self.input_values["Subassembly"],
+			self.input_values["Part Name"])))
+		record["Comment"] = self.input_values["Comment"]
+		record["TestNames"] = " ".join(item.name for item in self.items)
+		record["Fingerprint"] = self.fingerprint
+
+		outbox.enqueue(
+			self.key,
+			self.record_inputs["Report"],
+			record,
+			metrics,
+			source,
+			None if source is None else self.path)
+
+	def document(self):
+		"""
+		Returns the rendered template as the bytes of a PDF file, or the
+
+		bytes assigned to data if it is rendered by another process
 
+		Parameters:
+		----------
+			None
+
+		Return:
+		------
+			data : bytes
+				Contents of the PDF file
+		"""
 
+		if self.data is None:
+			data = self.pdf.output(dest = 'S')
+			if isinstance(data, str):
+				data = data.encode('latin-1')
+			self.data = bytes(data)
+		return self.data
@@ -0,0 +1,394 @@
+"""
+A workbook diff module for reporting the combinations whose tests or
+total cost change between two versions of the test and cost databases
+
+	Usage:
+	-----
+		python workbookdiff.py old_test.xlsx old_cost.xlsx
+			new_test.xlsx new_cost.xlsx
+"""
+
+__author__ = "Monish Mohanan"
+__version__ = "1.0"
+
+# Importing required libraries
+try:
+	import os
+	import csv
+	import argparse
+	from fpdf import FPDF
+	from instrumentation import tracer
+	from infobase import InfoBase
+	from datastore import DataStore, DataSnapshot
+	from searchbase import CostIndex, TestIndex
+	from impact import ImpactMatrix, IMPACT_FOLDER
+	from template import TransmissionTemplate
+except ImportError as e:
+	from tkinter import messagebox
+	messagebox.showwarning("Import Error", str(e))
+
+# Defining the necessary constants
+DIFF_NAME = "Test Cost Version Diff"
+HEADINGS = (
+	"Change Type", "Subassembly", "Part Name", "Column",
+	"Added", "Removed", "Old Total (EUR)", "New Total (EUR)", "Delta (EUR)")
+COST_HEADINGS = ("WP ID", "Old Cost (EUR)", "New Cost (EUR)", "Delta (EUR)")
+
+class DiffRow:
+	"""
+	A class to represent the change of a combination between two
+
+	versions of the databases
+
+	Attributes:
+	----------
+		change_type : int
+			Number of the change type
+
+		subassembly, part : str
+			Subassembly and part name, NA for the whole subassembly
+
+		column : int
+			Search column in the test database
+
+		added, removed : list
+			Work package ids, or names of the tests without one, added
+			to and removed from the combination
+
+		old_cost, new_cost : float
+			Total cost of the combination in the old and new versions
+
+	Method:
+	------
+		values : Returns the change in the order of the headings
+	"""
+
+	__slots__ = (
+		"change_type", "subassembly", "part", "column",
+		"added", "removed", "old_cost", "new_cost")
+
+	def __init__(self, change_type, subassembly, part, column,
+			added, removed, old_cost, new_cost):
+		self.change_type = change_type
+		self.subassembly = subassembly
+		self.part = part
+		self.column = column
+		self.added = added
+		self.removed = removed
+		self.old_cost = old_cost
+		self.new_cost = new_cost
+
+	@property
+	def delta(self):
+		return round(self.new_cost - self.old_cost, 2)
+
+	def values(self):
+		return (self.change_type, self.subassembly, self.part, self.column,
+			"; ".join(map(str, self.added)), "; ".join(map(str, self.removed)),
+			round(self.old_cost, 2), round(self.new_cost, 2), self.delta)
+
+class WorkbookDiff:
+	"""
+	A class for comparing two versions of the test and cost databases
+
+	Both versions are loaded into their indexes. The tests of every
+	combination are the work package sets of the change type bitmasks
+	of a search column, split over all the change types in one pass
+	per column, and the versions are compared by set differences. The
+	costs are compared on the key views of the cost maps
+
+	Attributes:
+	----------
+		old, new : datastore.DataSnapshot
+			Old and new versions of the databases
+
+		info : infobase.InfoBase
+			Change types, subassemblies and parts
+
+	Method:
+	------
+		load : Loads a version of the databases into its indexes
+
+		tests : Returns the tests of every change type of a column
+
+		compare_costs : Compares the costs of the work packages
+
+		compare : Compares the tests and totals of every combination
+
+		export_csv : Writes the changes as CSV
+
+		export_pdf : Writes the changes as PDF
+
+		export : Writes the changes in every format
+	"""
+
+	def __init__(self, old, new, info):
+		"""
+		Constructs the identifiers of the comparison
+
+		Parameters:
+		----------
+			old, new : datastore.DataSnapshot
+				Old and new versions of the databases
+
+			info : infobase.InfoBase
+				Change types, subassemblies and parts
+		"""
+
+		self.old = old
+		self.new = new
+		self.info = info
+		self.rows = list()
+		self.costs = list()
+
+	@staticmethod
+	def load(test_path, cost_path, previous = None):
+		"""
+		Loads a version of the test and cost databases into its indexes
+
+		Parameters:
+		----------
+			test_path, cost_path : str
+				Locations of the test and cost database files
+
+			previous : datastore.DataSnapshot
+				Other version, its unchanged cost sheets are reused
+
+		Return:
+		------
+			snapshot : datastore.DataSnapshot
+				Loaded version of the databases
+		"""
+
+		test_workbook, test_signature = DataStore.open_workbook(test_path)
+		cost_workbook, cost_signature = DataStore.open_cost_workbook(
+			cost_path)
+		return DataSnapshot(
+			{"Test" : test_workbook, "Cost" : cost_workbook},
+			{"Test" : test_signature, "Cost" : cost_signature},
+			CostIndex(
+				cost_workbook, previous and previous.cost_index),
+			TestIndex(test_workbook))
+
+	def tests(self, snapshot, column):
+		"""
+		Returns the tests of every change type of the search column
+
+		Parameters:
+		----------
+			snapshot : datastore.DataSnapshot
+				Version of the databases
+
+			column : int
+				Search column in the test database
+
+		Return:
+		------
+			tests : dict
+				Set of the work package ids of every change type, the
+				names stand for the tests without a work package id
+		"""
+
+		test_index = snapshot.test_index
+		changes = [(number, 1 << number) for number in self.info.change_types]
+		tests = dict((number, set()) for number, bit in changes)
+		keys = [item.name if item.wpid is None else item.wpid
+			for item in test_index.items]
+		for mask, key in zip(test_index.column(column - 1), keys):
+			if not mask:
+				continue
+			for number, bit in changes:
+				if mask & bit:
+					tests[number].add(key)
+		return tests
+
+	def compare_costs(self):
+		"""
+		Returns the work packages whose cost differs between the versions
+
+		Parameters:
+		----------
+			None
+
+		Return:
+		------
+			costs : list
+				Work package id, old cost and new cost, None where the
+				work package is missing, sorted by work package id
+		"""
+
+		old = self.old.cost_index.costs
+		new = self.new.cost_index.costs
+		changed = set(wpid for wpid in old.keys() & new.keys()
+			if old[wpid] != new[wpid])
+		changed |= old.keys() ^ new.keys()
+		self.costs = [(wpid, old.get(wpid), new.get(wpid))
+			for wpid in sorted(changed)]
+		return self.costs
+
+	def compare(self):
+		"""
+		Returns the combinations whose tests or total cost change
+
+		Parameters:
+		----------
+			None
+
+		Return:
+		------
+			rows : list
+				DiffRow of every changed combination and change type
+		"""
+
+		old_costs = self.old.cost_index.costs
+		new_costs = self.new.cost_index.costs
+
+		def total(tests, costs):
+			return sum(costs.get(key) or 0.0 for key in tests)
+
+		rows = list()
+		with tracer.span("workbook_diff") as span:
+			self.compare_costs()
+			combinations = ImpactMatrix(self.new, self.info).combinations()
+			for subassembly, part, column in combinations:
+				old_tests = self.tests(self.old, column)
+				new_tests = self.tests(self.new, column)
+				for number in sorted(self.info.change_types):
+					old, new = old_tests[number], new_tests[number]
+					row = DiffRow(
+						number, subassembly, part, column,
+						sorted(new - old, key = str),
+						sorted(old - new, key = str),
+						total(old, old_costs), total(new, new_costs))
+					if row.added or row.removed or row.delta:
+						rows.append(row)
+			span.count("combinations", len(combinations))
+		self.rows = rows
+		return rows
+
+	def export_csv(self, path):
+		"""
+		Writes the changed combinations and, next to them, the changed
+
+		costs to CSV files
+		"""
+
+		with open(path, "w", newline = "") as output:
+			writer = csv.writer(output)
+			writer.writerow(HEADINGS)
+			writer.writerows(row.values() for row in self.rows)
+
+		root, extension = os.path.splitext(path)
+		with open(root + " Costs" + extension, "w", newline = "") as output:
+			writer = csv.writer(output)
+			writer.writerow(COST_HEADINGS)
+			for wpid, old, new in self.costs:
+				writer.writerow((wpid, old, new,
+					None if old is None or new is None
+					else round(new - old, 2)))
+
+	def export_pdf(self, path):
+		"""
+		Writes the changed combinations and costs to a PDF file
+		"""
+
+		widths = (25, 30, 25, 15, 15, 25, 25, 30)
+		headings = ("Change Type", "Subassembly", "Part Name", "Added",
+			"Removed", "Old Total", "New Total", "Delta")
+		changes = dict(
+			(number, TransmissionTemplate.short_change_type(change))
+			for number, change in self.info.change_types.items())
+
+		pdf = FPDF(orientation = 'P', unit = 'mm', format = 'A4')
+		pdf.add_page()
+		pdf.set_font("Arial", "B", size = 12)
+		pdf.cell(190, 10, txt = DIFF_NAME, align = 'C')
+		pdf.ln()
+		pdf.set_font("Arial", size = 9)
+		for field, snapshot in (("Old", self.old), ("New", self.new)):
+			pdf.cell(190, 5, txt = "%s : %s" % (field, ", ".join(
+				os.path.basename(snapshot.signatures[name].path)
+				for name in ("Test", "Cost"))))
+			pdf.ln()
+		pdf.cell(190, 5, txt = "%d combinations and %d work package costs "
+			"changed" % (len(self.rows), len(self.costs)))
+		pdf.ln(8)
+
+		pdf.set_font("Arial", "B", size = 8)
+		for heading, width in zip(headings, widths):
+			pdf.cell(width, 7, txt = heading, align = 'C', border = 1)
+		pdf.ln()
+		pdf.set_font("Arial", size = 7)
+		for row in self.rows:
+			values = (changes[row.change_type], row.subassembly, row.part,
+				"+%d" % len(row.added), "-%d" % len(row.removed),
+				"%.2f" % row.old_cost, "%.2f" % row.new_cost,
+				"%+.2f" % row.delta)
+			for value, width in zip(values, widths):
+				pdf.cell(width, 6, txt = value, align = 'C', border = 1)
+			pdf.ln()
+
+		pdf.ln(6)
+		pdf.set_font("Arial", "B", size = 8)
+		for heading, width in zip(COST_HEADINGS, (40, 40, 40, 40)):
+			pdf.cell(width, 7, txt = heading, align = 'C', border = 1)
+		pdf.ln()
+		pdf.set_font("Arial", size = 7)
+		for wpid, old, new in self.costs:
+			values = (str(wpid),
+				"-" if old is None else "%.2f" % old,
+				"-" if new is None else "%.2f" % new,
+				"-" if old is None or new is None else "%+.2f" % (new - old))
+			for value in values:
+				pdf.cell(40, 6, txt = value, align = 'C', border = 1)
+			pdf.ln()
+		pdf.output(path)
+
+	def export(self, folder = IMPACT_FOLDER):
+		"""
+		Writes the changes as CSV and PDF to the folder
+
+		Parameters:
+		----------
+			folder : str
+				Location of the exported files
+
+		Return:
+		------
+			paths : list
+				Locations of the exported files
+		"""
+
+		os.makedirs(folder, exist_ok = True)
+		paths = list()
+		for extension, export in (
+				("csv", self.export_csv), ("pdf", self.export_pdf)):
+			path = os.path.join(folder, ".".join((DIFF_NAME, extension)))
+			export(path)
+			paths.append(path)
+		return paths
+
+def main():
+	"""
+	Compares two versions of the databases from the command line
+	"""
+
+	parser = argparse.ArgumentParser(description = __doc__.split("\n")[1])
+	parser.add_argument("old_test")
+	parser.add_argument("old_cost")
+	parser.add_argument("new_test")
+	parser.add_argument("new_cost")
+	parser.add_argument("--folder", default = IMPACT_FOLDER)
+	arguments = parser.parse_args()
+
+	old = WorkbookDiff.load(arguments.old_test, arguments.old_cost)
+	new = WorkbookDiff.load(arguments.new_test, arguments.new_cost, old)
+	diff = WorkbookDiff(old, new, InfoBase())
+	diff.compare()
+	for path in diff.export(arguments.folder):
+		print(path)
+	print("%d combinations and %d work package costs changed" % (
+		len(diff.rows), len(diff.costs)))
+
+if __name__ == "__main__":
+	main()
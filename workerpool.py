@@ -0,0 +1,473 @@
+"""
+A worker pool module for rendering the templates in several processes
+from one copy of the compiled test and cost data in shared memory
+"""
+
+__author__ = "Monish Mohanan"
+__version__ = "1.0"
+
+# Importing required libraries
+try:
+	import struct
+	import bisect
+	import logging
+	import threading
+	from array import array
+	from concurrent.futures import ProcessPoolExecutor
+	from multiprocessing import shared_memory
+	from models import TestItem
+	from searchbase import ChangeTypeMatcher, NAME_COLUMN
+	from template import TransmissionTemplate
+except ImportError as e:
+	from tkinter import messagebox
+	messagebox.showwarning("Import Error", str(e))
+
+# Defining the necessary constants
+RENDER_PROCESSES = 2
+SHARED_MAGIC = b"TCDATA01"
+HEADER = struct.Struct("<8sQQQQ")
+NO_WPID = -1
+
+class SharedData:
+	"""
+	A class to represent the compiled test and cost data laid out in
+
+	one block of shared memory
+
+	The block holds the sorted work package ids and their costs, the
+	work package id, the name offsets and the change type bitmasks of
+	every test row, followed by the test names in UTF-8. A process
+	attaching to the block reads it in place, nothing is unpickled or
+	copied, so the data is in memory once whatever the number of
+	processes
+
+	Attributes:
+	----------
+		memory : multiprocessing.shared_memory.SharedMemory
+			Block holding the data
+
+	Method:
+	------
+		compile : Lays out the data of a snapshot
+
+		publish : Compiles a snapshot into a new block
+
+		attach : Returns the data of a block by its name
+
+		cost : Returns the cost of a work package
+
+		search : Returns the tests and costs of a selection
+
+		close : Detaches from the block
+	"""
+
+	attached = dict()
+
+	def __init__(self, memory):
+		"""
+		Maps the sections of the block without copying them
+
+		Parameters:
+		----------
+			memory : multiprocessing.shared_memory.SharedMemory
+				Block holding the data
+		"""
+
+		self.memory = memory
+		self.name = memory.name
+		buffer = memory.buf
+		magic, costs, tests, columns, names = HEADER.unpack_from(buffer, 0)
+		if magic != SHARED_MAGIC:
+			raise ValueError("%s is not a test and cost data block" % self.name)
+
+		self.tests = tests
+		self.columns = columns
+		self.views = list()
+		offset = HEADER.size
+		for field, code, count in (
+				("packages", "q", costs), ("costs", "d", costs),
+				("wpids", "q", tests), ("offsets", "Q", tests + 1),
+				("masks", "Q", tests * columns), ("names", "B", names)):
+			size = count * struct.calcsize(code)
+			view = buffer[offset:offset + size].cast(code)
+			self.views.append(view)
+			setattr(self, field, view)
+			offset += size
+
+	@staticmethod
+	def compile(snapshot):
+		"""
+		Lays out the test index and the cost index of the snapshot
+
+		Parameters:
+		----------
+			snapshot : datastore.DataSnapshot
+				Loaded test and cost databases
+
+		Return:
+		------
+			data : bytearray
+				Contents of the block
+		"""
+
+		test_index = snapshot.test_index
+		costs = sorted(snapshot.cost_index.costs.items())
+		columns = test_index.sheet.ncols
+		tests = len(test_index.items)
+
+		names = bytearray()
+		offsets = array("Q", [0])
+		for item in test_index.items:
+			names.extend(item.name.encode())
+			offsets.append(len(names))
+
+		# Only the search columns list change types, the id and name
+		# columns are laid out empty to keep the column positions
+		masks = array("Q", bytes(8 * tests * (NAME_COLUMN + 1)))
+		for column in range(NAME_COLUMN + 1, columns):
+			masks.extend(test_index.column(column))
+
+		data = bytearray(HEADER.pack(
+			SHARED_MAGIC, len(costs), tests, columns, len(names)))
+		data.extend(array("q", [package for package, cost in costs]))
+		data.extend(array("d", [cost for package, cost in costs]))
+		data.extend(array("q", [
+			NO_WPID if item.wpid is None else item.wpid
+			for item in test_index.items]))
+		data.extend(offsets)
+		data.extend(masks)
+		data.extend(names)
+		return data
+
+	@classmethod
+	def publish(cls, snapshot):
+		"""
+		Compiles the snapshot into a new block of shared memory
+
+		Parameters:
+		----------
+			snapshot : datastore.DataSnapshot
+				Loaded test and cost databases
+
+		Return:
+		------
+			shared : SharedData
+				Data of the new block
+		"""
+
+		data = SharedData.compile(snapshot)
+		memory = shared_memory.SharedMemory(create = True, size = len(data))
+		memory.buf[:len(data)] = data
+		return cls(memory)
+
+	@classmethod
+	def attach(cls, name):
+		"""
+		Returns the data of the block, attaching to it the first time
+
+		and detaching from the block it replaces
+
+		Parameters:
+		----------
+			name : str
+				Name of the block
+
+		Return:
+		------
+			shared : SharedData
+				Data of the block
+		"""
+
+		shared = cls.attached.get(name)
+		if shared is None:
+			shared = cls(shared_memory.SharedMemory(name = name))
+			for previous in list(cls.attached.values()):
+				previous.close()
+			cls.attached = {name : shared}
+		return shared
+
+	def cost(self, wpid):
+		"""
+		Returns the cost of the work package, None if it has no cost
+		"""
+
+		position = bisect.bisect_left(self.packages, wpid)
+		if position < len(self.packages) and self.packages[position] == wpid:
+			return self.costs[position]
+		return None
+
+	def search(self, change_types, column):
+		"""
+		Returns the tests and costs of the change types in a column,
+
+		a work package listed in several rows is taken once like in
+		the search of the loaded databases
+
+		Parameters:
+		----------
+			change_types : int or iterable
+				Selected change types
+
+			column : int
+				Search column in the test database, starting from 1
+
+		Return:
+		------
+			items : list or str
+				TestItem of every test, or a warning message
+		"""
+
+		mask = ChangeTypeMatcher.mask(change_types)
+		start = (column - 1) * self.tests
+		tests = dict()
+		for row in range(self.tests):
+			if self.masks[start + row] & mask:
+				wpid = self.wpids[row]
+				name = bytes(
+					self.names[self.offsets[row]:self.offsets[row + 1]])
+				tests[None if wpid == NO_WPID else wpid] = name.decode()
+
+		if not tests:
+			return "No tests for the selected combination"
+		if None in tests:
+			return "Missing workpackage IDs in test database"
+		items = [TestItem(wpid, name) for wpid, name in tests.items()]
+		for item in items:
+			item.cost = self.cost(item.wpid)
+			if item.cost is None:
+				return "Missing workpackage/cost info in cost database"
+		return items
+
+	def close(self):
+		"""
+		Releases the views and detaches from the block
+		"""
+
+		for view in self.views:
+			view.release()
+		self.views = list()
+		self.memory.close()
+
+def warm(name):
+	"""
+	Attaches a worker process to the block before the first request
+	"""
+
+	SharedData.attach(name)
+	return True
+
+def render(name, change_types, column, inputs):
+	"""
+	Searches the shared data and renders the template in a worker
+
+	Parameters:
+	----------
+		name : str
+			Name of the block
+
+		change_types : int or iterable
+			Selected change types
+
+		column : int
+			Search column in the test database
+
+		inputs : dict
+			Change type, subassembly, part name, requester, creator
+			and comment values of the template
+
+	Return:
+	------
+		items : list or str
+			TestItem of every test, or a warning message
+
+		document : bytes
+			Contents of the PDF file, None with a warning message
+	"""
+
+	items = SharedData.attach(name).search(change_types, column)
+	if isinstance(items, str):
+		return items, None
+	template = TransmissionTemplate(items, **inputs)
+	template.render_template()
+	return items, template.document()
+
+class RenderPool:
+	"""
+	A class for a pre-warmed pool of processes rendering templates
+
+	The test and cost data are compiled once in the parent process and
+	published in shared memory. A reload of the databases publishes a
+	new block, which the workers attach to on their next request. A
+	render holds the block it was given until it finishes, an older
+	block is freed once no render holds it
+
+	Attributes:
+	----------
+		store : datastore.DataStore
+			Data store holding the loaded databases
+
+		processes : int
+			Number of rendering processes
+
+	Method:
+	------
+		start : Publishes the data and starts the workers
+
+		refresh : Publishes the data again if it has been reloaded
+
+		acquire : Returns the current block and holds it for a render
+
+		release : Stops holding a block and frees the unused ones
+
+		prune : Frees the older blocks no render holds
+
+		render : Renders a template in a worker
+
+		close : Stops the workers and frees the blocks
+	"""
+
+	def __init__(self, store, processes = RENDER_PROCESSES):
+		"""
+		Constructs the identifiers of the pool
+
+		Parameters:
+		----------
+			store : datastore.DataStore
+				Data store holding the loaded databases
+
+			processes : int
+				Number of rendering processes
+		"""
+
+		self.store = store
+		self.processes = processes
+		self.lock = threading.RLock()
+		self.snapshot = None
+		self.blocks = list()
+		self.holders = dict()
+		self.pool = None
+
+	def start(self):
+		"""
+		Publishes the loaded data and attaches every worker to it
+
+		Parameters:
+		----------
+			None
+
+		Return:
+		------
+			None
+		"""
+
+		name = self.refresh()
+		self.pool = ProcessPoolExecutor(max_workers = self.processes)
+		list(self.pool.map(warm, [name] * self.processes))
+		logging.warning("%d render processes share %d bytes of data" % (
+			self.processes, self.blocks[-1].memory.size))
+
+	def refresh(self):
+		"""
+		Publishes the current snapshot unless it is published already
+
+		The older blocks stay available to the renders holding them
+
+		Parameters:
+		----------
+			None
+
+		Return:
+		------
+			name : str
+				Name of the block of the current snapshot
+		"""
+
+		with self.lock:
+			snapshot = self.store.snapshot()
+			if snapshot is not self.snapshot:
+				self.blocks.append(SharedData.publish(snapshot))
+				self.snapshot = snapshot
+				self.prune()
+			return self.blocks[-1].name
+
+	def acquire(self):
+		"""
+		Returns the name of the block of the current snapshot, which is
+
+		not freed before the render is released
+		"""
+
+		with self.lock:
+			name = self.refresh()
+			self.holders[name] = self.holders.get(name, 0) + 1
+			return name
+
+	def release(self, name):
+		"""
+		Stops holding the block for a render and frees the older blocks
+
+		left without a render
+		"""
+
+		with self.lock:
+			self.holders[name] -= 1
+			if not self.holders[name]:
+				del self.holders[name]
+			self.prune()
+
+	def prune(self):
+		"""
+		Frees every block older than the current one that no render
+
+		holds, the caller holds the lock
+		"""
+
+		for block in self.blocks[:-1]:
+			if block.name not in self.holders:
+				self.blocks.remove(block)
+				block.close()
+				block.memory.unlink()
+
+	def render(self, change_types, column, inputs):
+		"""
+		Searches and renders the template in a worker process
+
+		Parameters:
+		----------
+			change_types : int or iterable
+				Selected change types
+
+			column : int
+				Search column in the test database
+
+			inputs : dict
+				Values of the template
+
+		Return:
+		------
+			items : list or str
+				TestItem of every test, or a warning message
+
+			document : bytes
+				Contents of the PDF file, None with a warning message
+		"""
+
+		name = self.acquire()
+		try:
+			return self.pool.submit(
+				render, name, change_types, column, inputs).result()
+		finally:
+			self.release(name)
+
+	def close(self):
+		"""
+		Stops the workers and frees the shared memory blocks
+		"""
+
+		if self.pool is not None:
+			self.pool.shutdown()
+		with self.lock:
+			for block in self.blocks:
+				block.close()
+				block.memory.unlink()
+			self.blocks = list()